@@ -1,13 +1,26 @@
 #!/usr/bin/env bash
 # -*- coding: utf-8 -*-
+import copy
 import itertools
+import sys
 from typing import Optional
 
 import pyglet
 from pipeliner.actors.node import Node
-from pyglet.window import key
+from pyglet.window import key, mouse
 from pipeliner.actors import Artist
+from pipeliner.camera import Camera, Culler
 from pipeliner.connection import Connection
+from pipeliner.model import EventSimulation, FlowEngine, GraphLayout
+from pipeliner.model.analysis import ThroughputAnalyzer
+from pipeliner.model.savefile import load_scene, save_scene
+from pipeliner.overlay import ProfilerHud, ThroughputOverlay
+from pipeliner.profiler import profiler
+from pipeliner.renderer import Layer, Renderer
+from pipeliner.spatial import NodeIndex, Part
+from pipeliner.text import CachedLabel
+from pipeliner.timewarp import TimeWarp
+from pipeliner.worker import SimulationWorker, SnapshotMirror
 from pipeliner.tasks import (
     EmptyTask,
     SimpleCompositingTask
@@ -15,7 +28,10 @@ from pipeliner.tasks import (
 
 
 window = pyglet.window.Window(1024, 640)
-main_batch = pyglet.graphics.Batch()
+renderer = Renderer()
+renderer.camera = camera = Camera(window)
+culler = Culler(camera)
+main_batch = renderer.batch
 
 class ControlState(object):
     allow_drag: bool
@@ -35,89 +51,231 @@ class ControlState(object):
 
 control_state = ControlState()
 
-actors = [
-    Artist(main_batch, x=32, y=64),
-    Artist(main_batch, x=128, y=128)
-]
+SCENE_PATH = "pipeliner_scene.plr"
 
-actors[0].task_slots = 10
-actors[0].add_tasks([EmptyTask(main_batch, assignee=actors[0]) for _ in range(5)])
-actors[0].add_task(SimpleCompositingTask(main_batch, assignee=actors[0]))
+# --threaded runs the simulation in a background thread, see pipeliner.worker
+THREADED = "--threaded" in sys.argv[1:]
+arguments = [argument for argument in sys.argv[1:] if not argument.startswith("--")]
 
-score_label = pyglet.text.Label(text="Score: 0", x=10, y=window.height - 20)
+if arguments:
+    actors = [Artist(main_batch, model=model) for model in load_scene(arguments[0])]
+    views = {actor.model: actor for actor in actors}
+    for actor in actors:
+        for connection in actor.model.connections:
+            actor.connections.append(Connection(
+                actor, views[connection.target], main_batch, model=connection))
+else:
+    actors = [
+        Artist(main_batch, x=32, y=64),
+        Artist(main_batch, x=128, y=128)
+    ]
+    actors[0].task_slots = 10
+    actors[0].add_tasks([EmptyTask() for _ in range(5)])
+    actors[0].add_task(SimpleCompositingTask())
+
+simulation = EventSimulation(flow=FlowEngine())
+time_warp = TimeWarp(simulation)
+if THREADED:
+    # views draw display copies, the worker thread owns the simulated models
+    models = copy.deepcopy([actor.model for actor in actors])
+else:
+    models = [actor.model for actor in actors]
+simulated = dict(zip(actors, models))
+views = {actor.model: actor for actor in actors}
+node_index = NodeIndex()
+for actor, model in simulated.items():
+    simulation.add_node(model)
+    node_index.add(actor)
+    culler.add_node(actor)
+for actor in actors:
+    for connection in actor.connections:
+        culler.add_connection(connection)
+
+worker = None
+mirror = None
+if THREADED:
+    worker = SimulationWorker(simulation, time_warp)
+    mirror = SnapshotMirror(worker, [actor.model for actor in actors])
+
+
+def run_command(command, *args) -> None:
+    """Change the simulation, in the worker thread if there is one."""
+    if worker is None:
+        command(*args)
+    else:
+        worker.submit(command, *args)
+
+
+def move_actor(actor: Node, dx: float, dy: float) -> None:
+    actor.x += dx
+    actor.y += dy
+    if worker is not None:
+        worker.submit(setattr, simulated[actor], "x", actor.x)
+        worker.submit(setattr, simulated[actor], "y", actor.y)
+
+
+# press L to lay out the graph, later connections then update the layout
+graph_layout: Optional[GraphLayout] = None
+
+
+def on_layout(moved) -> None:
+    """Re-index views of models moved by the layout."""
+    for model in moved:
+        actor = views[model]
+        culler.refresh(actor)
+        if worker is not None:
+            worker.submit(setattr, simulated[actor], "x", actor.x)
+            worker.submit(setattr, simulated[actor], "y", actor.y)
+
+score_label = CachedLabel(
+    text="Score: 0", x=10, y=window.height - 20,
+    batch=main_batch, group=renderer.groups[Layer.HUD])
+
+analyzer = ThroughputAnalyzer(SimpleCompositingTask())
+throughput_overlay = ThroughputOverlay(main_batch)
+profiler_hud = ProfilerHud(
+    main_batch, profiler, x=10, y=window.height - 40,
+    group=renderer.groups[Layer.HUD])
 
 
 @window.event
 def on_draw():
     window.clear()
-    main_batch.draw()
-    for actor in actors:
-        actor.draw()
-        for connection in actor.connections:
-            connection.draw()
-    score_label.draw()
+    if mirror is not None:
+        with profiler.phase("snapshot"):
+            mirror.update()
+    visible = culler.update()
+    if mirror is None and time_warp.should_sync():
+        simulation.sync(actor.model for actor in visible)
+    renderer.draw(visible)
+    profiler.count("visible", len(visible))
+    profiler.count("nodes", len(actors))
+    profiler.end_frame()
+    profiler_hud.update()
 
 @window.event
+@profiler.timed("mouse")
 def on_mouse_drag(x, y, dx, dy, buttons, modifiers):
-    actor: Node
+    actor: Optional[Node]
+    if buttons & (mouse.RIGHT | mouse.MIDDLE):
+        camera.pan(dx, dy)
+        return None
+    x, y = camera.to_world(x, y)
+    dx /= camera.zoom
+    dy /= camera.zoom
     if control_state.active_actor:
-        control_state.active_actor.x += dx
-        control_state.active_actor.y += dy
+        move_actor(control_state.active_actor, dx, dy)
         return   None
-    for actor in actors:
-        bounds = actor.get_bounds()
-        if bounds.x1 < x < bounds.x2 and bounds.y1 < y < bounds.y2 and control_state.allow_drag:
-            control_state.drag_on_actor = True
-            control_state.start_actor = actor
-            actor.x += dx
-            actor.y += dy
+    actor = node_index.pick(x, y, Part.BODY)
+    if actor and control_state.allow_drag:
+        control_state.drag_on_actor = True
+        control_state.start_actor = actor
+        move_actor(actor, dx, dy)
 
 @window.event
+@profiler.timed("mouse")
 def on_mouse_press(x, y, button, modifiers):
-    actor: Node
-    for actor in actors:
-        bounds = actor.get_bounds()
-        if bounds.x1 < x < bounds.x2 and bounds.y1 < y < bounds.y2:
-            control_state.allow_drag = True
-            control_state.start_actor = actor
-            control_state.active_actor = actor
-        if actor.out_port_position_bound and (actor.out_port_position_bound.x1 < x < actor.out_port_position_bound.x2 and actor.out_port_position_bound.y1 < y < actor.out_port_position_bound.y2):
-            control_state.drag_on_connection = True
-            control_state.start_actor = actor
+    actor: Optional[Node]
+    x, y = camera.to_world(x, y)
+    actor = node_index.pick(x, y, Part.BODY)
+    if actor:
+        control_state.allow_drag = True
+        control_state.start_actor = actor
+        control_state.active_actor = actor
+    actor = node_index.pick(x, y, Part.OUT_PORT)
+    if actor:
+        control_state.drag_on_connection = True
+        control_state.start_actor = actor
 
 
 @window.event
+@profiler.timed("mouse")
 def on_mouse_release(x, y, button, modifiers):
-    actor: Node
+    actor: Optional[Node]
+    x, y = camera.to_world(x, y)
     control_state.active_actor = None
-    for actor in actors:
-        bounds = actor.get_bounds()
-        if bounds.x1 < x < bounds.x2 and bounds.x1 < y < bounds.x2 and control_state.allow_drag:
-            control_state.allow_drag = False
-            if control_state.drag_on_actor:
-                control_state.drag_on_actor = False
-            control_state.end_actor = actor
-        if actor.in_port_position_bound.x1 < x < actor.in_port_position_bound.x2 and actor.in_port_position_bound.y1 < y < actor.in_port_position_bound.y2 and control_state.drag_on_connection:
-            control_state.drag_on_connection = False
-            control_state.end_actor = actor
-            if control_state.start_actor != control_state.end_actor:
-                print(f"Connect {control_state.start_actor} to {control_state.end_actor}")
-                control_state.start_actor.connections.append(Connection(control_state.start_actor, control_state.end_actor, main_batch))
-            else:
-                print(
-                    f"Cannot connect {control_state.start_actor} to {control_state.end_actor}"
-                )
+    actor = node_index.pick(x, y, Part.BODY)
+    if actor and control_state.allow_drag:
+        control_state.allow_drag = False
+        if control_state.drag_on_actor:
+            control_state.drag_on_actor = False
+        control_state.end_actor = actor
+    actor = node_index.pick(x, y, Part.IN_PORT)
+    if actor and control_state.drag_on_connection:
+        control_state.drag_on_connection = False
+        control_state.end_actor = actor
+        if control_state.start_actor != control_state.end_actor:
+            print(f"Connect {control_state.start_actor} to {control_state.end_actor}")
+            connection = Connection(control_state.start_actor, control_state.end_actor, main_batch)
+            control_state.start_actor.connections.append(connection)
+            culler.add_connection(connection)
+            if graph_layout is not None:
+                with profiler.phase("layout"):
+                    on_layout(graph_layout.add_connection(connection.model))
+            if worker is not None:
+                worker.submit(
+                    simulated[control_state.start_actor].connect,
+                    simulated[control_state.end_actor])
+        else:
+            print(
+                f"Cannot connect {control_state.start_actor} to {control_state.end_actor}"
+            )
+
+
+@window.event
+def on_mouse_scroll(x, y, scroll_x, scroll_y):
+    camera.zoom_at(x, y, 1.1 ** scroll_y)
+
+
+@window.event
+def on_key_press(symbol, modifiers):
+    global graph_layout
+    if symbol == key.B:
+        throughput_overlay.visible = not throughput_overlay.visible
+    elif symbol == key.P:
+        profiler.enabled = not profiler.enabled
+    elif symbol == key.T and profiler.enabled:
+        profiler.export_trace("pipeliner_trace.json")
+        print("Trace written to pipeliner_trace.json")
+    elif symbol == key.PERIOD:
+        run_command(time_warp.faster)
+    elif symbol == key.COMMA:
+        run_command(time_warp.slower)
+    elif symbol == key.L:
+        graph_layout = GraphLayout()
+        with profiler.phase("layout"):
+            models = [actor.model for actor in actors]
+            graph_layout.layout(models)
+            on_layout(models)
+    elif symbol == key.S:
+        run_command(save_scene, SCENE_PATH, simulation.nodes)
+        print(f"Scene saved to {SCENE_PATH}")
 
 
 def update(date_time: float):
     # Check for keyboard input
-    for actor in actors:
-        actor.update(date_time)
+    if worker is None:
+        with profiler.phase("update"):
+            time_warp.update(date_time)
+        delivered = simulation.flow.delivered
+    else:
+        delivered = mirror.snapshot.delivered if mirror.snapshot is not None else 0
+    score_label.text = f"Score: {delivered}  Speed: {time_warp.label}"
+    if throughput_overlay.visible:
+        with profiler.phase("analysis"):
+            throughput_overlay.update(
+                analyzer.analyze([actor.model for actor in actors]), actors)
 
 
 if __name__ == "__main__":
-    pyglet.clock.schedule_interval(update, 0.1)
+    pyglet.clock.schedule(update)
     pyglet.gl.glEnable(pyglet.gl.GL_LINE_SMOOTH)
-    pyglet.app.run()
+    if worker is not None:
+        worker.start()
+    try:
+        pyglet.app.run()
+    finally:
+        if worker is not None:
+            worker.stop()
 
 
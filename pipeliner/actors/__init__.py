@@ -1,4 +1,4 @@
-from .node import Node
+from .node import Detail, Node
 from .artist import Artist
 
-__all__ = ["Node", "Artist"]
\ No newline at end of file
+__all__ = ["Detail", "Node", "Artist"]
\ No newline at end of file
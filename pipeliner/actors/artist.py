@@ -2,51 +2,54 @@
 
 Artist is a basic workhorse of the game, it can do any task. It has a limited
 number of task slots and can only work for a limited number of hours per day.
-It is rendered as a green square with a letter A in it.
+It is rendered as a green square with a letter A in it, at low detail
+only as a green quad. Static parts of the square are sprites from the
+chrome atlas, see `pipeliner.atlas`.
 
 """
 import pyglet
+from typing import List, Optional
 from pipeliner.actors import Node
-from pipeliner.actors.node import Bounds, Point
-from pipeliner.tasks import EmptyTask, Task
-from pipeliner.tasks.type import (
-    EmptyTaskType,
-    CompositingTaskType,
-    RenderingTaskType,
-    ModelingTaskType,
-    RotoscopingTaskType,
-)
+from pipeliner.actors.node import Bounds, Detail, Dirty, Point
+from pipeliner.atlas import get_chrome_atlas
+from pipeliner.model import ArtistModel
+from pipeliner.tasks import EmptyTask
 
-from pipeliner.util import get_in_connection, get_out_connection
-from pipeliner.constants import ARTIST_DEFAULT_TASK_SLOTS, ARTIST_DEFAULT_WORK_HOURS
+from pipeliner.util import move_in_port_bounds, move_out_port_bounds
+from pipeliner.renderer import Layer, get_layer
+from pipeliner.text import CachedLabel, GlyphText
+
+# chrome images span from the in port caption to the out port caption
+_CHROME_ORIGIN = (-16, -12)
+_CHROME_SIZE = (120, 84)
 
 
 class Artist(Node):
-    """Generalist Artist node that can do any task."""
+    """Generalist Artist node that can do any task.
+
+    Properties:
+        model (ArtistModel): Simulation model of the artist.
+
+        _stale (Dirty): Parts changed while drawn at low detail, refreshed
+            once the node is drawn in full again.
+
+    """
+    model: ArtistModel
+
+    _stale: Dirty
 
     def get_bounds(self) -> Bounds:
         return Bounds(self.x, self.y, self.x + self._square_size, self.y + self._square_size)
 
     def __init__(
             self, batch: pyglet.graphics.Batch,
-            level: int = 1, x: int = 0, y: int = 0):
-        super().__init__(batch, level, x, y)
+            level: int = 1, x: int = 0, y: int = 0,
+            model: Optional[ArtistModel] = None):
+        if model is None:
+            model = ArtistModel(level, x, y)
+        super().__init__(batch, model=model)
         self.color = (128, 200, 128, 255)
         self.name = f"A"
-        
-        self.work_hours = ARTIST_DEFAULT_WORK_HOURS
-        self.current_hour = 0
-
-        self.task_slots = ARTIST_DEFAULT_TASK_SLOTS
-        self.accept_types = {
-            EmptyTaskType, CompositingTaskType, RenderingTaskType,
-            ModelingTaskType, RotoscopingTaskType
-        }
-        
-        self.provide_types = {
-            EmptyTaskType, CompositingTaskType, RenderingTaskType,
-            ModelingTaskType, RotoscopingTaskType
-        }
 
         self._square_size = 64
         self._left_pad = 10
@@ -54,7 +57,7 @@ class Artist(Node):
         self._line_width = 4
         self._background_color = (0, 0, 0, 255)
         
-        self._current_task = EmptyTask(batch, assignee=self)
+        self._idle_task = EmptyTask()
 
         self.in_port_position_bound = Bounds(0, 0, 0, 0)
         self.out_port_position_bound = Bounds(0, 0, 0, 0)
@@ -62,160 +65,243 @@ class Artist(Node):
         self.in_port_position: Point = Point(0, 0)
         self.out_port_position: Point = Point(0, 0)
 
+        self._drawn_progress = None
+        self._stale = Dirty.NONE
+        self._shapes = [
+            *self._get_main_square(),
+            *self._get_work_hours_bar(),
+            *self._get_task_progress_bar(),
+        ]
+        self._low_detail_quad = pyglet.shapes.Rectangle(
+            x=0, y=0, width=self._square_size, height=self._square_size,
+            color=self.color, batch=self.batch, group=get_layer(Layer.NODES))
+        self._low_detail_quad.visible = False
 
     def level_up(self) -> None:
-        """Level up the node.
-        
-        This method calculates the new production rate and work hours
-        for the node.
+        """Level up the node."""
+        self.model.level_up()
+
+    def _get_main_square(self):
+        """Create sprites of the static parts and the load indicator.
 
-        Todo:
-            This method should be moved to the base class.
+        Square, frames, ports and labels never change between frames,
+        they are rendered once per look into the chrome atlas, see
+        `_get_chrome`, and drawn as two sprites - one below the dynamic
+        bars and one with the labels above them.
 
         """
-        self.level += 1
-        self.production_rate += 0.5
-        self.work_hours += 1
+        self._chrome = pyglet.sprite.Sprite(
+            self._get_chrome(labels=False), batch=self.batch,
+            group=get_layer(Layer.NODES))
+        self._chrome_labels = pyglet.sprite.Sprite(
+            self._get_chrome(labels=True), batch=self.batch,
+            group=get_layer(Layer.LABELS))
+        self._load_indicator = self._get_io_load_indicator()
+        return [self._chrome, self._chrome_labels, self._load_indicator]
+
+    def _get_chrome(self, labels: bool) -> pyglet.image.TextureRegion:
+        """Get atlas image of the static parts in the current look.
 
-    def _get_main_square(self):
-        """Draw the main square of the node."""
+        Args:
+            labels (bool): Get the labels instead of the shapes below
+                the dynamic bars.
 
-        shapes = [
-            pyglet.shapes.BorderedRectangle(
-                x=self.x + self._left_pad, y=self.y,
-                width=self._square_size, height=self._square_size,
-                border=self._line_width,
-                color=self._background_color,
-                border_color=self.color, batch=self.batch),
-            *self._get_io_load_indicator(),
-            pyglet.text.Label(
-                self.name,
-                bold=True,
-                font_name="Arial",
-                font_size=38,
-                x=self.x + (self._left_pad + self._square_size + self._right_pad) // 2 - 2 ,
-                y=self.y + self._square_size // 2,
-                anchor_x="center", anchor_y="center",
-                color=self.color, batch=self.batch),
-            pyglet.text.Label(
-                str(self.level),
-                bold=True,
-                font_name="Arial",
-                font_size=16,
-                x=self.x + self._left_pad + self._square_size - 10 - self._right_pad,
-                y=self.y + self._square_size - 20,
-                anchor_x="left", anchor_y="center",
-                color=self.color, batch=self.batch),
+        Returns:
+            pyglet.image.TextureRegion: Image in the chrome atlas.
 
+        """
+        key = (type(self).__name__, labels, self.name, str(self.level), tuple(self.color))
+        build = self._build_chrome_labels if labels else self._build_chrome
+        return get_chrome_atlas().get(key, _CHROME_SIZE, build)
+
+    def _build_chrome(self, batch: pyglet.graphics.Batch) -> List:
+        """Create the square, frames and port circles for the atlas."""
+        x, y = -_CHROME_ORIGIN[0], -_CHROME_ORIGIN[1]
+        size = self._square_size
+        return [
+            pyglet.shapes.BorderedRectangle(
+                x=x + self._left_pad, y=y, width=size, height=size,
+                border=self._line_width, color=self._background_color,
+                border_color=self.color, batch=batch),
+            pyglet.shapes.BorderedRectangle(
+                x=x + 3, y=y, width=5, height=size, border=1,
+                color=self._background_color, border_color=self.color, batch=batch),
+            pyglet.shapes.BorderedRectangle(
+                x=x + self._left_pad, y=y - 7, width=size, height=5, border=1,
+                color=self._background_color, border_color=self.color, batch=batch),
+            pyglet.shapes.Circle(
+                x=x - 5, y=y + size // 2, radius=2, color=(255, 255, 255), batch=batch),
+            pyglet.shapes.Circle(
+                x=x + size + 20, y=y + size // 2, radius=2, color=(255, 255, 255),
+                batch=batch),
         ]
-        self.in_port_position.x = self.x - 5
-        self.in_port_position.y = self.y + (self._square_size // 2)
-        self.out_port_position.x = self.x + self._square_size + 20
-        self.out_port_position.y = self.y + (self._square_size // 2)
 
-        shapes += get_in_connection(
-            (self.x-5, self.y + (self._square_size // 2)),
-            self.batch, self.in_port_position_bound)
-        shapes += get_out_connection(
-            (self.x + self._square_size + 20, self.y + (self._square_size // 2)),
-            self.batch, self.out_port_position_bound)
-        return shapes
+    def _build_chrome_labels(self, batch: pyglet.graphics.Batch) -> List:
+        """Create the name, level and port labels for the atlas."""
+        x, y = -_CHROME_ORIGIN[0], -_CHROME_ORIGIN[1]
+        size = self._square_size
+        return [
+            CachedLabel(
+                self.name, bold=True, font_name="Arial", font_size=38,
+                anchor_x="center", anchor_y="center", color=self.color,
+                x=x + (self._left_pad + size + self._right_pad) // 2 - 2,
+                y=y + size // 2, batch=batch),
+            CachedLabel(
+                str(self.level), bold=True, font_name="Arial", font_size=16,
+                anchor_x="left", anchor_y="center", color=self.color,
+                x=x + self._left_pad + size - 10 - self._right_pad,
+                y=y + size - 20, batch=batch),
+            GlyphText("IN", x=x - 10, y=y + size // 2 - 15, font_size=8, batch=batch),
+            GlyphText("OUT", x=x + size + 12, y=y + size // 2 - 15, font_size=8, batch=batch),
+        ]
 
     def _get_work_hours_bar(self):
-        """Draw the work hours bar.
+        """Create shapes of the work hours bar.
         
         This is the leftmost bar in the node. It shows how many hours
-        the node has worked today.
+        the node has worked today, its frame is part of the chrome.
 
         """
-        hour_step = (self._square_size - 2) / self.work_hours
-        bar_height = self.current_hour * hour_step
-        if self.current_hour >= self.work_hours:
-            bar_height = self._square_size - 2
-
-        return [
-            pyglet.shapes.BorderedRectangle(
-                x=self.x + 3, y=self.y,
-                width=5, height=self._square_size,
-                border=1,
-                color=self._background_color,
-                border_color=self.color, batch=self.batch),
-            pyglet.shapes.Rectangle(
-                x=self.x + 4, y=self.y + 1,
-                width=3, height=bar_height,
-                color=(64, 64, 64, 255), batch=self.batch)
-        ]
+        self._hours_bar = pyglet.shapes.Rectangle(
+            x=0, y=0,
+            width=3, height=0,
+            color=(64, 64, 64, 255), batch=self.batch,
+            group=get_layer(Layer.NODE_DETAILS))
+        return [self._hours_bar]
 
     def _get_io_load_indicator(self):
-        """Draw the load indicator.
+        """Create the load indicator.
         
         Load indicator is drawn on the background of the main square.
-        It shows how many tasks the node has in its task slots.
+        It shows how many tasks the node has in its task slots, its
+        height is resized in `_update_load_indicator`.
 
-        Todo:
-            implement this method properly. Currently it is only static.
         """
-        return [
-            pyglet.shapes.Rectangle(
-                x=self.x + self._left_pad + 4,
-                y=self.y + 4,
-                width=self._square_size - 8,
-                height=(self._square_size - 8) // 2,
-                color=(64, 64, 64, 128),
-                batch=self.batch),
-        ]
+        return pyglet.shapes.Rectangle(
+            x=0, y=0,
+            width=self._square_size - 8,
+            height=0,
+            color=(64, 64, 64, 128),
+            batch=self.batch,
+            group=get_layer(Layer.NODE_DETAILS))
 
-    def _get_task_progress_bar(self, task: Task) -> None:
-        """Draw the task progress bar.
+    def _get_task_progress_bar(self):
+        """Create shapes of the task progress bar.
 
         This is the bar on the bottom above the Task View
         that shows how much progress the current task
-        has made.
-
-        Args:
-            task (Task): Task to draw the progress bar for.
+        has made. Its frame is part of the chrome.
 
         """
-        x = self.x + self._left_pad
-        y = self.y - 7
-        return [
-            pyglet.shapes.BorderedRectangle(
-                x=x, y=y,
-                width=self._square_size, height=5,
-                border=1,
-                color=self._background_color,
-                border_color=self.color, batch=self.batch),
-            pyglet.shapes.Rectangle(
-                x=x + 1, y=self.y - 2,
-                width=(self._square_size - 2) * task.progress,
-                height=3,
-                color=task.type.color,
-                batch=self.batch)
-            
-        ]
-
-    def draw(self):
-        """Draw the node."""
-        shapes = []
-        shapes += self._get_main_square()
-        shapes += self._get_work_hours_bar()
-        shapes += self._get_task_progress_bar(self._current_task)
-        shapes += self.get_task_view(offset_x=self._left_pad, offset_y=-14, max_length=self.x + self._square_size + 7)
-
-        for shape in shapes:
-            shape.draw()
+        self._progress_bar = pyglet.shapes.Rectangle(
+            x=0, y=0,
+            width=0,
+            height=3,
+            color=self._idle_task.type.color,
+            batch=self.batch,
+            group=get_layer(Layer.NODE_DETAILS))
+        return [self._progress_bar]
+
+    def _update_port_positions(self) -> None:
+        """Move port positions connections are drawn to and their bounds."""
+        self.in_port_position.x = self.x - 5
+        self.in_port_position.y = self.y + (self._square_size // 2)
+        self.out_port_position.x = self.x + self._square_size + 20
+        self.out_port_position.y = self.y + (self._square_size // 2)
+        move_in_port_bounds(
+            (self.in_port_position.x, self.in_port_position.y),
+            self.in_port_position_bound)
+        move_out_port_bounds(
+            (self.out_port_position.x, self.out_port_position.y),
+            self.out_port_position_bound)
+
+    def _layout(self) -> None:
+        """Move all retained shapes to the current node position."""
+        x, y = self.x, self.y
+        chrome_position = (x + _CHROME_ORIGIN[0], y + _CHROME_ORIGIN[1], 0)
+        self._chrome.position = chrome_position
+        self._chrome_labels.position = chrome_position
+        self._low_detail_quad.position = (x + self._left_pad, y)
+        self._load_indicator.position = (x + self._left_pad + 4, y + 4)
+        self._hours_bar.position = (x + 4, y + 1)
+        self._progress_bar.position = (x + self._left_pad + 1, y - 2)
+
+        self._update_port_positions()
+
+    def _update_work_hours_bar(self) -> None:
+        """Resize the work hours bar to the current hour."""
+        hour_step = (self._square_size - 2) / self.work_hours
+        bar_height = self.current_hour * hour_step
+        if self.current_hour >= self.work_hours:
+            bar_height = self._square_size - 2
+        self._hours_bar.height = bar_height
+
+    def _update_load_indicator(self) -> None:
+        """Resize the load indicator to the occupancy of the task slots."""
+        self._load_indicator.height = (self._square_size - 8) * self.model.queue.occupancy
+
+    def _update_task_progress_bar(self) -> None:
+        """Resize and recolor the progress bar if the current task changed."""
+        task = self.current_task or self._idle_task
+        progress = (task.progress, task.type.color)
+        if progress == self._drawn_progress:
+            return
+        self._drawn_progress = progress
+        self._progress_bar.width = (self._square_size - 2) * task.progress
+        self._progress_bar.color = task.type.color
+
+    def _update_chrome(self) -> None:
+        """Switch chrome sprites to the images of the current look."""
+        self._chrome.image = self._get_chrome(labels=False)
+        self._chrome_labels.image = self._get_chrome(labels=True)
+
+    def _apply_detail(self, detail: Detail) -> None:
+        """Show all shapes in full detail and only a quad in low detail."""
+        full = detail is Detail.FULL
+        for shape in self._shapes:
+            shape.visible = full
+        if self._task_view is not None:
+            self._task_view.visible = full
+        self._low_detail_quad.visible = detail is Detail.LOW
+        if full:
+            # hidden task grid has no vertices, it is rebuilt on sync
+            self._dirty |= self._stale | Dirty.TASKS
+            self._stale = Dirty.NONE
+
+    def _sync_shapes(self, dirty: Dirty) -> None:
+        """Refresh retained shapes that are out of date."""
+        if self._detail is not Detail.FULL:
+            if dirty & Dirty.POSITION:
+                self._low_detail_quad.position = (self.x + self._left_pad, self.y)
+                self._update_port_positions()
+            if dirty & Dirty.COLOR:
+                self._low_detail_quad.color = self.color
+            self._stale |= dirty
+            return
+        if dirty & Dirty.POSITION:
+            self._layout()
+        if dirty & Dirty.COLOR:
+            self._low_detail_quad.color = self.color
+        if dirty & (Dirty.COLOR | Dirty.LABELS):
+            self._update_chrome()
+        if dirty & Dirty.HOURS:
+            self._update_work_hours_bar()
+        if dirty & Dirty.PROGRESS:
+            self._update_task_progress_bar()
+        if dirty & Dirty.TASKS:
+            self._update_load_indicator()
+        if dirty & (Dirty.TASKS | Dirty.POSITION):
+            self.get_task_view(
+                offset_x=self._left_pad, offset_y=-14,
+                max_length=self.x + self._square_size + 7)
 
     def update(self, delta_time: float):
         """Update the node.
 
+        Simulation state lives in the model, see `NodeModel.step`.
+
         Args:
             delta_time (float): Time since last update.
 
         """
-        self.current_hour += delta_time
-        if self.current_hour >= self.work_hours:
-            self.current_hour = 0
-            self.state = 0
-            self.color = (128, 200, 128, 255)
-        for connection in self.connections:
-            connection.update(delta_time)
+        self.model.step(delta_time)
@@ -1,11 +1,27 @@
 """Base for all nodes/actors in the game."""
 import pyglet
 from pipeliner.constants import TASK_SIZE, TASK_PADDING
+from pipeliner.model import Dirty, NodeModel
+from pipeliner.renderer import Layer, get_layer
+from pipeliner.task_grid import TaskGrid
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Optional, Set
+from enum import IntEnum
+from typing import Callable, Iterable, List, Tuple, Optional, Set
 from dataclasses import dataclass
 
 
+class Detail(IntEnum):
+    """How much of a node or connection is drawn.
+
+    Nodes far from the camera are drawn with less detail, nodes out of
+    its view are not drawn at all.
+
+    """
+    HIDDEN = 0
+    LOW = 1
+    FULL = 2
+
+
 @dataclass
 class Bounds:
     """Bounds of a rectangle.
@@ -17,7 +33,9 @@ class Bounds:
     x2: int
     y2: int
 
-    def get_shapes(self, color: tuple, batch: pyglet.graphics.Batch) -> List:
+    def get_shapes(
+            self, color: tuple, batch: pyglet.graphics.Batch,
+            layer: Layer = Layer.OVERLAY) -> List:
         """Get bounds shapes as lines.
         
         This is used for debugging purposes to draw the bounds.
@@ -25,16 +43,19 @@ class Bounds:
         Args:
             color (tuple): Color of the bounds.
             batch (pyglet.graphics.Batch): Batch to add the shapes to.
+            layer (Layer, optional): Layer of the lines. Defaults to
+                Layer.OVERLAY drawn over the scene in world coordinates.
 
         Returns:
             List: List of shapes.
 
         """
+        group = get_layer(layer)
         return [
-            pyglet.shapes.Line(x=self.x1, y=self.y1, x2=self.x1, y2=self.y2, color=color, batch=batch),
-            pyglet.shapes.Line(x=self.x1, y=self.y2, x2=self.x2, y2=self.y2, color=color, batch=batch),
-            pyglet.shapes.Line(x=self.x2, y=self.y2, x2=self.x2, y2=self.y1, color=color, batch=batch),
-            pyglet.shapes.Line(x=self.x2, y=self.y1, x2=self.x1, y2=self.y1, color=color, batch=batch),
+            pyglet.shapes.Line(x=self.x1, y=self.y1, x2=self.x1, y2=self.y2, color=color, batch=batch, group=group),
+            pyglet.shapes.Line(x=self.x1, y=self.y2, x2=self.x2, y2=self.y2, color=color, batch=batch, group=group),
+            pyglet.shapes.Line(x=self.x2, y=self.y2, x2=self.x2, y2=self.y1, color=color, batch=batch, group=group),
+            pyglet.shapes.Line(x=self.x2, y=self.y1, x2=self.x1, y2=self.y1, color=color, batch=batch, group=group),
         ]
 
     def draw(self, color: tuple, batch: pyglet.graphics.Batch) -> None:
@@ -48,18 +69,38 @@ class Point:
     y: int
 
 
+class ModelProperty(object):
+    """Attribute of the node view stored on its model."""
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, node, owner=None):
+        if node is None:
+            return self
+        return getattr(node.model, self.name)
+
+    def __set__(self, node, value) -> None:
+        setattr(node.model, self.name, value)
+
+
 class Node(ABC):
     """Base class for all nodes/actors in the game.
+
+    Node is a view of a `NodeModel`. Simulation state is read from and
+    written to the model, node only keeps what is needed to draw it.
     
     Properties:
         
+        model (NodeModel): Simulation model of the node.
         x (int): X position of the node.
         y (int): Y position of the node.
         color (tuple): Color of the node.
+        detail (Detail): How much of the node is drawn.
         
         connections (List[Connection]): List of connections to other nodes.
-        accept_types (Set): Set of task types that the node accepts.
-        provide_types (Set): Set of task types that the node provides.
+        accept_types (FrozenSet): Task types that the node accepts.
+        provide_types (FrozenSet): Task types that the node provides.
 
         level (int): Level of the node.
         production_rate (float): How many tasks the node produces per hour.
@@ -72,20 +113,24 @@ class Node(ABC):
         _out_port_position (Point): Position of the out port.
         
         _batch (pyglet.graphics.Batch): Batch to add the shapes to.
+        _dirty (Dirty): Parts of the view whose shapes are out of date.
+        _task_view (Optional[TaskGrid]): Retained task view.
+        _position_listeners (List[Callable]): Callbacks called when the node moved.
 
     """
-    x: int
-    y: int
-    color: tuple
+    model: NodeModel
 
     connections: List
-    accept_types: Set
-    provide_types: Set
-    
-    level: int
-    production_rate: float
-    work_hours: int
-    current_hour: int
+    accept_types = ModelProperty()
+    provide_types = ModelProperty()
+
+    x = ModelProperty()
+    y = ModelProperty()
+    level = ModelProperty()
+    production_rate = ModelProperty()
+    work_hours = ModelProperty()
+    current_hour = ModelProperty()
+    task_slots = ModelProperty()
     
     _in_port_position_bound: Optional[Bounds]
     _out_port_position_bound: Optional[Bounds]
@@ -93,31 +138,129 @@ class Node(ABC):
     _out_port_position: Point
 
     _batch: pyglet.graphics.Batch
+    _dirty: Dirty
+    _task_view: Optional[TaskGrid]
+    _position_listeners: List[Callable]
 
     def __init__(self,
                  batch: pyglet.graphics.Batch,
                  level: int = 1,
                  x: int = 0,
-                 y: int = 0):
-        self.level = level
+                 y: int = 0,
+                 model: Optional[NodeModel] = None):
+        self.model = model if model is not None else NodeModel(level, x, y)
+        self._dirty = Dirty.ALL
+        self._detail = Detail.FULL
+        self._task_view = None
+        self._position_listeners = []
+        self._color = (255, 255, 255, 255)
         self.batch = batch
-        self.x = x
-        self.y = y
         self.connections = []
-        self.production_rate = 1.0
-        self.work_hours = 8
-        self._tasks = []
-        self.task_slots = 2
-        self.current_hour = 0
-        self.current_task = None
         self.in_port_position_bound = None
         self.out_port_position_bound = None
 
+    @property
+    def _tasks(self) -> List:
+        return self.model.tasks
+
+    @property
+    def current_task(self):
+        return self.model.current_task
+
+    @property
+    def color(self) -> tuple:
+        return self._color
+
+    @color.setter
+    def color(self, value: tuple) -> None:
+        if value != self._color:
+            self._color = value
+            self._dirty |= Dirty.COLOR
+
+    @property
+    def detail(self) -> Detail:
+        return self._detail
+
+    @detail.setter
+    def detail(self, value: Detail) -> None:
+        if value != self._detail:
+            self._detail = value
+            self._apply_detail(value)
+
+    def _apply_detail(self, detail: Detail) -> None:
+        """Show and hide shapes for the level of detail.
+
+        Args:
+            detail (Detail): New level of detail.
+
+        """
+        pass
+
+    def mark_dirty(self, dirty: Dirty = Dirty.ALL) -> None:
+        """Mark parts of the node as changed.
+
+        Use this when something the node cannot observe itself changes,
+        for example the type of one of its tasks.
+
+        Args:
+            dirty (Dirty, optional): Parts to refresh. Defaults to Dirty.ALL.
+
+        """
+        self._dirty |= dirty
+
+    def add_position_listener(self, listener: Callable) -> None:
+        """Call listener with the node whenever the node moves.
+
+        Listeners are called from `sync` once port positions
+        are up to date.
+
+        Args:
+            listener (Callable): Callback taking the node.
+
+        """
+        self._position_listeners.append(listener)
+
+    def remove_position_listener(self, listener: Callable) -> None:
+        """Stop calling listener when the node moves.
+
+        Args:
+            listener (Callable): Callback added by `add_position_listener`.
+
+        """
+        self._position_listeners.remove(listener)
+
+    def sync(self) -> None:
+        """Bring retained shapes up to date with the node.
+
+        Changes made to the model since the last sync are collected into
+        `_dirty`, nodes implementing retained shapes refresh only the
+        flagged parts in `_sync_shapes`. Position listeners are notified
+        if the node moved.
+
+        """
+        self._dirty |= self.model.dirty
+        self.model.dirty = Dirty.NONE
+        if not self._dirty:
+            return
+        self._sync_shapes(self._dirty)
+        if self._dirty & Dirty.POSITION:
+            for listener in self._position_listeners:
+                listener(self)
+        self._dirty = Dirty.NONE
+
+    def _sync_shapes(self, dirty: Dirty) -> None:
+        """Refresh shapes of the parts flagged in dirty.
+
+        Args:
+            dirty (Dirty): Parts of the node that changed.
+
+        """
+        pass
+
     @abstractmethod
     def update(self, delta_time: float):
         """Update the node."""
-        for connection in self.connections:
-            connection.update(delta_time)
+        pass
 
     @abstractmethod
     def get_bounds(self) -> Bounds:
@@ -142,18 +285,15 @@ class Node(ABC):
             bool: True if task was added, False otherwise.
         
         """
-        if len(self._tasks) >= self.task_slots:
-            return False
-        if not isinstance(task.type, (*self.accept_types,)):
-            return False
-        self._tasks.append(task)
-        return True
+        return self.model.add_task(task)
     
-    def add_tasks(self, tasks: List) -> List[bool]:
+    def add_tasks(self, tasks: Iterable) -> List[bool]:
         """Add multiple tasks to the node.
-        
+
+        To feed tasks over time, use `pipeliner.model.arrivals.TaskSource`.
+
         Args:
-            tasks (List): List of tasks to add.
+            tasks (Iterable): Tasks to add.
 
         Returns:
             List[bool]: List of booleans indicating if the task was added.
@@ -169,51 +309,35 @@ class Node(ABC):
             self,
             offset_x: int = 0,
             offset_y: int = 0,
-            max_length: int = 64) -> List[pyglet.shapes.ShapeBase]:
-        """Get shapes for the node's task view.
+            max_length: int = 64) -> TaskGrid:
+        """Get the node's task view.
         
         Task view is a visual representation of the tasks and their
-        state associated with the node. Task shapes are drawn in a grid
+        state associated with the node. Task cells are drawn in a grid
         with a maximum length of max_length.
 
+        The whole grid is a single vertex list kept between calls. Only
+        cells whose task changed are written and moving the node only
+        moves the grid.
+
         Args:
             offset_x (int, optional): X offset of the task view. Defaults to 0.
             offset_y (int, optional): Y offset of the task view. Defaults to 0.
             max_length (int, optional): Maximum length of the task view. Defaults to 64.
 
         Returns:
-            List: List of shapes.
+            TaskGrid: Task grid of the node.
 
         """
         x = self.x + offset_x
         y = self.y + offset_y
-        shapes = []
+        columns = max(1, (max_length - x) // (TASK_SIZE + TASK_PADDING) + 1)
 
-        shape_x = x
-        shape_y = y
-    
-        for i, task in enumerate(self._tasks):
-            if i > self.task_slots:
-                break
-            shapes += task.get_shapes(shape_x, shape_y)
-            shape_x += TASK_SIZE + TASK_PADDING
-            if shape_x > max_length:
-                shape_x = x
-                shape_y -= TASK_SIZE + TASK_PADDING
-
-        if len(self._tasks) < self.task_slots:
-            for i in range(self.task_slots - len(self._tasks)):
-                shapes += [
-                    pyglet.shapes.BorderedRectangle(
-                        x=shape_x, y=shape_y,
-                        width=TASK_SIZE, height=TASK_SIZE,
-                        border=1,
-                        color=(0, 0, 0, 255),
-                        border_color=(128, 128, 128, 255),
-                        batch=self.batch)
-                    ]
-                shape_x += TASK_SIZE + TASK_PADDING
-                if shape_x > max_length:
-                    shape_x = x
-                    shape_y -= TASK_SIZE + TASK_PADDING
-        return shapes
+        if self._task_view is None:
+            self._task_view = TaskGrid(self.batch, get_layer(Layer.TASKS), columns)
+        elif self._task_view.columns != columns:
+            self._task_view.delete()
+            self._task_view.columns = columns
+        self._task_view.position = (x, y)
+        self._task_view.update(self._tasks, self.task_slots)
+        return self._task_view
@@ -0,0 +1,168 @@
+"""Shared texture atlas of pre-rendered static node parts.
+
+Most of a node never changes between frames - its frame, name, level,
+ports and their captions. Drawn as shapes and labels they cost tens of
+vertices and several Python objects per node. Instead the static parts
+are rendered once per look, for example per node kind, color and level,
+into an image in a shared texture atlas, and every node with the same
+look draws it as a single sprite. Sprites of one atlas texture share a
+vertex domain, so thousands of nodes cost about as much as thousands of
+sprites. Only parts that change, like progress bars and task cells,
+stay as geometry.
+
+Images are rendered by drawing the same shapes the node used to draw
+into an offscreen framebuffer, so they look the same as before.
+
+"""
+import math
+from ctypes import byref
+from typing import Callable, Dict, Hashable, List, Tuple
+
+import pyglet
+from pyglet.gl import (
+    GL_COLOR_BUFFER_BIT,
+    GL_COLOR_CLEAR_VALUE,
+    GL_UNIFORM_BUFFER,
+    GL_UNIFORM_BUFFER_BINDING,
+    GL_VIEWPORT,
+    GLfloat,
+    GLint,
+    glBindBufferBase,
+    glClear,
+    glClearColor,
+    glGetFloatv,
+    glGetIntegeri_v,
+    glGetIntegerv,
+    glViewport,
+)
+from pyglet.image import ImageData, TextureRegion
+from pyglet.image.atlas import TextureBin
+from pyglet.math import Mat4
+
+#: Builds shapes in the batch, positions are relative to the image.
+Builder = Callable[[pyglet.graphics.Batch], List]
+
+
+def _unpremultiply(data: bytes) -> bytes:
+    # Blending into a transparent image multiplies color by alpha and
+    # squares alpha of antialiased edges, undo both.
+    pixels = bytearray(data)
+    for i in range(3, len(pixels), 4):
+        alpha = pixels[i]
+        if alpha in (0, 255):
+            continue
+        coverage = math.sqrt(alpha / 255)
+        for channel in range(i - 3, i):
+            pixels[channel] = min(255, round(pixels[channel] / coverage))
+        pixels[i] = round(coverage * 255)
+    return bytes(pixels)
+
+
+def render_image(build: Builder, width: int, height: int) -> ImageData:
+    """Render shapes into an image.
+
+    Shapes are drawn into an offscreen framebuffer with their own window
+    projection, state of the current window is restored afterwards.
+
+    Args:
+        build (Builder): Creates the shapes to draw in the given batch.
+        width (int): Width of the image.
+        height (int): Height of the image.
+
+    Returns:
+        ImageData: Rendered RGBA image.
+
+    """
+    texture = pyglet.image.Texture.create(width, height)
+    framebuffer = pyglet.image.Framebuffer()
+    framebuffer.attach_texture(texture)
+
+    previous_ubo = GLint()
+    glGetIntegeri_v(GL_UNIFORM_BUFFER_BINDING, 0, byref(previous_ubo))
+    previous_viewport = (GLint * 4)()
+    glGetIntegerv(GL_VIEWPORT, previous_viewport)
+    previous_clear = (GLfloat * 4)()
+    glGetFloatv(GL_COLOR_CLEAR_VALUE, previous_clear)
+
+    program = pyglet.shapes.get_default_shader()
+    ubo = program.uniform_blocks["WindowBlock"].create_ubo()
+    with ubo as window_block:
+        window_block.projection[:] = Mat4.orthogonal_projection(0, width, 0, height, -255, 255)
+        window_block.view[:] = Mat4()
+
+    batch = pyglet.graphics.Batch()
+    shapes = build(batch)
+    framebuffer.bind()
+    try:
+        glViewport(0, 0, width, height)
+        glClearColor(0, 0, 0, 0)
+        glClear(GL_COLOR_BUFFER_BIT)
+        batch.draw()
+    finally:
+        framebuffer.unbind()
+        glViewport(*previous_viewport)
+        glClearColor(*previous_clear)
+        glBindBufferBase(GL_UNIFORM_BUFFER, 0, previous_ubo.value)
+
+    image = texture.get_image_data()
+    data = _unpremultiply(image.get_data("RGBA", width * 4))
+    for shape in shapes:
+        shape.delete()
+    framebuffer.delete()
+    return ImageData(width, height, "RGBA", data)
+
+
+class ChromeAtlas(object):
+    """Texture atlas of rendered images by their look.
+
+    Properties:
+        _bin (TextureBin): Atlas textures the images are packed into.
+        _regions (Dict[Hashable, TextureRegion]): Image of every look.
+
+    """
+    _bin: TextureBin
+    _regions: Dict[Hashable, TextureRegion]
+
+    def __init__(self, texture_size: int = 1024):
+        self._bin = TextureBin(texture_size, texture_size)
+        self._regions = {}
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._regions
+
+    def get(self, key: Hashable, size: Tuple[int, int], build: Builder) -> TextureRegion:
+        """Get image of the look, rendering it the first time.
+
+        Args:
+            key (Hashable): Everything the look of the image depends on.
+            size (Tuple[int, int]): Width and height of the image.
+            build (Builder): Creates shapes of the image, called only
+                if the image is not in the atlas yet.
+
+        Returns:
+            TextureRegion: Image in the atlas.
+
+        """
+        region = self._regions.get(key)
+        if region is None:
+            region = self._bin.add(render_image(build, *size))
+            self._regions[key] = region
+        return region
+
+
+def get_chrome_atlas() -> ChromeAtlas:
+    """Get atlas of static node parts.
+
+    Returns:
+        ChromeAtlas: Atlas shared by the current context.
+
+    """
+    context = pyglet.gl.current_context
+    try:
+        return context.pipeliner_chrome_atlas
+    except AttributeError:
+        context.pipeliner_chrome_atlas = ChromeAtlas()
+        return context.pipeliner_chrome_atlas
@@ -0,0 +1,704 @@
+"""Benchmarks of simulation and drawing cost versus scene size.
+
+Synthetic scenes with N artists, M tasks per artist and K connections
+are built for every size and the cost of a simulation tick, of event
+simulation steps, of graph layout and of drawing frames is measured. Allocations are
+counted with `tracemalloc`. Results are printed as JSON with a scaling
+curve for every case and the outcome of threshold checks, so
+regressions in the hot paths are caught by comparing runs. Limits of
+scene sizes without their own limit are interpolated, cases without any
+limit are listed in the warnings of the report.
+
+Run it from the repository root::
+
+    python -m pipeliner.benchmark --sizes 10 100 1000 --output bench.json
+
+Memory of tasks is measured as bytes per task of N tasks of every task
+class queued in a node, `--memory-tasks` sets N, for example 1000000.
+Limits in `TASK_MEMORY_THRESHOLDS` keep tasks compact.
+
+Drawing runs with pyglet in headless mode, `--model-only` skips it and
+does not import pyglet at all.
+
+`--pick` adds pick latency of the node index and of a linear scan over
+all nodes at 100, 1000 and 10000 nodes, 100 random points per operation.
+
+`--balance` adds a comparison of static task assignment with work
+stealing on a skewed workload - makespan and throughput of the same
+scene simulated with and without a `WorkStealer`.
+
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from bisect import bisect_left
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from pipeliner.model import (
+    ArtistModel, EventSimulation, FlowEngine, GraphLayout, Simulation, WorkStealer)
+from pipeliner.tasks import EmptyTask, SimpleCompositingTask, Task
+
+#: Maximum mean milliseconds per operation of every case at the given
+#: number of nodes. Limits are about four times the cost measured when
+#: they were set, but at least 2 ms, they catch hot paths that got much
+#: slower, not noise. Sizes in between are interpolated, see `get_limit`.
+DEFAULT_THRESHOLDS: Dict[str, Dict[int, float]] = {
+    "tick": {10: 2.0, 100: 4.0, 1000: 50.0},
+    "event_step": {10: 2.0, 100: 10.0, 1000: 100.0},
+    "layout": {10: 5.0, 100: 30.0, 1000: 400.0},
+    "relayout": {10: 2.0, 100: 5.0, 1000: 40.0},
+    "update": {10: 2.0, 100: 3.0, 1000: 25.0},
+    "draw": {10: 5.0, 100: 5.0, 1000: 50.0},
+}
+
+#: Maximum bytes of a single task object per task class. Compact tasks
+#: with `__slots__` and shared types take 88 bytes, with an instance
+#: dictionary 128 and with its own type instance over 200.
+TASK_MEMORY_THRESHOLDS: Dict[str, float] = {
+    "EmptyTask": 120.0,
+    "SimpleCompositingTask": 120.0,
+}
+
+
+@dataclass
+class Measurement:
+    """Cost of a benchmark case at one scene size.
+
+    Properties:
+        case (str): Name of the case.
+        nodes (int): Number of nodes in the scene.
+        tasks (int): Number of tasks per node.
+        connections (int): Number of connections in the scene.
+        mean_ms (float): Mean time of a single operation.
+        min_ms (float): Fastest single operation.
+        allocations (int): Memory blocks allocated and kept by one operation.
+        allocated_kb (float): Size of the kept blocks.
+        peak_kb (float): Peak traced memory during one operation.
+        extra (Dict): Case specific values.
+
+    """
+    case: str
+    nodes: int
+    tasks: int
+    connections: int
+    mean_ms: float = 0.0
+    min_ms: float = 0.0
+    allocations: int = 0
+    allocated_kb: float = 0.0
+    peak_kb: float = 0.0
+    extra: Dict = field(default_factory=dict)
+
+
+def _time(operation: Callable[[], None], repeat: int) -> Tuple[float, float]:
+    operation()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        times.append((time.perf_counter() - start) * 1000)
+    return sum(times) / len(times), min(times)
+
+
+def _trace(operation: Callable[[], None]) -> Tuple[int, float, float]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    count = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    return count, size / 1024, peak / 1024
+
+
+def measure(
+        case: str, operation: Callable[[], None],
+        nodes: int, tasks: int, connections: int,
+        repeat: int = 10) -> Measurement:
+    """Measure time and allocations of the operation.
+
+    Args:
+        case (str): Name of the case.
+        operation (Callable): Operation to measure.
+        nodes (int): Number of nodes in the scene.
+        tasks (int): Number of tasks per node.
+        connections (int): Number of connections in the scene.
+        repeat (int, optional): How many times to time the operation.
+            Defaults to 10.
+
+    Returns:
+        Measurement: Cost of the operation.
+
+    """
+    mean_ms, min_ms = _time(operation, repeat)
+    allocations, allocated_kb, peak_kb = _trace(operation)
+    return Measurement(
+        case, nodes, tasks, connections,
+        mean_ms=mean_ms, min_ms=min_ms,
+        allocations=allocations, allocated_kb=allocated_kb, peak_kb=peak_kb)
+
+
+def bench_task_memory(task_class: Type[Task], count: int) -> Dict:
+    """Measure memory of tasks queued in a node.
+
+    Args:
+        task_class (Type[Task]): Class of the tasks.
+        count (int): Number of tasks.
+
+    Returns:
+        Dict: Bytes per task object and bytes per task including the
+            node task queue.
+
+    """
+    model = ArtistModel()
+    model.task_slots = count
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tasks = [task_class() for _ in range(count)]
+        created, _ = tracemalloc.get_traced_memory()
+        for task in tasks:
+            model.add_task(task)
+        queued, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    task_bytes = created - start - sys.getsizeof(tasks)
+    return {
+        "task": task_class.__name__,
+        "tasks": count,
+        "queued": len(model.tasks),
+        "bytes_per_task": task_bytes / count,
+        "bytes_per_queued_task": (task_bytes + queued - created) / count,
+    }
+
+
+def check_task_memory(results: List[Dict], thresholds: Dict[str, float]) -> List[Dict]:
+    """Compare bytes per task with their limits.
+
+    Args:
+        results (List[Dict]): Results of `bench_task_memory`.
+        thresholds (Dict[str, float]): Maximum bytes per task class.
+
+    Returns:
+        List[Dict]: Outcome of every check that had a measurement.
+
+    """
+    checks = []
+    for result in results:
+        limit = thresholds.get(result["task"])
+        if limit is None:
+            continue
+        checks.append({
+            "case": "task_memory",
+            "task": result["task"],
+            "metric": "bytes_per_task",
+            "limit": limit,
+            "value": result["bytes_per_task"],
+            "ok": result["bytes_per_task"] <= limit,
+        })
+    return checks
+
+
+def build_models(
+        nodes: int, tasks: int, connections: int,
+        seed: int = 0) -> List[ArtistModel]:
+    """Build artist models with tasks and connections.
+
+    Connections always lead from a node to one added later, so the graph
+    has no cycles.
+
+    Args:
+        nodes (int): Number of artists.
+        tasks (int): Number of tasks per artist.
+        connections (int): Number of connections.
+        seed (int, optional): Seed of the random connections. Defaults to 0.
+
+    Returns:
+        List[ArtistModel]: Artist models.
+
+    """
+    rng = random.Random(seed)
+    models = []
+    for i in range(nodes):
+        model = ArtistModel(level=1 + i % 3, x=(i % 40) * 100, y=(i // 40) * 120)
+        model.task_slots = max(tasks, model.task_slots)
+        for _ in range(tasks):
+            model.add_task(SimpleCompositingTask())
+        models.append(model)
+    for source, target in _get_edges(nodes, connections, rng):
+        models[source].connect(models[target])
+    return models
+
+
+def _get_edges(nodes: int, connections: int, rng: random.Random) -> List[Tuple[int, int]]:
+    if nodes < 2:
+        return []
+    edges = []
+    for _ in range(connections):
+        source = rng.randrange(nodes - 1)
+        edges.append((source, rng.randrange(source + 1, nodes)))
+    return edges
+
+
+def bench_model(nodes: int, tasks: int, connections: int, repeat: int) -> List[Measurement]:
+    """Measure the simulation without drawing.
+
+    Args:
+        nodes (int): Number of artists.
+        tasks (int): Number of tasks per artist.
+        connections (int): Number of connections.
+        repeat (int): How many times to time every operation.
+
+    Returns:
+        List[Measurement]: Cost of a fixed step tick, of an event
+            simulation step over one simulated hour, of laying out the
+            whole graph and of updating the layout for one connection.
+
+    """
+    results = []
+
+    simulation = Simulation(seed=0, flow=FlowEngine())
+    for model in build_models(nodes, tasks, connections):
+        simulation.add_node(model)
+    results.append(measure("tick", simulation.tick, nodes, tasks, connections, repeat))
+
+    events = EventSimulation(seed=0, flow=FlowEngine())
+    for model in build_models(nodes, tasks, connections):
+        events.add_node(model)
+    result = measure(
+        "event_step", lambda: events.step(1.0, sync=False),
+        nodes, tasks, connections, repeat)
+    result.extra["events"] = events.events
+    results.append(result)
+
+    layout = GraphLayout()
+    models = build_models(nodes, tasks, connections)
+    results.append(measure(
+        "layout", lambda: layout.layout(models), nodes, tasks, connections, repeat))
+    rng = random.Random(1)
+
+    def add_connection() -> None:
+        source, target = _get_edges(nodes, 1, rng)[0]
+        layout.add_connection(models[source].connect(models[target]))
+
+    if nodes > 1:
+        results.append(measure(
+            "relayout", add_connection, nodes, tasks, connections, repeat))
+    return results
+
+
+def bench_frame(nodes: int, tasks: int, connections: int, repeat: int) -> List[Measurement]:
+    """Measure updating and drawing views of the scene.
+
+    Every frame the simulation advances by 0.1 hour and a percent
+    of the nodes is dragged, which moves their connections too.
+
+    Args:
+        nodes (int): Number of artists.
+        tasks (int): Number of tasks per artist.
+        connections (int): Number of connections.
+        repeat (int): How many times to time every operation.
+
+    Returns:
+        List[Measurement]: Cost of the simulation update and of drawing.
+
+    """
+    import pyglet
+    from pipeliner.actors import Artist
+    from pipeliner.connection import Connection
+    from pipeliner.renderer import Renderer
+
+    renderer = Renderer()
+    simulation = EventSimulation(seed=0, flow=FlowEngine())
+    views = []
+    for model in build_models(nodes, tasks, 0):
+        views.append(Artist(renderer.batch, model=model))
+        simulation.add_node(model)
+    rng = random.Random(0)
+    lines = [
+        Connection(views[source], views[target], renderer.batch)
+        for source, target in _get_edges(nodes, connections, rng)
+    ]
+    dragged = views[::100]
+    renderer.draw(views)
+
+    def update() -> None:
+        simulation.step(0.1)
+        for view in dragged:
+            view.x += 1
+
+    def draw() -> None:
+        renderer.draw(views)
+
+    results = [
+        measure("update", update, nodes, tasks, connections, repeat),
+        measure("draw", draw, nodes, tasks, connections, repeat),
+    ]
+    gc.collect()
+    results[1].extra = {
+        **asdict(renderer.stats),
+        "shapes": sum(
+            1 for obj in gc.get_objects()
+            if isinstance(obj, pyglet.shapes.ShapeBase)),
+        "connections": len(lines),
+    }
+    return results
+
+
+#: Scene sizes and points per operation of the pick benchmark.
+PICK_SIZES = (100, 1000, 10000)
+PICK_POINTS = 100
+
+
+def bench_pick(nodes: int, repeat: int, seed: int = 0) -> List[Measurement]:
+    """Compare picking nodes through the node index with a linear scan.
+
+    Both pick the body under the same random points of the scene, one
+    operation picks `PICK_POINTS` points.
+
+    Args:
+        nodes (int): Number of artists.
+        repeat (int): How many times to time every operation.
+        seed (int, optional): Seed of the points. Defaults to 0.
+
+    Returns:
+        List[Measurement]: Cost of grid and linear picking, `extra` has
+            microseconds per pick and whether both found the same nodes.
+
+    """
+    from pipeliner.actors import Artist
+    from pipeliner.renderer import Renderer
+    from pipeliner.spatial import NodeIndex, Part
+
+    renderer = Renderer()
+    views = [Artist(renderer.batch, model=model) for model in build_models(nodes, 0, 0)]
+    index = NodeIndex()
+    for view in views:
+        view.sync()
+        index.add(view)
+    rng = random.Random(seed)
+    width = max(view.x for view in views) + 100
+    height = max(view.y for view in views) + 120
+    points = [(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(PICK_POINTS)]
+
+    def pick_linear(x: float, y: float):
+        # last added node wins, the same as in the index
+        for view in reversed(views):
+            bounds = view.get_bounds()
+            if bounds.x1 < x < bounds.x2 and bounds.y1 < y < bounds.y2:
+                return view
+        return None
+
+    def grid() -> None:
+        for x, y in points:
+            index.pick(x, y, Part.BODY)
+
+    def linear() -> None:
+        for x, y in points:
+            pick_linear(x, y)
+
+    same = all(index.pick(x, y, Part.BODY) is pick_linear(x, y) for x, y in points)
+    results = [
+        measure("pick_grid", grid, nodes, 0, 0, repeat),
+        measure("pick_linear", linear, nodes, 0, 0, repeat),
+    ]
+    for result in results:
+        result.extra = {"us_per_pick": result.mean_ms * 1000 / PICK_POINTS, "same": same}
+    return results
+
+
+def build_skewed_models(
+        peers: int, tasks: int, skew: float = 1.0,
+        seed: int = 0) -> List[ArtistModel]:
+    """Build a source artist feeding peers with a skewed share of tasks.
+
+    Peer i starts with a share of all tasks proportional to
+    1 / (i + 1) ** skew, tasks have random difficulty. The source has
+    no tasks of its own, it only makes the peers siblings.
+
+    Args:
+        peers (int): Number of artists sharing the source.
+        tasks (int): Number of tasks over all peers.
+        skew (float, optional): Exponent of the skew, 0 spreads tasks
+            evenly. Defaults to 1.0.
+        seed (int, optional): Seed of task difficulties. Defaults to 0.
+
+    Returns:
+        List[ArtistModel]: Source followed by the peers.
+
+    """
+    rng = random.Random(seed)
+    source = ArtistModel(x=0, y=0)
+    models = [source]
+    weights = [1.0 / (i + 1) ** skew for i in range(peers)]
+    total = sum(weights)
+    for i, weight in enumerate(weights):
+        model = ArtistModel(x=200, y=i * 120)
+        model.task_slots = tasks
+        for _ in range(round(tasks * weight / total)):
+            task = SimpleCompositingTask()
+            task.difficulty = rng.uniform(0.05, 0.6)
+            model.add_task(task)
+        source.connect(model)
+        models.append(model)
+    return models
+
+
+def bench_balance(
+        peers: int = 8, tasks: int = 400, skew: float = 1.0,
+        batch_size: int = 8, seed: int = 0) -> Dict:
+    """Compare static assignment with work stealing on a skewed workload.
+
+    Args:
+        peers (int, optional): Number of artists sharing a source.
+            Defaults to 8.
+        tasks (int, optional): Number of tasks over all peers.
+            Defaults to 400.
+        skew (float, optional): Skew of the assignment, see
+            `build_skewed_models`. Defaults to 1.0.
+        batch_size (int, optional): Tasks moved by one steal. Defaults to 8.
+        seed (int, optional): Seed of the scene and of task failures.
+            Defaults to 0.
+
+    Returns:
+        Dict: Makespan in simulated hours, throughput in tasks per hour
+            and wall time of both modes.
+
+    """
+    report: Dict = {"peers": peers, "tasks": tasks, "skew": skew}
+    for mode in ("static", "stealing"):
+        balancer = WorkStealer(batch_size=batch_size) if mode == "stealing" else None
+        simulation = EventSimulation(seed=seed, flow=FlowEngine(), balancer=balancer)
+        for model in build_skewed_models(peers, tasks, skew, seed):
+            simulation.add_node(model)
+        start = time.perf_counter()
+        simulation.step(1e9, sync=False)
+        wall_ms = (time.perf_counter() - start) * 1000
+        makespan = simulation.last_event_time
+        report[mode] = {
+            "makespan": makespan,
+            "delivered": simulation.flow.delivered,
+            "throughput": simulation.flow.delivered / makespan if makespan else 0.0,
+            "events": simulation.events,
+            "wall_ms": wall_ms,
+            "steals": balancer.steals if balancer else 0,
+            "stolen": balancer.stolen if balancer else 0,
+        }
+    stealing = report["stealing"]["makespan"]
+    report["speedup"] = report["static"]["makespan"] / stealing if stealing else 0.0
+    return report
+
+
+def get_limit(limits: Dict[int, float], nodes: int) -> Optional[float]:
+    """Get the limit of a case at a scene size.
+
+    Limits between two sizes are interpolated linearly. Smaller scenes
+    get the limit of the smallest size, fixed costs do not shrink with
+    the scene. Larger scenes get the limit per node of the largest size.
+
+    Args:
+        limits (Dict[int, float]): Limits of the case per number of nodes.
+        nodes (int): Number of nodes of the scene.
+
+    Returns:
+        Optional[float]: Maximum mean milliseconds or None if the case
+            has no limits.
+
+    """
+    if not limits:
+        return None
+    if nodes in limits:
+        return limits[nodes]
+    sizes = sorted(limits)
+    if nodes < sizes[0]:
+        return limits[sizes[0]]
+    if nodes > sizes[-1]:
+        return limits[sizes[-1]] * nodes / sizes[-1]
+    i = bisect_left(sizes, nodes)
+    low, high = sizes[i - 1], sizes[i]
+    share = (nodes - low) / (high - low)
+    return limits[low] + (limits[high] - limits[low]) * share
+
+
+def check_thresholds(
+        results: List[Measurement],
+        thresholds: Dict[str, Dict[int, float]]) -> Tuple[List[Dict], List[str]]:
+    """Compare measurements with their limits.
+
+    Args:
+        results (List[Measurement]): Measurements to check.
+        thresholds (Dict[str, Dict[int, float]]): Maximum mean milliseconds
+            per case and number of nodes.
+
+    Returns:
+        Tuple[List[Dict], List[str]]: Outcome of every check and warnings
+            about cases without limits, which were not checked.
+
+    """
+    checks = []
+    unchecked = []
+    for result in results:
+        limit = get_limit(thresholds.get(result.case, {}), result.nodes)
+        if limit is None:
+            if result.case not in unchecked:
+                unchecked.append(result.case)
+            continue
+        checks.append({
+            "case": result.case,
+            "nodes": result.nodes,
+            "metric": "mean_ms",
+            "limit": limit,
+            "value": result.mean_ms,
+            "ok": result.mean_ms <= limit,
+        })
+    warnings = [f"no threshold for case {case}, it was not checked" for case in unchecked]
+    return checks, warnings
+
+
+def run(
+        sizes: List[int], tasks: int, connections: float,
+        repeat: int = 10, model_only: bool = False,
+        thresholds: Optional[Dict[str, Dict[int, float]]] = None,
+        memory_tasks: int = 100000) -> Dict:
+    """Run all benchmarks for every scene size.
+
+    Args:
+        sizes (List[int]): Numbers of nodes to build scenes with.
+        tasks (int): Number of tasks per node.
+        connections (float): Number of connections per node.
+        repeat (int, optional): How many times to time every operation.
+            Defaults to 10.
+        model_only (bool, optional): Skip drawing. Defaults to False.
+        thresholds (Optional[Dict]): Limits to check, defaults to
+            `DEFAULT_THRESHOLDS`.
+        memory_tasks (int, optional): Number of tasks to measure memory
+            of. Defaults to 100000.
+
+    Returns:
+        Dict: Report with scaling curves of every case and threshold checks.
+
+    """
+    if thresholds is None:
+        thresholds = DEFAULT_THRESHOLDS
+    if not model_only:
+        import pyglet
+        pyglet.options["headless"] = True
+
+    results = []
+    for nodes in sizes:
+        edges = int(nodes * connections)
+        results += bench_model(nodes, tasks, edges, repeat)
+        if not model_only:
+            results += bench_frame(nodes, tasks, edges, repeat)
+
+    curves: Dict[str, List[Dict]] = {}
+    for result in results:
+        curves.setdefault(result.case, []).append(asdict(result))
+    checks, warnings = check_thresholds(results, thresholds)
+    task_memory = [
+        bench_task_memory(task_class, memory_tasks)
+        for task_class in (EmptyTask, SimpleCompositingTask)]
+    checks += check_task_memory(task_memory, TASK_MEMORY_THRESHOLDS)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "model_only": model_only,
+            "tasks": tasks,
+            "connections_per_node": connections,
+            "repeat": repeat,
+            "peak_rss_kb": _get_peak_rss_kb(),
+        },
+        "cases": curves,
+        "task_memory": task_memory,
+        "checks": checks,
+        "warnings": warnings,
+        "ok": all(check["ok"] for check in checks),
+    }
+
+
+def _get_peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _load_thresholds(path: str) -> Dict[str, Dict[int, float]]:
+    with open(path) as stream:
+        data = json.load(stream)
+    return {
+        case: {int(nodes): float(limit) for nodes, limit in limits.items()}
+        for case, limits in data.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run benchmarks from the command line.
+
+    Returns:
+        int: Exit code, 1 if any threshold check failed.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--tasks", type=int, default=6, help="tasks per node")
+    parser.add_argument(
+        "--connections", type=float, default=1.0, help="connections per node")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--model-only", action="store_true")
+    parser.add_argument("--thresholds", help="JSON file with limits per case and size")
+    parser.add_argument(
+        "--memory-tasks", type=int, default=100000,
+        help="tasks per class to measure memory of")
+    parser.add_argument(
+        "--pick", action="store_true",
+        help="compare the node index with a linear scan")
+    parser.add_argument(
+        "--balance", action="store_true",
+        help="compare static assignment with work stealing")
+    parser.add_argument("--output", help="write the report to a file")
+    args = parser.parse_args(argv)
+
+    thresholds = _load_thresholds(args.thresholds) if args.thresholds else None
+    report = run(
+        args.sizes, args.tasks, args.connections,
+        repeat=args.repeat, model_only=args.model_only, thresholds=thresholds,
+        memory_tasks=args.memory_tasks)
+    if args.pick:
+        import pyglet
+        pyglet.options["headless"] = True
+        pick: Dict[str, List[Dict]] = {}
+        for nodes in PICK_SIZES:
+            for result in bench_pick(nodes, args.repeat):
+                pick.setdefault(result.case, []).append(asdict(result))
+        report["pick"] = pick
+    if args.balance:
+        report["balance"] = [
+            bench_balance(skew=skew) for skew in (0.0, 1.0, 2.0)]
+    for warning in report["warnings"]:
+        print(f"warning: {warning}", file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(text)
+    else:
+        print(text)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
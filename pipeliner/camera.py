@@ -0,0 +1,249 @@
+"""Camera over the studio and culling of what it does not see.
+
+The camera pans and zooms the world layers of the renderer through the
+view matrix of the window, the HUD stays in place. `Culler` keeps bounds
+of nodes and connections in a spatial grid and every frame asks it for
+the ones overlapping the camera view. Only those are synced and drawn,
+the rest are hidden, so the cost of a frame depends on what is visible,
+not on the size of the studio. Zoomed out below `low_detail_zoom` nodes
+are drawn with low detail.
+
+Nodes are re-indexed when they move, which they report when synced. Nodes
+moved while hidden, for example by an automatic layout, need `refresh`.
+
+"""
+from typing import Dict, List, Set, Tuple
+
+import pyglet
+from pyglet.math import Mat4, Vec3
+
+from pipeliner.actors.node import Bounds, Detail, Node
+from pipeliner.connection import Connection
+from pipeliner.spatial import SpatialGrid
+
+
+class Camera(object):
+    """Pan and zoom of the world.
+
+    Properties:
+        window (pyglet.window.Window): Window the camera draws to.
+        x (float): World X coordinate at the left edge of the window.
+        y (float): World Y coordinate at the bottom edge of the window.
+        zoom (float): Window pixels per world unit.
+        min_zoom (float): Smallest zoom.
+        max_zoom (float): Largest zoom.
+
+    """
+    window: pyglet.window.Window
+    x: float
+    y: float
+    zoom: float
+    min_zoom: float
+    max_zoom: float
+
+    def __init__(
+            self, window: pyglet.window.Window,
+            x: float = 0.0, y: float = 0.0, zoom: float = 1.0,
+            min_zoom: float = 0.02, max_zoom: float = 4.0):
+        self.window = window
+        self.x = x
+        self.y = y
+        self.zoom = zoom
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+
+    @property
+    def view(self) -> Mat4:
+        """View matrix mapping world coordinates to the window."""
+        return (
+            Mat4.from_scale(Vec3(self.zoom, self.zoom, 1.0))
+            @ Mat4.from_translation(Vec3(-self.x, -self.y, 0.0)))
+
+    def to_world(self, x: float, y: float) -> Tuple[float, float]:
+        """Convert window coordinates to world coordinates.
+
+        Args:
+            x (float): X coordinate in the window.
+            y (float): Y coordinate in the window.
+
+        Returns:
+            Tuple[float, float]: Point in the world.
+
+        """
+        return self.x + x / self.zoom, self.y + y / self.zoom
+
+    def get_world_bounds(self) -> Bounds:
+        """Get part of the world the window shows.
+
+        Returns:
+            Bounds: Visible rectangle in world coordinates.
+
+        """
+        return Bounds(
+            self.x, self.y,
+            self.x + self.window.width / self.zoom,
+            self.y + self.window.height / self.zoom)
+
+    def pan(self, dx: float, dy: float) -> None:
+        """Move the view by window pixels.
+
+        Args:
+            dx (float): Horizontal movement in pixels.
+            dy (float): Vertical movement in pixels.
+
+        """
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+
+    def zoom_at(self, x: float, y: float, factor: float) -> None:
+        """Zoom keeping the world point under the window point in place.
+
+        Args:
+            x (float): X coordinate in the window, usually the mouse.
+            y (float): Y coordinate in the window, usually the mouse.
+            factor (float): Zoom multiplier, above 1 zooms in.
+
+        """
+        world_x, world_y = self.to_world(x, y)
+        self.zoom = min(self.max_zoom, max(self.min_zoom, self.zoom * factor))
+        self.x = world_x - x / self.zoom
+        self.y = world_y - y / self.zoom
+
+
+class Culler(object):
+    """Nodes and connections in the view of the camera.
+
+    Properties:
+        camera (Camera): Camera to cull by.
+        low_detail_zoom (float): Zoom below which nodes are drawn with
+            low detail.
+        margin (int): World units added around node bounds for parts
+            drawn outside of them, like ports and the task grid.
+
+        _nodes (SpatialGrid): Bounds of all nodes.
+        _connections (SpatialGrid): Bounds of all connections.
+        _node_connections (Dict[Node, List[Connection]]): Connections
+            from and to every node.
+        _visible_nodes (Set[Node]): Nodes drawn in the last update.
+        _visible_connections (Set[Connection]): Connections drawn in the
+            last update.
+
+    """
+    camera: Camera
+    low_detail_zoom: float
+    margin: int
+
+    _nodes: SpatialGrid
+    _connections: SpatialGrid
+    _node_connections: Dict[Node, List[Connection]]
+    _visible_nodes: Set[Node]
+    _visible_connections: Set[Connection]
+
+    def __init__(
+            self, camera: Camera, low_detail_zoom: float = 0.5,
+            margin: int = 48, cell_size: int = 256):
+        self.camera = camera
+        self.low_detail_zoom = low_detail_zoom
+        self.margin = margin
+        self._nodes = SpatialGrid(cell_size)
+        self._connections = SpatialGrid(cell_size)
+        self._node_connections = {}
+        self._visible_nodes = set()
+        self._visible_connections = set()
+
+    def add_node(self, node: Node) -> None:
+        """Start culling the node.
+
+        The node is hidden until `update` finds it in the view and synced
+        once so its ports and connections have their positions.
+
+        Args:
+            node (Node): Node to cull.
+
+        """
+        self._node_connections.setdefault(node, [])
+        node.detail = Detail.HIDDEN
+        node.sync()
+        node.add_position_listener(self.refresh)
+        self.refresh(node)
+
+    def remove_node(self, node: Node) -> None:
+        """Stop culling the node and its connections.
+
+        Args:
+            node (Node): Node to remove.
+
+        """
+        node.remove_position_listener(self.refresh)
+        for connection in list(self._node_connections.pop(node, ())):
+            self.remove_connection(connection)
+        self._nodes.remove(node)
+        self._visible_nodes.discard(node)
+
+    def add_connection(self, connection: Connection) -> None:
+        """Start culling the connection.
+
+        Args:
+            connection (Connection): Connection between culled nodes.
+
+        """
+        for node in (connection.source, connection.target):
+            self._node_connections.setdefault(node, []).append(connection)
+        self._connections.insert(connection, connection.get_bounds())
+        connection.detail = Detail.HIDDEN
+
+    def remove_connection(self, connection: Connection) -> None:
+        """Stop culling the connection.
+
+        Args:
+            connection (Connection): Connection to remove.
+
+        """
+        for node in (connection.source, connection.target):
+            connections = self._node_connections.get(node)
+            if connections and connection in connections:
+                connections.remove(connection)
+        if connection in self._connections:
+            self._connections.remove(connection)
+        self._visible_connections.discard(connection)
+
+    def refresh(self, node: Node) -> None:
+        """Re-index the node and its connections at their current position.
+
+        Args:
+            node (Node): Node that moved.
+
+        """
+        bounds = node.get_bounds()
+        margin = self.margin
+        self._nodes.insert(node, Bounds(
+            bounds.x1 - margin, bounds.y1 - margin,
+            bounds.x2 + margin, bounds.y2 + margin))
+        for connection in self._node_connections.get(node, ()):
+            self._connections.insert(connection, connection.get_bounds())
+
+    def update(self) -> List[Node]:
+        """Set level of detail of everything by the current camera view.
+
+        Returns:
+            List[Node]: Nodes in the view that need to be synced and drawn.
+
+        """
+        view = self.camera.get_world_bounds()
+        rect = (view.x1, view.y1, view.x2, view.y2)
+        detail = Detail.FULL if self.camera.zoom >= self.low_detail_zoom else Detail.LOW
+
+        nodes = self._nodes.query_rect(*rect)
+        for node in self._visible_nodes - nodes:
+            node.detail = Detail.HIDDEN
+        for node in nodes:
+            node.detail = detail
+        self._visible_nodes = nodes
+
+        connections = self._connections.query_rect(*rect)
+        for connection in self._visible_connections - connections:
+            connection.detail = Detail.HIDDEN
+        for connection in connections:
+            connection.detail = detail
+        self._visible_connections = connections
+        return list(nodes)
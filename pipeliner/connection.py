@@ -1,27 +1,47 @@
 """Class for connection between two nodes"""
-from pipeliner.actors import Node
-from pyglet.shapes import Line, Triangle, ShapeBase
+from pipeliner.actors import Detail, Node
+from pipeliner.actors.node import Bounds
+from pipeliner.edges import EdgeBuffer, EdgeSlot, get_edge_buffer
+from pipeliner.model import ConnectionModel
 import math
-from typing import List
+import pyglet
+from typing import Optional, Tuple
 
 
 class Connection(object):
+    """Arrow from the out port of the source to the in port of the target.
+
+    Connection is a view of the `ConnectionModel` between the models of
+    both nodes. Its line and arrow head live in a slot of the edge buffer
+    shared by all connections of the batch, see `pipeliner.edges`. The
+    slot is rewritten only when one of the connected nodes moves or the
+    level of detail changes. In low detail only the line is drawn.
+
+    """
     source: Node
     target: Node
+    model: ConnectionModel
+
+    _edges: EdgeBuffer
+    _slot: Optional[EdgeSlot]
+    _endpoints: Optional[Tuple]
 
-    def __init__(self, source: Node, target: Node, batch=None):
+    def __init__(self, source: Node, target: Node, batch=None,
+                 model: Optional[ConnectionModel] = None):
         self.source = source
         self.target = target
+        self.model = model if model is not None else source.model.connect(target.model)
         self.batch = batch
-        self._shapes = []
+        self.color = (50, 225, 30)
+        self._endpoints = None
+        self._detail = Detail.FULL
 
-        line = Line(
-            source.out_port_position.x, source.out_port_position.y,
-            target.in_port_position.x, target.in_port_position.y,
-            2, color=(50, 225, 30), batch=batch
-        )
+        self._edges = get_edge_buffer(batch or pyglet.graphics.get_default_batch())
+        self._slot = self._edges.allocate(self.color)
+        self._update_geometry()
 
-        self._shapes.append(line)
+        source.add_position_listener(self._on_node_moved)
+        target.add_position_listener(self._on_node_moved)
 
     def __repr__(self):
         return f"Connection: {self.source} -> {self.target}"
@@ -29,32 +49,78 @@ class Connection(object):
     def __str__(self):
         return f"Connection: {self.source} -> {self.target}"
 
-    def draw(self):
-        try:
-            for shape in self._shapes:
-                shape.draw()
-        except AttributeError as e:
-            print(self._shapes)
-            raise e
-
-    def update(self, delta_time: float):
-        self._shapes = self.get_arrow(
-                self.source.out_port_position.x, self.source.out_port_position.y,
-                self.target.in_port_position.x, self.target.in_port_position.y,
-                color=(50, 225, 30))
-
-    def get_arrow(self, x1: int, y1: int, x2: int, y2: int, color) -> List[ShapeBase]:
-        """Get shapes for end pointing arrow.
-        
+    @property
+    def detail(self) -> Detail:
+        return self._detail
+
+    @detail.setter
+    def detail(self, value: Detail) -> None:
+        if value == self._detail:
+            return
+        self._detail = value
+        self._write()
+
+    def get_bounds(self) -> Bounds:
+        """Get box around the line between the ports.
+
+        Returns:
+            Bounds: Bounds of the line.
+
+        """
+        start = self.source.out_port_position
+        end = self.target.in_port_position
+        return Bounds(
+            min(start.x, end.x), min(start.y, end.y),
+            max(start.x, end.x), max(start.y, end.y))
+
+    def delete(self) -> None:
+        """Disconnect nodes and free the slot of the edge."""
+        self.source.model.disconnect(self.model)
+        self.source.remove_position_listener(self._on_node_moved)
+        self.target.remove_position_listener(self._on_node_moved)
+        if self._slot is not None:
+            self._edges.free(self._slot)
+            self._slot = None
+
+    def _on_node_moved(self, node: Node) -> None:
+        self._update_geometry()
+
+    def _update_geometry(self) -> None:
+        """Move line and arrow head to the current port positions."""
+        endpoints = (
+            self.source.out_port_position.x, self.source.out_port_position.y,
+            self.target.in_port_position.x, self.target.in_port_position.y,
+        )
+        if endpoints == self._endpoints:
+            return
+        self._endpoints = endpoints
+        self._write()
+
+    def _write(self) -> None:
+        """Write parts of the edge drawn at the current level of detail."""
+        if self._slot is None:
+            return
+        line = head = None
+        if self._detail is not Detail.HIDDEN:
+            line = self._endpoints
+        if self._detail is Detail.FULL:
+            x1, y1, x2, y2 = self._endpoints
+            arrow_x1, arrow_y1, arrow_x2, arrow_y2 = self.get_arrow_head(x1, y1, x2, y2)
+            head = (arrow_x1, arrow_y1, x2, y2, arrow_x2, arrow_y2)
+        self._edges.write(self._slot, line, head)
+
+    @staticmethod
+    def get_arrow_head(x1: int, y1: int, x2: int, y2: int) -> Tuple[float, float, float, float]:
+        """Get base corners of the arrow head pointing to the end point.
+
         Args:
             x1 (int): x coordinate of start point
             y1 (int): y coordinate of start point
             x2 (int): x coordinate of end point
             y2 (int): y coordinate of end point
-            color (tuple): color of arrow
 
         Returns:
-            List[ShapeBase]: list of shapes for arrow
+            Tuple[float, float, float, float]: x and y of both base corners
 
         """
         arrow_size=10
@@ -67,9 +133,4 @@ class Connection(object):
         arrow_y1 = y2 - arrow_size * math.sin(angle - math.pi/6)
         arrow_x2 = x2 - arrow_size * math.cos(angle + math.pi/6)
         arrow_y2 = y2 - arrow_size * math.sin(angle + math.pi/6)
-        
-        return [
-            Line(x=x1, y=y1, x2=x2, y2=y2, color=color, batch=self.batch),
-            # draw arrow head
-            Triangle(arrow_x1, arrow_y1, x2, y2, arrow_x2, arrow_y2, color=color, batch=self.batch),
-        ]
\ No newline at end of file
+        return arrow_x1, arrow_y1, arrow_x2, arrow_y2
@@ -4,4 +4,13 @@ TASK_PADDING = 2
 
 # nodes
 ARTIST_DEFAULT_TASK_SLOTS = 10
-ARTIST_DEFAULT_WORK_HOURS = 8
\ No newline at end of file
+ARTIST_DEFAULT_WORK_HOURS = 8
+
+
+# simulation
+TASK_BASE_HOURS = 1.0
+TASK_DIFFICULTY_HOURS = 8.0
+LEVEL_DIFFICULTY_FACTOR = 0.8
+FAILURE_RATE_FACTOR = 0.2
+# progress this close to 1 counts as finished, absorbs float error of ticks
+PROGRESS_EPSILON = 1e-6
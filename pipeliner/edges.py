@@ -0,0 +1,204 @@
+"""Vertices of all connection edges in one growable vertex list.
+
+Every connection owns a slot of the buffer - a line drawn as a thin quad
+followed by the triangle of its arrow head. Slots are written in place
+when an end of the connection moves, hidden parts are written as
+degenerate triangles. Freed slots are filled with the last slot, so the
+used slots are always packed at the start of the buffer, and the buffer
+halves once it is mostly empty. All edges of the batch are drawn with
+a single call no matter how many connections there are.
+
+"""
+import math
+import pyglet
+from pyglet.gl import GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA, GL_TRIANGLES
+from typing import List, Optional, Sequence, Tuple
+
+from pipeliner.renderer import Layer, get_layer
+
+_LINE_VERTICES = 6
+_HEAD_VERTICES = 3
+_VERTICES_PER_SLOT = _LINE_VERTICES + _HEAD_VERTICES
+
+_EMPTY_LINE = (0.0,) * (_LINE_VERTICES * 2)
+_EMPTY_HEAD = (0.0,) * (_HEAD_VERTICES * 2)
+
+
+def _line_quad(x1: float, y1: float, x2: float, y2: float, width: float) -> Tuple:
+    length = math.hypot(x2 - x1, y2 - y1)
+    if not length:
+        return _EMPTY_LINE
+    # half width offset perpendicular to the line
+    nx = (y1 - y2) / length * width / 2
+    ny = (x2 - x1) / length * width / 2
+    return (
+        x1 - nx, y1 - ny, x2 - nx, y2 - ny, x2 + nx, y2 + ny,
+        x1 - nx, y1 - ny, x2 + nx, y2 + ny, x1 + nx, y1 + ny)
+
+
+class EdgeSlot(object):
+    """Place of one edge in the buffer.
+
+    Properties:
+        index (int): Index of the slot, changes when the buffer compacts.
+
+    """
+    index: int
+
+    def __init__(self, index: int):
+        self.index = index
+
+
+class EdgeBuffer(object):
+    """Growable vertex list of edge slots.
+
+    Properties:
+        capacity (int): Number of slots the vertex list has room for.
+        line_width (float): Width of the edge lines.
+
+        _slots (List[EdgeSlot]): Used slots in the order of their indices.
+        _vertex_list: Vertex list of all slots, None until the first slot
+            is allocated.
+
+    """
+    capacity: int
+    line_width: float
+
+    _slots: List[EdgeSlot]
+
+    def __init__(
+            self, batch: pyglet.graphics.Batch,
+            group: Optional[pyglet.graphics.Group] = None,
+            capacity: int = 64, line_width: float = 1.0):
+        self.capacity = capacity
+        self.line_width = line_width
+        self._min_capacity = capacity
+        self._batch = batch
+        self._group = pyglet.shapes.ShapeBase.group_class(
+            GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+            pyglet.shapes.get_default_shader(), group)
+        self._slots = []
+        self._vertex_list = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _resize(self, capacity: int) -> None:
+        vertices = capacity * _VERTICES_PER_SLOT
+        if self._vertex_list is None:
+            self._vertex_list = self._group.program.vertex_list(
+                vertices, GL_TRIANGLES, self._batch, self._group,
+                colors=("Bn", (0, 0, 0, 0) * vertices),
+                translation=("f", (0, 0) * vertices))
+        else:
+            used = len(self._slots) * _VERTICES_PER_SLOT
+            self._vertex_list.resize(vertices)
+            # resize keeps only the old contents, unused vertices are degenerate
+            self._vertex_list.position[used * 2:] = (0,) * ((vertices - used) * 2)
+            self._vertex_list.translation[used * 2:] = (0,) * ((vertices - used) * 2)
+        self.capacity = capacity
+
+    def allocate(self, color: Sequence[int]) -> EdgeSlot:
+        """Get a new slot, growing the buffer if it is full.
+
+        Slot is empty until its edge is written.
+
+        Args:
+            color (Sequence[int]): RGB or RGBA color of the edge.
+
+        Returns:
+            EdgeSlot: Slot of the edge.
+
+        """
+        if self._vertex_list is None:
+            self._resize(self.capacity)
+        elif len(self._slots) == self.capacity:
+            self._resize(self.capacity * 2)
+        slot = EdgeSlot(len(self._slots))
+        self._slots.append(slot)
+        self.set_color(slot, color)
+        return slot
+
+    def free(self, slot: EdgeSlot) -> None:
+        """Release the slot, moving the last slot in its place.
+
+        Args:
+            slot (EdgeSlot): Slot to release.
+
+        """
+        last = self._slots.pop()
+        vertex_list = self._vertex_list
+        start = last.index * _VERTICES_PER_SLOT
+        end = start + _VERTICES_PER_SLOT
+        if last is not slot:
+            target = slot.index * _VERTICES_PER_SLOT
+            vertex_list.position[target * 2:(target + _VERTICES_PER_SLOT) * 2] = (
+                vertex_list.position[start * 2:end * 2])
+            vertex_list.colors[target * 4:(target + _VERTICES_PER_SLOT) * 4] = (
+                vertex_list.colors[start * 4:end * 4])
+            last.index = slot.index
+            self._slots[slot.index] = last
+        vertex_list.position[start * 2:end * 2] = _EMPTY_LINE + _EMPTY_HEAD
+        slot.index = -1
+
+        if self.capacity > self._min_capacity and len(self._slots) <= self.capacity // 4:
+            self._resize(max(self._min_capacity, self.capacity // 2))
+
+    def set_color(self, slot: EdgeSlot, color: Sequence[int]) -> None:
+        """Color the whole edge.
+
+        Args:
+            slot (EdgeSlot): Slot of the edge.
+            color (Sequence[int]): RGB or RGBA color.
+
+        """
+        r, g, b, *a = color
+        start = slot.index * _VERTICES_PER_SLOT * 4
+        self._vertex_list.colors[start:start + _VERTICES_PER_SLOT * 4] = (
+            (r, g, b, a[0] if a else 255) * _VERTICES_PER_SLOT)
+
+    def write(
+            self, slot: EdgeSlot,
+            line: Optional[Tuple[float, float, float, float]],
+            head: Optional[Tuple[float, float, float, float, float, float]]) -> None:
+        """Write geometry of the edge.
+
+        Args:
+            slot (EdgeSlot): Slot of the edge.
+            line (Optional[Tuple]): Start and end point of the line,
+                None hides the line.
+            head (Optional[Tuple]): Three corners of the arrow head,
+                None hides the head.
+
+        """
+        line_quad = _line_quad(*line, self.line_width) if line is not None else _EMPTY_LINE
+        start = slot.index * _VERTICES_PER_SLOT * 2
+        self._vertex_list.position[start:start + _VERTICES_PER_SLOT * 2] = (
+            line_quad + (head if head is not None else _EMPTY_HEAD))
+
+    def delete(self) -> None:
+        """Remove all edges from the batch."""
+        if self._vertex_list is not None:
+            self._vertex_list.delete()
+            self._vertex_list = None
+        for slot in self._slots:
+            slot.index = -1
+        self._slots = []
+        self.capacity = self._min_capacity
+
+
+def get_edge_buffer(batch: pyglet.graphics.Batch) -> EdgeBuffer:
+    """Get edge buffer of the batch.
+
+    Args:
+        batch (pyglet.graphics.Batch): Batch the edges are drawn in.
+
+    Returns:
+        EdgeBuffer: Buffer shared by all connections of the batch.
+
+    """
+    try:
+        return batch.pipeliner_edges
+    except AttributeError:
+        batch.pipeliner_edges = EdgeBuffer(batch, get_layer(Layer.CONNECTIONS))
+        return batch.pipeliner_edges
@@ -0,0 +1,29 @@
+from .connection import ConnectionModel
+from .workqueue import (
+    DeadlineFirstPolicy, FifoPolicy, SchedulingPolicy, ShortestFirstPolicy, TaskQueue)
+from .node import Dirty, NodeModel
+from .artist import ArtistModel
+from .simulation import Simulation
+from .events import EventSimulation
+from .flow import FlowEngine
+from .arrivals import TaskSource
+from .balance import WorkStealer
+from .layout import GraphLayout
+
+__all__ = [
+    "ConnectionModel",
+    "Dirty",
+    "NodeModel",
+    "ArtistModel",
+    "Simulation",
+    "EventSimulation",
+    "FlowEngine",
+    "TaskSource",
+    "WorkStealer",
+    "GraphLayout",
+    "TaskQueue",
+    "SchedulingPolicy",
+    "FifoPolicy",
+    "ShortestFirstPolicy",
+    "DeadlineFirstPolicy",
+]
@@ -0,0 +1,361 @@
+"""Steady-state throughput of the node graph.
+
+Every node can finish a limited number of tasks per hour given by its
+production rate, level and the difficulty of the task. Tasks enter the
+graph at nodes without incoming connections and leave it at nodes
+without outgoing connections, so the most the pipeline can deliver is
+the maximum flow of the graph with node capacities. Nodes on the minimum
+cut are the bottlenecks - making any other node faster does not help.
+
+Connections do not limit how many tasks pass through them, task slots
+only buffer work, so only nodes can be bottlenecks. The result is an upper
+bound - routing tasks round robin reaches less of it the more unbalanced
+the branches are.
+
+Work flowing through the graph is a task mix - a share and difficulty
+of every task type. Capacity of a node is its rate on the mix of the
+types it accepts, tasks per hour weighted by their share. The flow is
+still a single one, every node is assumed to see the same mix, so a
+node accepting only some of the types is rated on those types alone
+and tasks of other types routed around it are not modelled.
+
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Tuple, Union
+
+from pipeliner.model.node import NodeModel
+from pipeliner.tasks import Task
+from pipeliner.tasks.type import TaskType
+
+_EPSILON = 1e-9
+
+#: Difficulty and share of every task type flowing through the graph.
+#: Shares are relative, they do not need to sum to 1.
+TaskMix = Mapping[TaskType, Tuple[float, float]]
+
+
+class _FlowNetwork(object):
+    """Residual network solved with Dinic's algorithm."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.edges: List[List] = [[] for _ in range(size)]
+
+    def add_edge(self, source: int, target: int, capacity: float) -> List:
+        forward = [target, capacity, None]
+        backward = [source, 0.0, forward]
+        forward[2] = backward
+        self.edges[source].append(forward)
+        self.edges[target].append(backward)
+        return forward
+
+    def _levels(self, source: int, sink: int) -> Optional[List[int]]:
+        levels = [-1] * self.size
+        levels[source] = 0
+        queue = deque([source])
+        while queue:
+            vertex = queue.popleft()
+            for target, capacity, _ in self.edges[vertex]:
+                if capacity > _EPSILON and levels[target] < 0:
+                    levels[target] = levels[vertex] + 1
+                    queue.append(target)
+        return levels if levels[sink] >= 0 else None
+
+    def _augment(self, source: int, sink: int,
+                 levels: List[int], next_edge: List[int]) -> float:
+        # iterative depth first search, long pipelines would overflow
+        # the recursion limit
+        path = []
+        vertex = source
+        while vertex != sink:
+            edges = self.edges[vertex]
+            while next_edge[vertex] < len(edges):
+                edge = edges[next_edge[vertex]]
+                if edge[1] > _EPSILON and levels[edge[0]] == levels[vertex] + 1:
+                    break
+                next_edge[vertex] += 1
+            else:
+                if not path:
+                    return 0.0
+                vertex = path.pop()[2][0]
+                next_edge[vertex] += 1
+                continue
+            path.append(edge)
+            vertex = edge[0]
+        pushed = min(edge[1] for edge in path)
+        for edge in path:
+            edge[1] -= pushed
+            edge[2][1] += pushed
+        return pushed
+
+    def max_flow(self, source: int, sink: int) -> float:
+        total = 0.0
+        while True:
+            levels = self._levels(source, sink)
+            if levels is None:
+                return total
+            next_edge = [0] * self.size
+            while True:
+                pushed = self._augment(source, sink, levels, next_edge)
+                if pushed <= _EPSILON:
+                    break
+                total += pushed
+
+    def reachable(self, source: int) -> List[bool]:
+        seen = [False] * self.size
+        seen[source] = True
+        queue = deque([source])
+        while queue:
+            vertex = queue.popleft()
+            for target, capacity, _ in self.edges[vertex]:
+                if capacity > _EPSILON and not seen[target]:
+                    seen[target] = True
+                    queue.append(target)
+        return seen
+
+
+@dataclass
+class Throughput:
+    """Result of the throughput analysis.
+
+    Properties:
+        throughput (float): Tasks per hour the pipeline can deliver.
+        bottlenecks (List[NodeModel]): Nodes on the minimum cut.
+        capacity (Dict[NodeModel, float]): Tasks per hour every node can do.
+        load (Dict[NodeModel, float]): Tasks per hour passing every node
+            at the maximum throughput.
+
+    """
+    throughput: float = 0.0
+    bottlenecks: List[NodeModel] = field(default_factory=list)
+    capacity: Dict[NodeModel, float] = field(default_factory=dict)
+    load: Dict[NodeModel, float] = field(default_factory=dict)
+
+    def get_utilization(self, node: NodeModel) -> float:
+        """Get share of the node capacity used at the maximum throughput.
+
+        Args:
+            node (NodeModel): Node to get the utilization of.
+
+        Returns:
+            float: Utilization between 0 and 1.
+
+        """
+        capacity = self.capacity.get(node, 0.0)
+        return self.load.get(node, 0.0) / capacity if capacity > 0 else 0.0
+
+
+def get_task_mix(task: Task) -> Dict[TaskType, Tuple[float, float]]:
+    """Get mix of tasks all like the given one.
+
+    Args:
+        task (Task): Task representing all of the work.
+
+    Returns:
+        Dict[TaskType, Tuple[float, float]]: Mix with the type and
+            difficulty of the task only.
+
+    """
+    return {task.type: (task.difficulty, 1.0)}
+
+
+def _get_mix_tasks(mix: Union[Task, TaskMix]) -> List[Tuple[Task, float]]:
+    """Get a task standing for every type of the mix with its share.
+
+    Raises:
+        ValueError: If a share is negative.
+
+    """
+    if isinstance(mix, Task):
+        return [(mix, 1.0)]
+    tasks = []
+    for task_type, (difficulty, share) in mix.items():
+        if share < 0:
+            raise ValueError(f"Negative share {share} of {task_type.name} tasks")
+        if share > 0:
+            task = Task(task_type.name)
+            task.type = task_type
+            task.difficulty = difficulty
+            tasks.append((task, share))
+    return tasks
+
+
+def _get_mix_key(mix: Union[Task, TaskMix]) -> Tuple:
+    if isinstance(mix, Task):
+        mix = get_task_mix(mix)
+    return tuple(sorted(
+        (task_type.code, difficulty, share)
+        for task_type, (difficulty, share) in mix.items()))
+
+
+def _get_capacity(node: NodeModel, tasks: List[Tuple[Task, float]]) -> float:
+    shares = 0.0
+    hours = 0.0
+    for task, share in tasks:
+        if node.accepts(task):
+            shares += share
+            hours += share * node.get_task_hours(task)
+    return shares / hours if hours > 0 else 0.0
+
+
+def get_capacity(node: NodeModel, mix: Union[Task, TaskMix]) -> float:
+    """Get how many tasks of the mix the node finishes per hour.
+
+    Only types the node accepts count, the rate is the share weighted
+    number of them finished per hour.
+
+    Args:
+        node (NodeModel): Node to get the capacity of.
+        mix (Union[Task, TaskMix]): Mix of the work flowing through the
+            graph or a task representing all of it.
+
+    Returns:
+        float: Tasks per hour, 0 if the node accepts no type of the mix.
+
+    Raises:
+        ValueError: If a share is negative.
+
+    """
+    return _get_capacity(node, _get_mix_tasks(mix))
+
+
+def analyze_throughput(
+        nodes: Iterable[NodeModel], mix: Union[Task, TaskMix]) -> Throughput:
+    """Compute maximum throughput and bottlenecks of the graph.
+
+    Args:
+        nodes (Iterable[NodeModel]): Nodes of the graph, connections to
+            other nodes are ignored.
+        mix (Union[Task, TaskMix]): Mix of the work flowing through the
+            graph or a task representing all of it.
+
+    Returns:
+        Throughput: Result of the analysis.
+
+    Raises:
+        ValueError: If a share is negative.
+
+    """
+    nodes = list(nodes)
+    tasks = _get_mix_tasks(mix)
+    index = {node: i for i, node in enumerate(nodes)}
+    # every node is split to its input 2i and output 2i + 1 vertex
+    # joined by an edge with the node capacity
+    source = 2 * len(nodes)
+    sink = source + 1
+    network = _FlowNetwork(sink + 1)
+    unlimited = float("inf")
+
+    result = Throughput()
+    node_edges = []
+    for i, node in enumerate(nodes):
+        capacity = _get_capacity(node, tasks)
+        result.capacity[node] = capacity
+        node_edges.append(network.add_edge(2 * i, 2 * i + 1, capacity))
+        targets = [c.target for c in node.connections if c.target in index]
+        if not any(c.source in index for c in node.inputs):
+            network.add_edge(source, 2 * i, unlimited)
+        if not targets:
+            network.add_edge(2 * i + 1, sink, unlimited)
+        for target in targets:
+            network.add_edge(2 * i + 1, 2 * index[target], unlimited)
+
+    if not nodes:
+        return result
+    result.throughput = network.max_flow(source, sink)
+    reachable = network.reachable(source)
+    for i, node in enumerate(nodes):
+        result.load[node] = result.capacity[node] - node_edges[i][1]
+        if reachable[2 * i] and not reachable[2 * i + 1]:
+            result.bottlenecks.append(node)
+    return result
+
+
+class ThroughputAnalyzer(object):
+    """Throughput analysis cached until the graph changes.
+
+    Analyzer listens to changes of the analyzed nodes. A change marks the
+    cached result dirty only if it changed what the analysis depends on -
+    level, production rate, accepted types or connections of the node.
+    Adding tasks notifies the same listeners but keeps the result, so a
+    cache hit costs only a check that the node set and the mix are the
+    same. The mix can be changed in place, it is compared by its types,
+    difficulties and shares.
+
+    Properties:
+        mix (Union[Task, TaskMix]): Mix of the work flowing through the
+            graph or a task representing all of it.
+
+        _nodes (List[NodeModel]): Analyzed nodes the analyzer listens to.
+        _params (Dict[NodeModel, Tuple]): Parameters of every node the
+            cached result was computed with.
+        _mix_key (Optional[Tuple]): Types, difficulties and shares of the
+            mix the cached result was computed with.
+        _dirty (bool): Cached result is out of date.
+        _result (Optional[Throughput]): Cached result.
+
+    """
+    mix: Union[Task, TaskMix]
+
+    _nodes: List[NodeModel]
+    _params: Dict[NodeModel, Tuple]
+    _mix_key: Optional[Tuple]
+    _dirty: bool
+    _result: Optional[Throughput]
+
+    def __init__(self, mix: Union[Task, TaskMix]):
+        self.mix = mix
+        self._nodes = []
+        self._params = {}
+        self._mix_key = None
+        self._dirty = True
+        self._result = None
+
+    @staticmethod
+    def _get_params(node: NodeModel) -> Tuple[Hashable, ...]:
+        return (
+            node.level, node.production_rate, node.accept_mask,
+            tuple(c.target for c in node.connections),
+            tuple(c.source for c in node.inputs),
+        )
+
+    def _on_node_changed(self, node: NodeModel) -> None:
+        if not self._dirty and self._get_params(node) != self._params.get(node):
+            self._dirty = True
+
+    def _watch(self, nodes: List[NodeModel]) -> None:
+        for node in self._nodes:
+            node.remove_change_listener(self._on_node_changed)
+        self._nodes = nodes
+        for node in nodes:
+            node.add_change_listener(self._on_node_changed)
+        self._dirty = True
+
+    def close(self) -> None:
+        """Stop listening to the analyzed nodes."""
+        self._watch([])
+
+    def analyze(self, nodes: Iterable[NodeModel]) -> Throughput:
+        """Get throughput of the graph, computing it only if it changed.
+
+        Args:
+            nodes (Iterable[NodeModel]): Nodes of the graph.
+
+        Returns:
+            Throughput: Result of the analysis.
+
+        Raises:
+            ValueError: If a share of the mix is negative.
+
+        """
+        nodes = list(nodes)
+        if nodes != self._nodes:
+            self._watch(nodes)
+        mix_key = _get_mix_key(self.mix)
+        if self._dirty or mix_key != self._mix_key:
+            self._result = analyze_throughput(nodes, self.mix)
+            self._params = {node: self._get_params(node) for node in nodes}
+            self._mix_key = mix_key
+            self._dirty = False
+        return self._result
@@ -0,0 +1,230 @@
+"""Streaming sources of incoming tasks.
+
+Work arriving at the studio over months does not have to exist as task
+objects up front. A `TaskSource` pulls arrivals lazily from any iterator,
+for example a JSONL or CSV log read line by line, and adds each task to
+its node once the simulated time reaches the arrival. Arrivals for nodes
+without a free task slot wait in a bounded window. When the window is
+full the source stops pulling until the nodes make room, so memory stays
+flat no matter how long the stream is.
+
+Every record of a log has the arrival time in simulated hours, the index
+of the target node and the task class name or id, optionally the task
+name and difficulty::
+
+    {"time": 1.5, "node": 0, "task": "SimpleCompositingTask"}
+
+    time,node,task,name,difficulty
+    1.5,0,SimpleCompositingTask,shot_010,0.3
+
+"""
+import csv
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+from pipeliner.model.node import NodeModel
+from pipeliner.tasks import Task, get_task_class
+
+
+@dataclass
+class TaskArrival:
+    """Task arriving at a node.
+
+    Properties:
+        time (float): Simulated hours of the arrival.
+        node (int): Index of the node receiving the task.
+        task (Task): Arriving task.
+
+    """
+    time: float
+    node: int
+    task: Task
+
+
+def parse_arrival(record: Mapping) -> TaskArrival:
+    """Create arrival from a log record.
+
+    Args:
+        record (Mapping): Record with `time`, `node` and `task` and
+            optional `name` and `difficulty`. Values may be strings.
+
+    Returns:
+        TaskArrival: Arrival with a new task.
+
+    Raises:
+        ValueError: If the record is missing a field or names an unknown
+            task class.
+
+    """
+    try:
+        key = record["task"]
+        time = float(record["time"])
+        node = int(record["node"])
+    except KeyError as error:
+        raise ValueError(f"Arrival record is missing {error}") from None
+    if isinstance(key, str) and key.isdigit():
+        key = int(key)
+    try:
+        cls = get_task_class(key)
+    except KeyError:
+        raise ValueError(f"Unknown task class {key!r}") from None
+
+    task = cls(record["name"]) if record.get("name") else cls()
+    if record.get("difficulty") not in (None, ""):
+        task.difficulty = float(record["difficulty"])
+    return TaskArrival(time, node, task)
+
+
+def read_jsonl(path: str) -> Iterator[TaskArrival]:
+    """Read arrivals lazily from a file with a JSON record per line.
+
+    Args:
+        path (str): Path of the file.
+
+    Yields:
+        TaskArrival: Arrivals in the order of the file.
+
+    """
+    with open(path) as stream:
+        for line in stream:
+            if line.strip():
+                yield parse_arrival(json.loads(line))
+
+
+def read_csv(path: str) -> Iterator[TaskArrival]:
+    """Read arrivals lazily from a CSV file with a header row.
+
+    Args:
+        path (str): Path of the file.
+
+    Yields:
+        TaskArrival: Arrivals in the order of the file.
+
+    """
+    with open(path, newline="") as stream:
+        for record in csv.DictReader(stream):
+            yield parse_arrival(record)
+
+
+class TaskSource(object):
+    """Feeds nodes with tasks pulled lazily from a stream of arrivals.
+
+    Arrivals are expected in time order. Tasks of a node are added in
+    the order they arrived, an arrival waits while an earlier one for the
+    same node is still waiting.
+
+    Properties:
+        nodes (Sequence[NodeModel]): Nodes arrivals refer to by index.
+        window (int): Most arrivals kept waiting for a free task slot.
+        added (int): Tasks added to nodes.
+        rejected (int): Arrivals dropped because their node can never
+            accept the task or does not exist.
+
+        _arrivals (Iterator[TaskArrival]): Arrivals not pulled yet.
+        _next (Optional[TaskArrival]): Pulled arrival not due yet.
+        _waiting (Dict[NodeModel, Deque[TaskArrival]]): Due arrivals
+            waiting for a free slot of their node.
+        _waiting_count (int): Number of waiting arrivals.
+
+    """
+    nodes: Sequence[NodeModel]
+    window: int
+    added: int
+    rejected: int
+
+    _arrivals: Iterator[TaskArrival]
+    _next: Optional[TaskArrival]
+    _waiting: Dict[NodeModel, Deque[TaskArrival]]
+    _waiting_count: int
+
+    def __init__(
+            self, arrivals: Iterable[TaskArrival],
+            nodes: Sequence[NodeModel], window: int = 1024):
+        self.nodes = nodes
+        self.window = window
+        self.added = 0
+        self.rejected = 0
+        self._arrivals = iter(arrivals)
+        self._next = None
+        self._waiting = {}
+        self._waiting_count = 0
+        self._exhausted = False
+
+    @property
+    def waiting(self) -> int:
+        """Number of due arrivals waiting for a free task slot."""
+        return self._waiting_count
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether every arrival was pulled and added or rejected."""
+        return self._exhausted and self._next is None and not self._waiting_count
+
+    @property
+    def next_time(self) -> Optional[float]:
+        """Time of the next arrival that can be pulled.
+
+        None if the stream ended or the window of waiting arrivals is full.
+
+        """
+        if self._waiting_count >= self.window:
+            return None
+        arrival = self._peek()
+        return arrival.time if arrival is not None else None
+
+    def _peek(self) -> Optional[TaskArrival]:
+        if self._next is None and not self._exhausted:
+            self._next = next(self._arrivals, None)
+            self._exhausted = self._next is None
+        return self._next
+
+    def _get_node(self, arrival: TaskArrival) -> Optional[NodeModel]:
+        if not 0 <= arrival.node < len(self.nodes):
+            return None
+        node = self.nodes[arrival.node]
+        if not node.accepts(arrival.task) or node.task_slots < 1:
+            return None
+        return node
+
+    def _retry(self) -> int:
+        added = 0
+        for node, queue in list(self._waiting.items()):
+            while queue and node.add_task(queue[0].task):
+                queue.popleft()
+                added += 1
+            if not queue:
+                del self._waiting[node]
+        self._waiting_count -= added
+        return added
+
+    def feed(self, time: float) -> int:
+        """Add tasks of all arrivals due until the time.
+
+        Waiting arrivals are retried first, new ones are pulled until an
+        arrival is not due yet or the window is full.
+
+        Args:
+            time (float): Current simulated hours.
+
+        Returns:
+            int: Number of tasks added to nodes.
+
+        """
+        added = self._retry() if self._waiting_count else 0
+        while self._waiting_count < self.window:
+            arrival = self._peek()
+            if arrival is None or arrival.time > time:
+                break
+            self._next = None
+            node = self._get_node(arrival)
+            if node is None:
+                self.rejected += 1
+            elif node not in self._waiting and node.add_task(arrival.task):
+                added += 1
+            else:
+                self._waiting.setdefault(node, deque()).append(arrival)
+                self._waiting_count += 1
+        self.added += added
+        return added
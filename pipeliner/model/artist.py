@@ -0,0 +1,44 @@
+"""Simulation model of the Artist node."""
+from pipeliner.constants import ARTIST_DEFAULT_TASK_SLOTS, ARTIST_DEFAULT_WORK_HOURS
+from pipeliner.model.node import NodeModel
+from pipeliner.tasks.type import (
+    EmptyTaskType,
+    CompositingTaskType,
+    RenderingTaskType,
+    ModelingTaskType,
+    RotoscopingTaskType,
+)
+
+
+class ArtistModel(NodeModel):
+    """Generalist Artist that can do any task."""
+
+    def __init__(self, level: int = 1, x: int = 0, y: int = 0):
+        super().__init__(level, x, y)
+        self.work_hours = ARTIST_DEFAULT_WORK_HOURS
+        self.current_hour = 0
+
+        self.task_slots = ARTIST_DEFAULT_TASK_SLOTS
+        self.accept_types = {
+            EmptyTaskType, CompositingTaskType, RenderingTaskType,
+            ModelingTaskType, RotoscopingTaskType
+        }
+
+        self.provide_types = {
+            EmptyTaskType, CompositingTaskType, RenderingTaskType,
+            ModelingTaskType, RotoscopingTaskType
+        }
+
+    def level_up(self) -> None:
+        """Level up the node.
+        
+        This method calculates the new production rate and work hours
+        for the node.
+
+        Todo:
+            This method should be moved to the base class.
+
+        """
+        self.level += 1
+        self.production_rate += 0.5
+        self.work_hours += 1
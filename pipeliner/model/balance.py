@@ -0,0 +1,150 @@
+"""Work stealing between artists fed by the same source.
+
+Flow spreads finished tasks round robin between the targets of a node,
+but tasks differ in difficulty and artists differ in level, so some
+targets end up with a long queue while their siblings sit idle. With
+a `WorkStealer` given to the simulation, an idle node takes waiting
+tasks from the busiest of its peers - nodes that share a source
+connection with it - and works on them itself.
+
+Tasks are stolen in batches of up to half of the waiting tasks of the
+victim, so a single steal evens out the two queues and stealing does not
+happen on every event. Only tasks whose types the thief accepts are
+taken and only as many as fit its free slots. Tasks that already started
+are never stolen.
+
+"""
+from typing import Iterable, List, Optional
+
+from pipeliner.model.node import Dirty, NodeModel
+
+
+class WorkStealer(object):
+    """Load balancing by idle nodes stealing waiting tasks from peers.
+
+    Properties:
+        batch_size (int): Maximum number of tasks moved by a single steal.
+        threshold (int): Minimum number of waiting tasks a peer needs
+            to be stolen from.
+        steals (int): Number of steals that moved at least one task.
+        stolen (int): Number of tasks moved between nodes.
+
+    """
+    batch_size: int
+    threshold: int
+    steals: int
+    stolen: int
+
+    def __init__(self, batch_size: int = 8, threshold: int = 2):
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.steals = 0
+        self.stolen = 0
+
+    @staticmethod
+    def get_peers(node: NodeModel) -> List[NodeModel]:
+        """Get nodes sharing a source connection with the node.
+
+        Args:
+            node (NodeModel): Node to get the peers of.
+
+        Returns:
+            List[NodeModel]: Other targets of the sources of the node.
+
+        """
+        peers = []
+        seen = {node}
+        for connection in node.inputs:
+            for sibling in connection.source.connections:
+                target = sibling.target
+                if target not in seen:
+                    seen.add(target)
+                    peers.append(target)
+        return peers
+
+    @staticmethod
+    def is_idle(node: NodeModel) -> bool:
+        """Check if the node has nothing to work on.
+
+        Args:
+            node (NodeModel): Node to check.
+
+        Returns:
+            bool: True if the node has no current and no waiting task.
+
+        """
+        return node.current_task is None and not node.queue.ready
+
+    def _find_victim(self, node: NodeModel) -> Optional[NodeModel]:
+        mask = node.accept_mask
+        victim = None
+        most = self.threshold - 1
+        for peer in self.get_peers(node):
+            waiting = peer.queue.count_ready_matching(mask)
+            if waiting > most:
+                victim = peer
+                most = waiting
+        return victim
+
+    def steal(self, node: NodeModel) -> int:
+        """Move waiting tasks from the busiest peer to the node.
+
+        Args:
+            node (NodeModel): Thief, usually an idle node.
+
+        Returns:
+            int: Number of stolen tasks.
+
+        """
+        free = node.queue.free_slots
+        if not free:
+            return 0
+        victim = self._find_victim(node)
+        if victim is None:
+            return 0
+        waiting = victim.queue.count_ready_matching(node.accept_mask)
+        count = min(self.batch_size, free, max(1, waiting // 2))
+        tasks = victim.queue.take(node.accept_mask, count)
+        if not tasks:
+            return 0
+        victim.dirty |= Dirty.TASKS
+        for task in tasks:
+            node.add_task(task)
+        self.steals += 1
+        self.stolen += len(tasks)
+        return len(tasks)
+
+    def balance(self, node: NodeModel) -> int:
+        """Let the node and its peers steal work if they are idle.
+
+        Called after the node finished a task, which is when it or its
+        siblings may have run out of work.
+
+        Args:
+            node (NodeModel): Node whose work changed.
+
+        Returns:
+            int: Number of stolen tasks.
+
+        """
+        stolen = 0
+        for candidate in [node, *self.get_peers(node)]:
+            if self.is_idle(candidate):
+                stolen += self.steal(candidate)
+        return stolen
+
+    def balance_all(self, nodes: Iterable[NodeModel]) -> int:
+        """Let every idle node steal work.
+
+        Args:
+            nodes (Iterable[NodeModel]): Nodes to balance.
+
+        Returns:
+            int: Number of stolen tasks.
+
+        """
+        stolen = 0
+        for node in nodes:
+            if node.inputs and self.is_idle(node):
+                stolen += self.steal(node)
+        return stolen
@@ -0,0 +1,18 @@
+"""Simulation model of a connection between two nodes."""
+
+
+class ConnectionModel(object):
+    """Directed connection from the source node to the target node.
+
+    Properties:
+        source (NodeModel): Node providing tasks.
+        target (NodeModel): Node accepting tasks.
+
+    """
+
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+
+    def __repr__(self):
+        return f"ConnectionModel: {self.source} -> {self.target}"
@@ -0,0 +1,266 @@
+"""Discrete-event simulation of the studio.
+
+Instead of advancing every node by a fixed time step, the simulation
+keeps a priority queue with the time every busy node finishes its current
+task and jumps straight from one such event to the next. Idle nodes have
+no events at all and cost nothing no matter how long the simulated span is.
+
+Between events nodes only progress linearly, so bringing them to any time
+in between - for example the time of the frame being drawn - does not
+process any events. The working day wraps around with the hour, it does
+not change what the node works on so it needs no events of its own.
+
+"""
+import heapq
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pipeliner.constants import PROGRESS_EPSILON
+from pipeliner.model.arrivals import TaskSource
+from pipeliner.model.balance import WorkStealer
+from pipeliner.model.connection import ConnectionModel
+from pipeliner.model.flow import FlowEngine
+from pipeliner.model.node import NodeModel
+from pipeliner.tasks import FailedState
+
+
+class EventSimulation(object):
+    """Discrete-event simulation of node models.
+
+    Every node is brought up to date lazily, when it has an event, when
+    its work changes or when it is synced for drawing.
+
+    Properties:
+        time (float): Simulated hours since the start.
+        events (int): Number of events processed.
+        finished (int): Number of tasks finished by nodes.
+        failed (int): Number of finished tasks that failed.
+        last_event_time (float): Time of the last processed event.
+        nodes (List[NodeModel]): Simulated nodes.
+        rng (random.Random): Random generator of the simulation.
+        flow (Optional[FlowEngine]): Engine routing finished tasks along
+            connections, tasks stay in their nodes without it.
+        sources (List[TaskSource]): Streams of tasks arriving at nodes.
+        balancer (Optional[WorkStealer]): Load balancing letting idle
+            peers of a node steal tasks after it finished one.
+
+        _queue (List[Tuple]): Heap of (time, sequence, node, version) of
+            scheduled task completions.
+        _versions (Dict[NodeModel, int]): Version of the live event of every
+            node, queued events with other versions are stale.
+        _synced (Dict[NodeModel, Tuple[float, Optional[float]]]): Time each
+            node was last brought up to date and the hours its current task
+            needed at that time.
+
+    """
+    time: float
+    events: int
+    finished: int
+    failed: int
+    last_event_time: float
+    nodes: List[NodeModel]
+    rng: random.Random
+    flow: Optional[FlowEngine]
+    sources: List[TaskSource]
+    balancer: Optional[WorkStealer]
+
+    _queue: List[Tuple[float, int, NodeModel, int]]
+    _versions: Dict[NodeModel, int]
+    _synced: Dict[NodeModel, Tuple[float, Optional[float]]]
+
+    def __init__(
+            self, seed: Optional[int] = None, flow: Optional[FlowEngine] = None,
+            balancer: Optional[WorkStealer] = None):
+        self.time = 0.0
+        self.events = 0
+        self.finished = 0
+        self.failed = 0
+        self.last_event_time = 0.0
+        self.nodes = []
+        self.rng = random.Random(seed)
+        self.flow = flow
+        self.sources = []
+        self.balancer = balancer
+        self._queue = []
+        self._sequence = 0
+        self._versions = {}
+        self._synced = {}
+
+    @property
+    def connections(self) -> List[ConnectionModel]:
+        """All connections between simulated nodes."""
+        return [
+            connection
+            for node in self.nodes
+            for connection in node.connections
+        ]
+
+    @property
+    def next_event_time(self) -> Optional[float]:
+        """Time of the next event or None if all nodes are idle."""
+        while self._queue:
+            time, _, node, version = self._queue[0]
+            if self._versions.get(node) == version:
+                return time
+            heapq.heappop(self._queue)
+        return None
+
+    def add_node(self, node: NodeModel) -> NodeModel:
+        """Add node to the simulation.
+
+        Args:
+            node (NodeModel): Node to add.
+
+        Returns:
+            NodeModel: Added node.
+
+        """
+        self.nodes.append(node)
+        self._versions[node] = 0
+        self._synced[node] = (self.time, None)
+        node.add_change_listener(self.wake)
+        self.wake(node)
+        return node
+
+    def add_source(self, source: TaskSource) -> TaskSource:
+        """Add stream of arriving tasks.
+
+        Every arrival is added to its node at the simulated time it
+        arrives, waiting arrivals are retried whenever a node finished
+        a task.
+
+        Args:
+            source (TaskSource): Source to add.
+
+        Returns:
+            TaskSource: Added source.
+
+        """
+        self.sources.append(source)
+        source.feed(self.time)
+        return source
+
+    def _next_arrival_time(self) -> Optional[float]:
+        times = [
+            time for time in (source.next_time for source in self.sources)
+            if time is not None
+        ]
+        return min(times) if times else None
+
+    def remove_node(self, node: NodeModel) -> None:
+        """Remove node and all connections to it from the simulation.
+
+        Args:
+            node (NodeModel): Node to remove.
+
+        """
+        node.remove_change_listener(self.wake)
+        self.nodes.remove(node)
+        del self._versions[node]
+        del self._synced[node]
+        for connection in list(node.connections):
+            node.disconnect(connection)
+        for connection in list(node.inputs):
+            connection.source.disconnect(connection)
+
+    def _sync_node(self, node: NodeModel) -> None:
+        synced_time, task_hours = self._synced[node]
+        if self.time > synced_time:
+            node.advance(self.time - synced_time, task_hours)
+        task = node.current_task
+        self._synced[node] = (
+            self.time, node.get_task_hours(task) if task is not None else None)
+
+    def _schedule(self, node: NodeModel) -> None:
+        version = self._versions[node] + 1
+        self._versions[node] = version
+        task = node.current_task
+        if task is None:
+            return
+        _, task_hours = self._synced[node]
+        finish = self.time + max(0.0, 1.0 - task.progress) * task_hours
+        self._sequence += 1
+        heapq.heappush(self._queue, (finish, self._sequence, node, version))
+
+    def wake(self, node: NodeModel) -> None:
+        """Bring the node up to date and reschedule its next event.
+
+        Called by the node whenever its work changes, it can be called
+        any time the node was changed from outside of the simulation.
+
+        Args:
+            node (NodeModel): Node to wake.
+
+        """
+        self._sync_node(node)
+        if node.current_task is None and node._start_next_task() is not None:
+            self._sync_node(node)
+        self._schedule(node)
+
+    def _finish(self, node: NodeModel) -> None:
+        self._sync_node(node)
+        task = node.current_task
+        if task is not None and task.progress >= 1.0 - PROGRESS_EPSILON:
+            task.progress = 1.0
+            node._finish_task(task, self.rng)
+            self.finished += 1
+            if isinstance(task.state, FailedState):
+                self.failed += 1
+        self.wake(node)
+
+    def step(self, delta_time: float, sync: bool = True) -> int:
+        """Advance the simulation by delta_time.
+
+        All events and task arrivals due until the new time are
+        processed in order.
+
+        Args:
+            delta_time (float): Time to advance.
+            sync (bool, optional): Bring all nodes to the new time so they
+                can be drawn. Defaults to True.
+
+        Returns:
+            int: Number of events processed.
+
+        """
+        end = self.time + delta_time
+        processed = 0
+        while True:
+            next_time = self.next_event_time
+            arrival_time = self._next_arrival_time() if self.sources else None
+            if arrival_time is not None and arrival_time <= end and (
+                    next_time is None or arrival_time < next_time):
+                self.time = max(self.time, arrival_time)
+                for source in self.sources:
+                    source.feed(self.time)
+                continue
+            if next_time is None or next_time > end:
+                break
+            _, _, node, _ = heapq.heappop(self._queue)
+            self.time = max(self.time, next_time)
+            self.last_event_time = self.time
+            self._finish(node)
+            if self.flow is not None:
+                self.flow.release(node)
+            if self.balancer is not None:
+                self.balancer.balance(node)
+            for source in self.sources:
+                if source.waiting:
+                    source.feed(self.time)
+            processed += 1
+        self.time = end
+        self.events += processed
+        if sync:
+            self.sync()
+        return processed
+
+    def sync(self, nodes: Optional[Iterable[NodeModel]] = None) -> None:
+        """Bring nodes to the current time without processing events.
+
+        Args:
+            nodes (Optional[Iterable[NodeModel]]): Nodes to bring up to
+                date, for example only the visible ones. Defaults to all.
+
+        """
+        for node in self.nodes if nodes is None else nodes:
+            self._sync_node(node)
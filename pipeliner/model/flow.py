@@ -0,0 +1,273 @@
+"""Routing of finished tasks along connections.
+
+Finished tasks are pushed from a node to the targets of its connections.
+Target accepts a task only if it has a free task slot and accepts the
+task type, so task slots work as a bounded queue. A task nobody can take
+stays in its node and keeps occupying a slot - the node then cannot take
+tasks from upstream either and the backpressure travels up the pipeline.
+
+Tasks finished by nodes without outgoing connections leave the pipeline
+and are counted as delivered.
+
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from pipeliner.model.connection import ConnectionModel
+from pipeliner.model.node import NodeModel
+from pipeliner.tasks import DoneStatus, NotStartedState, ReadyStatus, Task
+
+
+def get_components(nodes: Iterable[NodeModel]) -> Dict[NodeModel, int]:
+    """Find strongly connected components of the graph.
+
+    Nodes of a component can all reach each other, so every cycle lies
+    within a single component. Connections to other nodes are ignored.
+
+    Args:
+        nodes (Iterable[NodeModel]): Nodes of the graph.
+
+    Returns:
+        Dict[NodeModel, int]: Component number of every node.
+
+    """
+    nodes = list(nodes)
+    members = set(nodes)
+    index: Dict[NodeModel, int] = {}
+    low: Dict[NodeModel, int] = {}
+    components: Dict[NodeModel, int] = {}
+    stack = []
+    on_stack = set()
+    count = 0
+    # iterative Tarjan, long pipelines would overflow the recursion limit
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        path = [(root, iter(root.connections))]
+        while path:
+            node, connections = path[-1]
+            for connection in connections:
+                target = connection.target
+                if target not in members:
+                    continue
+                if target not in index:
+                    index[target] = low[target] = len(index)
+                    stack.append(target)
+                    on_stack.add(target)
+                    path.append((target, iter(target.connections)))
+                    break
+                if target in on_stack:
+                    low[node] = min(low[node], index[target])
+            else:
+                path.pop()
+                if path:
+                    parent = path[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        components[member] = count
+                        if member is node:
+                            break
+                    count += 1
+    return components
+
+
+def get_topological_order(
+        nodes: Iterable[NodeModel],
+        cycle_edges: Optional[List[ConnectionModel]] = None) -> List[NodeModel]:
+    """Order nodes so every node comes before the targets of its connections.
+
+    Nodes in cycles can not be ordered that way. When only nodes in or
+    behind cycles are left, a node of a cycle no other remaining cycle
+    leads to is taken as if its remaining incoming connections did not
+    exist, preferring nodes given earlier. Those connections close a
+    cycle, they stay within the cycle and are the only ones leading from
+    a later node to an earlier one. Nodes behind a cycle always come
+    after it.
+
+    Args:
+        nodes (Iterable[NodeModel]): Nodes to order.
+        cycle_edges (Optional[List[ConnectionModel]]): Filled with the
+            connections closing a cycle.
+
+    Returns:
+        List[NodeModel]: Ordered nodes.
+
+    """
+    nodes = list(nodes)
+    members = set(nodes)
+    degrees = {
+        node: sum(1 for c in node.inputs if c.source in members)
+        for node in nodes
+    }
+    ready = deque(node for node in nodes if not degrees[node])
+    order = []
+    ordered = set()
+    # components and candidates to break a cycle in are found only once
+    # a cycle blocks the order
+    components: Optional[Dict[NodeModel, int]] = None
+    outside: Dict[int, int] = {}
+    component_nodes: Dict[int, List[NodeModel]] = {}
+    candidates: deque = deque()
+    while len(order) < len(nodes):
+        if not ready:
+            if components is None:
+                components = get_components(nodes)
+                for node in nodes:
+                    component = components[node]
+                    component_nodes.setdefault(component, []).append(node)
+                    outside.setdefault(component, 0)
+                    if node not in ordered:
+                        outside[component] += sum(
+                            1 for c in node.inputs
+                            if c.source in members and c.source not in ordered
+                            and components[c.source] != component)
+                candidates.extend(
+                    node for node in nodes
+                    if node not in ordered and not outside[components[node]])
+            node = candidates.popleft()
+            while node in ordered:
+                node = candidates.popleft()
+            if cycle_edges is not None:
+                cycle_edges.extend(
+                    c for c in node.inputs
+                    if c.source in members and c.source not in ordered)
+            degrees[node] = 0
+            ready.append(node)
+        node = ready.popleft()
+        order.append(node)
+        ordered.add(node)
+        for connection in node.connections:
+            target = connection.target
+            if target not in members:
+                continue
+            # targets already taken by breaking a cycle go below zero
+            degrees[target] -= 1
+            if not degrees[target]:
+                ready.append(target)
+            if components is not None:
+                component = components[target]
+                if component != components[node]:
+                    outside[component] -= 1
+                    if not outside[component]:
+                        candidates.extend(component_nodes[component])
+    return order
+
+
+class FlowEngine(object):
+    """Moves finished tasks along connections.
+
+    Targets of a node are tried round robin, so work is spread between
+    parallel branches.
+
+    Properties:
+        delivered (int): Tasks that left the pipeline through its sinks.
+        moved (int): Tasks moved between nodes.
+
+        _next_target (Dict[NodeModel, int]): Index of the connection
+            tried first for every node.
+
+    """
+    delivered: int
+    moved: int
+
+    _next_target: Dict[NodeModel, int]
+
+    def __init__(self):
+        self.delivered = 0
+        self.moved = 0
+        self._next_target = {}
+
+    def route(self, nodes: Iterable[NodeModel]) -> int:
+        """Route finished tasks of all nodes in a single pass.
+
+        Nodes are visited from the end of the pipeline, so space freed
+        downstream is available to upstream nodes in the same pass.
+
+        Args:
+            nodes (Iterable[NodeModel]): Nodes to route.
+
+        Returns:
+            int: Number of tasks that moved or were delivered.
+
+        """
+        routed = 0
+        for node in reversed(get_topological_order(nodes)):
+            routed += self.push(node)
+        return routed
+
+    def release(self, node: NodeModel) -> int:
+        """Route finished tasks of the node and of the nodes it unblocks.
+
+        Every node that got a free slot gives its sources a chance to push
+        their finished tasks, so a single finished task can release
+        a whole chain of blocked nodes.
+
+        Args:
+            node (NodeModel): Node whose tasks changed.
+
+        Returns:
+            int: Number of tasks that moved or were delivered.
+
+        """
+        routed = 0
+        pending = deque([node])
+        while pending:
+            node = pending.popleft()
+            count = self.push(node)
+            if not count:
+                continue
+            routed += count
+            pending.extend(connection.source for connection in node.inputs)
+        return routed
+
+    def push(self, node: NodeModel) -> int:
+        """Move finished tasks of the node to its targets.
+
+        Args:
+            node (NodeModel): Node to push tasks from.
+
+        Returns:
+            int: Number of tasks that moved or were delivered.
+
+        """
+        finished = [
+            task for task in node.tasks
+            if isinstance(task.status, DoneStatus) and task is not node.current_task
+        ]
+        if not finished:
+            return 0
+
+        if not node.connections:
+            gone = set(finished)
+            self.delivered += len(gone)
+        else:
+            gone = set()
+            for task in finished:
+                if node.provides(task) and self._hand_off(node, task):
+                    gone.add(task)
+            self.moved += len(gone)
+        if gone:
+            node.remove_tasks(gone)
+        return len(gone)
+
+    def _hand_off(self, node: NodeModel, task: Task) -> bool:
+        connections = node.connections
+        first = self._next_target.get(node, 0)
+        for i in range(len(connections)):
+            index = (first + i) % len(connections)
+            target = connections[index].target
+            if not target.can_accept(task):
+                continue
+            self._next_target[node] = index + 1
+            task.state = NotStartedState()
+            task.status = ReadyStatus()
+            task.progress = 0.0
+            target.add_task(task)
+            return True
+        return False
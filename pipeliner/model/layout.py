@@ -0,0 +1,309 @@
+"""Automatic layout of the connection graph.
+
+Tasks flow from the OUT port on the right of a node to the IN port on the
+left of the next one, so nodes are laid out in layers from left to right:
+
+1. Every node gets a layer one right of its rightmost source, the longest
+   path from the start of the pipeline. Connections closing a cycle are
+   ignored, they are found by `get_topological_order`, the same order
+   tasks are routed in.
+2. Nodes in a layer are ordered by the barycenter of their neighbors in
+   the previous and next layer, sweeping a few times in both directions,
+   which untangles most crossing connections.
+3. Force directed refinement moves nodes vertically. Connections pull
+   nodes towards their neighbors, nodes close to each other push apart.
+   Repulsion is only short range - nodes are bucketed in a grid of
+   cells one node spacing high, and a node only looks at the cells next
+   to its own - so an iteration costs linear time instead of quadratic.
+4. Remaining overlaps in a layer are removed by a single sweep.
+
+Nodes stay on the column of their layer, so connections keep running
+from left to right.
+
+A single added connection usually moves only a few nodes. `add_connection`
+recomputes the layers, which is cheap, runs refinement only on nodes
+whose layer changed and the two connected nodes and puts them into the
+nearest free gap of their column. Everything else stays where it is.
+
+"""
+from bisect import bisect_right, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from pipeliner.model.connection import ConnectionModel
+from pipeliner.model.flow import get_topological_order
+from pipeliner.model.node import NodeModel
+
+
+class GraphLayout(object):
+    """Layered left to right layout of nodes with force refinement.
+
+    Properties:
+        layer_spacing (float): Horizontal distance between layers.
+        node_spacing (float): Minimum vertical distance between nodes in
+            a layer.
+        iterations (int): Number of force refinement iterations.
+        sweeps (int): Number of barycenter ordering sweeps.
+        origin (Tuple[float, float]): Position of the middle of the
+            first layer.
+        layers (Dict[NodeModel, int]): Layer of every laid out node.
+
+        _nodes (List[NodeModel]): Laid out nodes.
+
+    """
+    layer_spacing: float
+    node_spacing: float
+    iterations: int
+    sweeps: int
+    origin: Tuple[float, float]
+    layers: Dict[NodeModel, int]
+
+    _nodes: List[NodeModel]
+
+    def __init__(
+            self, layer_spacing: float = 200, node_spacing: float = 112,
+            iterations: int = 12, sweeps: int = 4,
+            origin: Tuple[float, float] = (32, 0)):
+        self.layer_spacing = layer_spacing
+        self.node_spacing = node_spacing
+        self.iterations = iterations
+        self.sweeps = sweeps
+        self.origin = origin
+        self.layers = {}
+        self._nodes = []
+
+    @staticmethod
+    def get_layers(nodes: Sequence[NodeModel]) -> Dict[NodeModel, int]:
+        """Assign every node a layer one right of its rightmost source.
+
+        Connections to nodes outside of the given ones and connections
+        closing a cycle are ignored.
+
+        Args:
+            nodes (Sequence[NodeModel]): Nodes to assign layers to.
+
+        Returns:
+            Dict[NodeModel, int]: Layer of every node, starting with 0.
+
+        """
+        cycle_edges = []
+        order = get_topological_order(nodes, cycle_edges)
+        closing = set(cycle_edges)
+        layers = dict.fromkeys(order, 0)
+        for node in order:
+            layer = layers[node] + 1
+            for connection in node.connections:
+                target = connection.target
+                if target in layers and connection not in closing and layers[target] < layer:
+                    layers[target] = layer
+        return layers
+
+    def layout(self, nodes: Sequence[NodeModel]) -> None:
+        """Move all nodes to a new layout.
+
+        Args:
+            nodes (Sequence[NodeModel]): Nodes to lay out, connections
+                to other nodes are ignored.
+
+        """
+        self._nodes = list(nodes)
+        self.layers = self.get_layers(self._nodes)
+        columns = self._order_layers(self._nodes)
+        positions = {}
+        for layer, column in enumerate(columns):
+            x = self.origin[0] + layer * self.layer_spacing
+            top = self.origin[1] + (len(column) - 1) * self.node_spacing / 2
+            for i, node in enumerate(column):
+                positions[node] = [x, top - i * self.node_spacing]
+        neighbors = self._get_neighbors(self._nodes)
+        self._refine(positions, neighbors, self._nodes)
+        self._remove_overlaps(positions, columns)
+        self._apply(positions, self._nodes)
+
+    def add_connection(self, connection: ConnectionModel) -> List[NodeModel]:
+        """Update the layout after a connection was added.
+
+        Only nodes whose layer changed and the connected nodes move, to
+        the free place in their column nearest to where refinement wants
+        them.
+
+        Args:
+            connection (ConnectionModel): Added connection.
+
+        Returns:
+            List[NodeModel]: Nodes that moved.
+
+        """
+        for node in (connection.source, connection.target):
+            if node not in self.layers:
+                self._nodes.append(node)
+        old_layers = self.layers
+        self.layers = self.get_layers(self._nodes)
+        changed = [
+            node for node in self._nodes
+            if old_layers.get(node) != self.layers[node]]
+        for node in (connection.source, connection.target):
+            if node not in changed:
+                changed.append(node)
+
+        neighbors = self._get_neighbors(self._nodes)
+        positions = {node: [node.x, node.y] for node in self._nodes}
+        changed_set = set(changed)
+        for node in changed:
+            position = positions[node]
+            position[0] = self.origin[0] + self.layers[node] * self.layer_spacing
+            placed = [positions[other][1] for other in neighbors[node]
+                      if other not in changed_set]
+            if placed:
+                position[1] = sum(placed) / len(placed)
+        self._refine(positions, neighbors, changed)
+
+        columns = defaultdict(list)
+        for node in self._nodes:
+            if node not in changed_set:
+                columns[self.layers[node]].append(positions[node][1])
+        for column in columns.values():
+            column.sort()
+        for node in changed:
+            column = columns[self.layers[node]]
+            y = self._find_gap(positions[node][1], column)
+            positions[node][1] = y
+            insort(column, y)
+        moved = [
+            node for node in changed
+            if (node.x, node.y) != tuple(round(value) for value in positions[node])]
+        self._apply(positions, moved)
+        return moved
+
+    def _find_gap(self, y: float, column: List[float]) -> float:
+        """Get the place nearest to y at least a node spacing from others.
+
+        Args:
+            y (float): Wanted vertical position.
+            column (List[float]): Sorted positions of nodes in the column.
+
+        Returns:
+            float: Free vertical position.
+
+        """
+        spacing = self.node_spacing
+        best = None
+        for candidate in (y, *(other + spacing for other in column),
+                          *(other - spacing for other in column)):
+            if best is not None and abs(candidate - y) >= abs(best - y):
+                continue
+            i = bisect_right(column, candidate - spacing)
+            if i == len(column) or column[i] >= candidate + spacing:
+                best = candidate
+        return best
+
+    def _get_neighbors(self, nodes: Sequence[NodeModel]) -> Dict[NodeModel, List[NodeModel]]:
+        neighbors = {node: [] for node in nodes}
+        for node in nodes:
+            for connection in node.connections:
+                target = connection.target
+                if target in neighbors and target is not node:
+                    neighbors[node].append(target)
+                    neighbors[target].append(node)
+        return neighbors
+
+    def _order_layers(self, nodes: Sequence[NodeModel]) -> List[List[NodeModel]]:
+        """Order nodes in every layer by barycenters of their neighbors."""
+        layers = self.layers
+        columns = [[] for _ in range(max(layers.values(), default=-1) + 1)]
+        for node in nodes:
+            columns[layers[node]].append(node)
+        sources = defaultdict(list)
+        targets = defaultdict(list)
+        for node in nodes:
+            for connection in node.connections:
+                target = connection.target
+                if layers.get(target, -1) > layers[node]:
+                    sources[target].append(node)
+                    targets[node].append(target)
+
+        # columns are centered, so compare offsets from the middle
+        index = {}
+        for column in columns:
+            middle = (len(column) - 1) / 2
+            index.update((node, i - middle) for i, node in enumerate(column))
+        for sweep in range(self.sweeps):
+            if sweep % 2 == 0:
+                order, adjacent = columns[1:], sources
+            else:
+                order, adjacent = reversed(columns[:-1]), targets
+            for column in order:
+                keys = {}
+                for node in column:
+                    others = adjacent[node]
+                    if others:
+                        keys[node] = sum(index[other] for other in others) / len(others)
+                    else:
+                        keys[node] = index[node]
+                column.sort(key=keys.__getitem__)
+                middle = (len(column) - 1) / 2
+                index.update((node, i - middle) for i, node in enumerate(column))
+        return columns
+
+    def _refine(
+            self, positions: Dict[NodeModel, List[float]],
+            neighbors: Dict[NodeModel, List[NodeModel]],
+            movable: Sequence[NodeModel]) -> None:
+        """Move movable nodes vertically by spring and repulsion forces."""
+        spacing = self.node_spacing
+        layers = self.layers
+        step = spacing
+        # only columns of movable nodes can push them
+        columns = {layers[node] for node in movable}
+        column_positions = [
+            (layers[node], position) for node, position in positions.items()
+            if layers[node] in columns]
+        for _ in range(self.iterations):
+            grid = defaultdict(list)
+            for layer, position in column_positions:
+                grid[layer, int(position[1] // spacing)].append(position)
+            moves = []
+            for node in movable:
+                position = positions[node]
+                y = position[1]
+                force = 0.0
+                others = neighbors[node]
+                if others:
+                    force = (sum(positions[other][1] for other in others) / len(others) - y) / 2
+                layer = layers[node]
+                cell = int(y // spacing)
+                for row in (cell - 1, cell, cell + 1):
+                    for other in grid.get((layer, row), ()):
+                        if other is position:
+                            continue
+                        distance = y - other[1]
+                        if -spacing < distance < spacing:
+                            if distance >= 0:
+                                force += (spacing - distance) / 2
+                            else:
+                                force -= (spacing + distance) / 2
+                moves.append((position, max(-step, min(step, force))))
+            for position, move in moves:
+                position[1] += move
+            # cool down so the layout settles
+            step *= 0.8
+
+    def _remove_overlaps(
+            self, positions: Dict[NodeModel, List[float]],
+            columns: Iterable[List[NodeModel]]) -> None:
+        """Push nodes in every column down until they are far enough apart."""
+        spacing = self.node_spacing
+        for column in columns:
+            column = sorted(column, key=lambda node: -positions[node][1])
+            for above, below in zip(column, column[1:]):
+                limit = positions[above][1] - spacing
+                if positions[below][1] > limit:
+                    positions[below][1] = limit
+
+    @staticmethod
+    def _apply(positions: Dict[NodeModel, List[float]], nodes: Iterable[NodeModel]) -> None:
+        for node in nodes:
+            x, y = positions[node]
+            node.x = round(x)
+            node.y = round(y)
+
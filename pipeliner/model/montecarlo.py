@@ -0,0 +1,240 @@
+"""Monte Carlo runs of a pipeline layout.
+
+Nodes fail tasks randomly, so a single simulation of a layout says
+little about how it performs. The runner simulates the same scene many
+times with different seeds in a pool of worker processes and aggregates
+throughput, completion time and failure rate of all runs.
+
+The scene is pickled once and every worker unpickles a fresh copy of it
+for each run, so only seeds and small results travel between processes.
+Every run depends only on its seed, results do not depend on the number
+of workers or the order runs finish in.
+
+"""
+import math
+import os
+import pickle
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence
+
+from pipeliner.model.events import EventSimulation
+from pipeliner.model.flow import FlowEngine
+from pipeliner.model.node import NodeModel
+
+#: z-score of the 95% confidence interval of the mean
+_Z95 = 1.959964
+
+
+@dataclass
+class RunResult:
+    """Outcome of a single simulation run.
+
+    Properties:
+        seed (int): Seed of the run.
+        delivered (int): Tasks that left the pipeline.
+        finished (int): Tasks finished by nodes, including failed ones.
+        failed (int): Tasks nodes failed.
+        completion_time (Optional[float]): Hours until the last event,
+            None if the pipeline was still busy at the end of the run.
+        hours (float): Simulated hours.
+
+    """
+    seed: int
+    delivered: int
+    finished: int
+    failed: int
+    completion_time: Optional[float]
+    hours: float
+
+    @property
+    def throughput(self) -> float:
+        """Delivered tasks per hour."""
+        span = self.completion_time if self.completion_time else self.hours
+        return self.delivered / span if span else 0.0
+
+    @property
+    def failure_rate(self) -> float:
+        """Share of finished tasks that failed."""
+        return self.failed / self.finished if self.finished else 0.0
+
+
+@dataclass
+class Distribution:
+    """Summary of a value measured over many runs.
+
+    Properties:
+        count (int): Number of values.
+        mean (float): Mean value.
+        stdev (float): Sample standard deviation.
+        minimum (float): Smallest value.
+        maximum (float): Largest value.
+        p5 (float): 5th percentile.
+        median (float): Median.
+        p95 (float): 95th percentile.
+        ci95 (float): Half width of the 95% confidence interval of the mean.
+
+    """
+    count: int = 0
+    mean: float = 0.0
+    stdev: float = 0.0
+    minimum: float = 0.0
+    maximum: float = 0.0
+    p5: float = 0.0
+    median: float = 0.0
+    p95: float = 0.0
+    ci95: float = 0.0
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "Distribution":
+        """Summarize values.
+
+        Args:
+            values (Iterable[float]): Measured values.
+
+        Returns:
+            Distribution: Summary of the values.
+
+        """
+        values = sorted(values)
+        if not values:
+            return cls()
+        count = len(values)
+        stdev = statistics.stdev(values) if count > 1 else 0.0
+        return cls(
+            count=count,
+            mean=statistics.fmean(values),
+            stdev=stdev,
+            minimum=values[0],
+            maximum=values[-1],
+            p5=_percentile(values, 0.05),
+            median=_percentile(values, 0.5),
+            p95=_percentile(values, 0.95),
+            ci95=_Z95 * stdev / math.sqrt(count),
+        )
+
+
+def _percentile(values: Sequence[float], share: float) -> float:
+    position = (len(values) - 1) * share
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+@dataclass
+class MonteCarloResult:
+    """Aggregated outcome of all runs.
+
+    Properties:
+        runs (List[RunResult]): Outcome of every run ordered by seed.
+        throughput (Distribution): Delivered tasks per hour.
+        completion_time (Distribution): Hours until the pipeline went idle,
+            only runs that finished are included.
+        failure_rate (Distribution): Share of finished tasks that failed.
+
+    """
+    runs: List[RunResult] = field(default_factory=list)
+    throughput: Distribution = field(default_factory=Distribution)
+    completion_time: Distribution = field(default_factory=Distribution)
+    failure_rate: Distribution = field(default_factory=Distribution)
+
+    @classmethod
+    def from_runs(cls, runs: Iterable[RunResult]) -> "MonteCarloResult":
+        """Aggregate results of runs.
+
+        Args:
+            runs (Iterable[RunResult]): Results of the runs.
+
+        Returns:
+            MonteCarloResult: Aggregated results.
+
+        """
+        runs = sorted(runs, key=lambda run: run.seed)
+        return cls(
+            runs=runs,
+            throughput=Distribution.from_values(run.throughput for run in runs),
+            completion_time=Distribution.from_values(
+                run.completion_time for run in runs
+                if run.completion_time is not None),
+            failure_rate=Distribution.from_values(run.failure_rate for run in runs),
+        )
+
+
+def simulate(nodes: List[NodeModel], seed: int, hours: float) -> RunResult:
+    """Run a single event simulation of the nodes with task routing.
+
+    Nodes are changed by the run.
+
+    Args:
+        nodes (List[NodeModel]): Nodes of the scene.
+        seed (int): Seed of the run.
+        hours (float): Longest simulated span.
+
+    Returns:
+        RunResult: Outcome of the run.
+
+    """
+    flow = FlowEngine()
+    simulation = EventSimulation(seed=seed, flow=flow)
+    for node in nodes:
+        simulation.add_node(node)
+    simulation.step(hours, sync=False)
+    idle = simulation.next_event_time is None
+    return RunResult(
+        seed=seed,
+        delivered=flow.delivered,
+        finished=simulation.finished,
+        failed=simulation.failed,
+        completion_time=simulation.last_event_time if idle else None,
+        hours=hours,
+    )
+
+
+_scene: Optional[bytes] = None
+
+
+def _init_worker(scene: bytes) -> None:
+    global _scene
+    _scene = scene
+
+
+def _run_seed(seed: int, hours: float) -> RunResult:
+    return simulate(pickle.loads(_scene), seed, hours)
+
+
+def run_monte_carlo(
+        nodes: Iterable[NodeModel], runs: int = 100, hours: float = 1000.0,
+        seed: int = 0, workers: Optional[int] = None) -> MonteCarloResult:
+    """Simulate the scene many times and aggregate the results.
+
+    Run `i` uses seed `seed + i`. Given nodes are not changed.
+
+    Args:
+        nodes (Iterable[NodeModel]): Nodes of the scene with their tasks
+            and connections.
+        runs (int, optional): Number of runs. Defaults to 100.
+        hours (float, optional): Longest simulated span of a run.
+            Defaults to 1000.0.
+        seed (int, optional): Seed of the first run. Defaults to 0.
+        workers (Optional[int], optional): Number of worker processes,
+            0 runs everything in this process. Defaults to the number
+            of CPUs.
+
+    Returns:
+        MonteCarloResult: Aggregated results of all runs.
+
+    """
+    scene = pickle.dumps(list(nodes), protocol=pickle.HIGHEST_PROTOCOL)
+    seeds = range(seed, seed + runs)
+    if workers == 0:
+        results = [simulate(pickle.loads(scene), s, hours) for s in seeds]
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker, initargs=(scene,)) as executor:
+            results = list(executor.map(
+                _run_seed, seeds, [hours] * runs,
+                chunksize=max(1, runs // (4 * workers))))
+    return MonteCarloResult.from_runs(results)
@@ -0,0 +1,449 @@
+"""Simulation model of a node.
+
+Node model holds everything the simulation needs to know about a node -
+its position, level, working hours and tasks - without any rendering.
+Views in `pipeliner.actors` draw the model and read its `dirty` flags
+to know what changed.
+
+"""
+import random
+from enum import IntFlag
+from typing import Callable, FrozenSet, Iterable, List, Optional
+
+from pipeliner.constants import (
+    FAILURE_RATE_FACTOR,
+    LEVEL_DIFFICULTY_FACTOR,
+    PROGRESS_EPSILON,
+    TASK_BASE_HOURS,
+    TASK_DIFFICULTY_HOURS,
+)
+from pipeliner.model.connection import ConnectionModel
+from pipeliner.model.workqueue import SchedulingPolicy, TaskQueue, get_type_mask
+from pipeliner.tasks import (
+    DoneState,
+    DoneStatus,
+    FailedState,
+    InProgressState,
+    InProgressStatus,
+    Task,
+)
+
+
+class Dirty(IntFlag):
+    """Parts of the node that need their shapes refreshed.
+
+    Nodes keep their shapes between frames and only touch the shapes
+    that belong to the part of the node that actually changed.
+
+    """
+    NONE = 0
+    POSITION = 1
+    HOURS = 2
+    PROGRESS = 4
+    TASKS = 8
+    LABELS = 16
+    COLOR = 32
+    ALL = POSITION | HOURS | PROGRESS | TASKS | LABELS | COLOR
+
+
+class NodeModel(object):
+    """Simulation state of a node.
+
+    Node works on one task at a time, its task queue decides which task
+    is started next. Every hour it makes progress on the
+    current task based on its production rate and the task difficulty.
+    Higher level lowers the effective difficulty of tasks. When the task
+    is finished it may fail with the probability given by its difficulty.
+
+    Properties:
+
+        x (int): X position of the node.
+        y (int): Y position of the node.
+
+        connections (List[ConnectionModel]): Outgoing connections.
+        inputs (List[ConnectionModel]): Incoming connections.
+        accept_types (FrozenSet): Task types that the node accepts.
+        provide_types (FrozenSet): Task types that the node provides.
+        accept_mask (int): Bitmask of accepted task type codes.
+        provide_mask (int): Bitmask of provided task type codes.
+
+        level (int): Level of the node.
+        production_rate (float): How many tasks the node produces per hour.
+        work_hours (int): How many hours the node works per day.
+        current_hour (float): Current hour in the working day of the node.
+        task_slots (int): How many tasks the node can hold.
+        tasks (List[Task]): Tasks assigned to the node.
+        queue (TaskQueue): Admission and scheduling of the tasks.
+        policy (SchedulingPolicy): Order in which tasks are started.
+        current_task (Optional[Task]): Task the node works on.
+
+        dirty (Dirty): Parts of the node changed since the view last synced.
+
+        _change_listeners (List[Callable]): Callbacks called when tasks,
+            level, work hours, production rate, accepted types or
+            connections of the node change.
+
+    """
+    connections: List[ConnectionModel]
+    inputs: List[ConnectionModel]
+
+    provide_mask: int
+
+    queue: TaskQueue
+    current_task: Optional[Task]
+
+    dirty: Dirty
+
+    _change_listeners: List[Callable[["NodeModel"], None]]
+
+    def __init__(self, level: int = 1, x: int = 0, y: int = 0):
+        self.dirty = Dirty.ALL
+        self._change_listeners = []
+        self._x = x
+        self._y = y
+        self._level = level
+        self.connections = []
+        self.inputs = []
+        self.queue = TaskQueue(slots=2)
+        self.accept_types = frozenset()
+        self.provide_types = frozenset()
+        self.production_rate = 1.0
+        self._work_hours = 8
+        self._current_hour = 0
+        self.current_task = None
+
+    def __getstate__(self) -> dict:
+        # listeners belong to whoever runs the node, not to the node
+        state = self.__dict__.copy()
+        state["_change_listeners"] = []
+        return state
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    @x.setter
+    def x(self, value: int) -> None:
+        self._x = value
+        self.dirty |= Dirty.POSITION
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    @y.setter
+    def y(self, value: int) -> None:
+        self._y = value
+        self.dirty |= Dirty.POSITION
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @level.setter
+    def level(self, value: int) -> None:
+        self._level = value
+        self.dirty |= Dirty.LABELS
+        self._notify_changed()
+
+    @property
+    def production_rate(self) -> float:
+        return self._production_rate
+
+    @production_rate.setter
+    def production_rate(self, value: float) -> None:
+        self._production_rate = value
+        self._notify_changed()
+
+    @property
+    def work_hours(self) -> int:
+        return self._work_hours
+
+    @work_hours.setter
+    def work_hours(self, value: int) -> None:
+        self._work_hours = value
+        self.dirty |= Dirty.HOURS
+        self._notify_changed()
+
+    @property
+    def current_hour(self) -> float:
+        return self._current_hour
+
+    @current_hour.setter
+    def current_hour(self, value: float) -> None:
+        self._current_hour = value
+        self.dirty |= Dirty.HOURS
+
+    @property
+    def task_slots(self) -> int:
+        return self.queue.slots
+
+    @task_slots.setter
+    def task_slots(self, value: int) -> None:
+        self.queue.slots = value
+        self.dirty |= Dirty.TASKS
+
+    @property
+    def tasks(self) -> List[Task]:
+        return self.queue.tasks
+
+    @tasks.setter
+    def tasks(self, value: Iterable[Task]) -> None:
+        self.queue.reset(value)
+        self.dirty |= Dirty.TASKS
+
+    @property
+    def policy(self) -> SchedulingPolicy:
+        return self.queue.policy
+
+    @policy.setter
+    def policy(self, value: SchedulingPolicy) -> None:
+        self.queue.policy = value
+
+    @property
+    def accept_types(self) -> FrozenSet:
+        return self._accept_types
+
+    @accept_types.setter
+    def accept_types(self, value: Iterable) -> None:
+        # frozen so the mask cannot get out of date by changing the set in place
+        self._accept_types = frozenset(value)
+        self.queue.accept_mask = get_type_mask(self._accept_types)
+        self._notify_changed()
+
+    @property
+    def accept_mask(self) -> int:
+        return self.queue.accept_mask
+
+    @property
+    def provide_types(self) -> FrozenSet:
+        return self._provide_types
+
+    @provide_types.setter
+    def provide_types(self, value: Iterable) -> None:
+        self._provide_types = frozenset(value)
+        self.provide_mask = get_type_mask(self._provide_types)
+
+    def add_change_listener(self, callback: Callable[["NodeModel"], None]) -> None:
+        """Call callback with the node when its work changes.
+
+        Work changes when tasks are added, when the level, work hours,
+        production rate or accepted types of the node change and when
+        the node is connected or disconnected.
+
+        Args:
+            callback (Callable): Callback taking the node.
+
+        """
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback: Callable[["NodeModel"], None]) -> None:
+        """Stop calling callback when the node's work changes.
+
+        Args:
+            callback (Callable): Callback added by `add_change_listener`.
+
+        """
+        self._change_listeners.remove(callback)
+
+    def _notify_changed(self) -> None:
+        for callback in self._change_listeners:
+            callback(self)
+
+    def connect(self, target: "NodeModel") -> ConnectionModel:
+        """Connect the node to the target node.
+
+        Args:
+            target (NodeModel): Node receiving tasks from this node.
+
+        Returns:
+            ConnectionModel: New connection.
+
+        """
+        connection = ConnectionModel(self, target)
+        self.connections.append(connection)
+        target.inputs.append(connection)
+        self._notify_changed()
+        target._notify_changed()
+        return connection
+
+    def disconnect(self, connection: ConnectionModel) -> None:
+        """Remove outgoing connection.
+
+        Args:
+            connection (ConnectionModel): Connection to remove.
+
+        """
+        self.connections.remove(connection)
+        connection.target.inputs.remove(connection)
+        self._notify_changed()
+        connection.target._notify_changed()
+
+    def accepts(self, task: Task) -> bool:
+        """Check if the node accepts the type of the task.
+
+        Args:
+            task (Task): Task to check.
+
+        Returns:
+            bool: True if the type is accepted.
+
+        """
+        return bool(self.queue.accept_mask >> task.type.code & 1)
+
+    def provides(self, task: Task) -> bool:
+        """Check if the node can pass the task on to its targets.
+
+        Args:
+            task (Task): Task to check.
+
+        Returns:
+            bool: True if the type is provided.
+
+        """
+        return bool(self.provide_mask >> task.type.code & 1)
+
+    def can_accept(self, task: Task) -> bool:
+        """Check if the node has space for the task and accepts its type.
+
+        Args:
+            task (Task): Task to check.
+
+        Returns:
+            bool: True if the task can be added.
+
+        """
+        return self.queue.admits(task)
+
+    def add_task(self, task: Task) -> bool:
+        """Add task to the node.
+        
+        Add task if there is space for it and if the task
+        type is accepted by the node.
+
+        Args:
+            task (Task): Task to add.
+
+        Returns:
+            bool: True if task was added, False otherwise.
+        
+        """
+        if not self.queue.push(task):
+            return False
+        task.assignee = self
+        self.dirty |= Dirty.TASKS
+        self._notify_changed()
+        return True
+
+    def get_difficulty(self, task: Task) -> float:
+        """Get difficulty of the task for this node.
+
+        Every level above the first one makes tasks easier.
+
+        Args:
+            task (Task): Task to get the difficulty for.
+
+        Returns:
+            float: Effective difficulty of the task.
+
+        """
+        return task.difficulty * LEVEL_DIFFICULTY_FACTOR ** (self.level - 1)
+
+    def get_task_hours(self, task: Task) -> float:
+        """Get how many hours the node needs to finish the task.
+
+        Args:
+            task (Task): Task to get the hours for.
+
+        Returns:
+            float: Hours of work needed for the whole task.
+
+        """
+        difficulty = self.get_difficulty(task)
+        return (TASK_BASE_HOURS + TASK_DIFFICULTY_HOURS * difficulty) / self.production_rate
+
+    def get_failure_rate(self, task: Task) -> float:
+        """Get probability the node fails the task.
+
+        Args:
+            task (Task): Task to get the failure rate for.
+
+        Returns:
+            float: Probability between 0 and 1.
+
+        """
+        return self.get_difficulty(task) * FAILURE_RATE_FACTOR
+
+    def remove_tasks(self, tasks: Iterable[Task]) -> None:
+        """Remove tasks from the node.
+
+        Args:
+            tasks (Iterable[Task]): Tasks to remove.
+
+        """
+        self.queue.remove(set(tasks))
+        self.dirty |= Dirty.TASKS
+
+    def _start_next_task(self) -> Optional[Task]:
+        task = self.queue.pop_next()
+        if task is None:
+            return None
+        task.state = InProgressState()
+        task.status = InProgressStatus()
+        self.current_task = task
+        self.dirty |= Dirty.TASKS | Dirty.PROGRESS
+        return task
+
+    def _finish_task(self, task: Task, rng: random.Random) -> None:
+        # Failed tasks look done to the node, only supervisors can tell.
+        if rng.random() < self.get_failure_rate(task):
+            task.state = FailedState()
+        else:
+            task.state = DoneState()
+        task.status = DoneStatus()
+        self.current_task = None
+        self.dirty |= Dirty.TASKS
+
+    def step(self, delta_time: float, rng: Optional[random.Random] = None) -> None:
+        """Advance the node by delta_time hours.
+
+        Args:
+            delta_time (float): Simulated hours to advance.
+            rng (Optional[random.Random]): Random generator deciding task
+                failures. Defaults to the global one.
+
+        """
+        self.current_hour += delta_time
+        if self.current_hour >= self.work_hours:
+            self.current_hour = 0
+
+        task = self.current_task or self._start_next_task()
+        if task is None:
+            return
+        task.progress = task.progress + delta_time / self.get_task_hours(task)
+        self.dirty |= Dirty.PROGRESS
+        if task.progress >= 1.0 - PROGRESS_EPSILON:
+            task.progress = 1.0
+            self._finish_task(task, rng or random)
+
+    def advance(self, delta_time: float, task_hours: Optional[float] = None) -> None:
+        """Advance the node by delta_time hours without finishing tasks.
+
+        Used by simulations that stop exactly at the next event, the
+        working day wraps around and the current task progresses but
+        finishing it is left to the caller.
+
+        Args:
+            delta_time (float): Simulated hours to advance.
+            task_hours (Optional[float]): Hours the current task needs,
+                defaults to `get_task_hours` of the current task.
+
+        """
+        self.current_hour = (self.current_hour + delta_time) % self.work_hours
+        task = self.current_task
+        if task is None:
+            return
+        if task_hours is None:
+            task_hours = self.get_task_hours(task)
+        task.progress = min(1.0, task.progress + delta_time / task_hours)
+        self.dirty |= Dirty.PROGRESS
@@ -0,0 +1,359 @@
+"""Compact binary save files of scenes.
+
+A save file stores nodes, connections and tasks as packed fixed-width
+records, all values little-endian::
+
+    header       magic, version, node, connection and task counts
+    nodes        one record per node, its tasks are a range of the task table
+    connections  source and target node index
+    tasks        one column per attribute, each aligned to 8 bytes
+
+Tasks are stored as columns of type, state and status codes, the id of
+the task class, progress and difficulty, the same layout the vectorized
+engine keeps its arrays in. Task names are not stored, loaded tasks get
+the default name of their class.
+
+`SceneFile` memory-maps the file and reads the task columns straight
+from the mapping, so opening a studio with millions of tasks does not
+create a Python object per task. Tasks become `Task` objects only when
+nodes are loaded or a single task is requested.
+
+"""
+import mmap
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Type
+
+from pipeliner.model.artist import ArtistModel
+from pipeliner.model.node import NodeModel
+from pipeliner.tasks import Task, get_task_class
+from pipeliner.tasks.state import TaskState
+from pipeliner.tasks.status import TaskStatus
+from pipeliner.tasks.type import TaskType
+
+MAGIC = b"PLNR"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHxxIIQ")
+# kind, level, x, y, production rate, current hour, work hours, task slots,
+# accepted and provided type masks, first task, task count, current task
+_NODE = struct.Struct("<BxHiiddIIIIQIi")
+_CONNECTION = struct.Struct("<II")
+_ALIGNMENT = 8
+
+#: Node classes in the order of their kind code in save files.
+_NODE_KINDS = (NodeModel, ArtistModel)
+
+#: Task columns in the file order with their array type codes.
+_TASK_COLUMNS = (
+    ("assignee", "i"),
+    ("progress", "f"),
+    ("difficulty", "f"),
+    ("type_code", "B"),
+    ("state_code", "B"),
+    ("status_code", "B"),
+    ("kind", "B"),
+)
+
+
+@lru_cache(maxsize=None)
+def _get_default_name(cls: Type[Task]) -> str:
+    return cls().name
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+@lru_cache(maxsize=None)
+def _get_type_set(mask: int) -> frozenset:
+    return frozenset(
+        type(TaskType.from_code(code))
+        for code in range(mask.bit_length()) if mask >> code & 1)
+
+
+def _get_column_offsets(start: int, count: int) -> Dict[str, int]:
+    offsets = {}
+    for name, typecode in _TASK_COLUMNS:
+        offsets[name] = start
+        start = _align(start + count * array(typecode).itemsize)
+    offsets["end"] = start
+    return offsets
+
+
+def save_scene(path: str, nodes: Sequence[NodeModel]) -> None:
+    """Write nodes with their tasks and connections to a save file.
+
+    Connections to nodes that are not saved are dropped.
+
+    Args:
+        path (str): Path of the file.
+        nodes (Sequence[NodeModel]): Nodes of the scene.
+
+    Raises:
+        ValueError: If a node is of a class save files do not know.
+
+    """
+    nodes = list(nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    columns = {name: array(typecode) for name, typecode in _TASK_COLUMNS}
+    node_records = []
+    connections = []
+    for i, node in enumerate(nodes):
+        if type(node) not in _NODE_KINDS:
+            raise ValueError(f"Cannot save node of type {type(node).__name__}")
+        start = len(columns["kind"])
+        current = -1
+        for position, task in enumerate(node.tasks):
+            if task is node.current_task:
+                current = position
+            columns["assignee"].append(i)
+            columns["progress"].append(task.progress)
+            columns["difficulty"].append(task.difficulty)
+            columns["type_code"].append(task.type.code)
+            columns["state_code"].append(task.state.code)
+            columns["status_code"].append(task.status.code)
+            columns["kind"].append(type(task).id)
+        node_records.append(_NODE.pack(
+            _NODE_KINDS.index(type(node)), node.level, round(node.x), round(node.y),
+            node.production_rate, node.current_hour, node.work_hours,
+            node.task_slots, node.accept_mask, node.provide_mask,
+            start, len(node.tasks), current))
+        connections.extend(
+            _CONNECTION.pack(i, index[c.target])
+            for c in node.connections if c.target in index)
+
+    if sys.byteorder != "little":
+        for column in columns.values():
+            column.byteswap()
+    task_count = len(columns["kind"])
+    with open(path, "wb") as stream:
+        stream.write(_HEADER.pack(
+            MAGIC, VERSION, len(nodes), len(connections), task_count))
+        stream.write(b"".join(node_records))
+        stream.write(b"".join(connections))
+        offset = stream.tell()
+        offsets = _get_column_offsets(_align(offset), task_count)
+        for name, _ in _TASK_COLUMNS:
+            stream.write(bytes(offsets[name] - offset))
+            columns[name].tofile(stream)
+            offset = offsets[name] + len(columns[name]) * columns[name].itemsize
+        stream.write(bytes(offsets["end"] - offset))
+
+
+class TaskTable(object):
+    """Columns of all tasks of a save file.
+
+    Columns are read-only views of the file mapping, indexed by the
+    position of the task in the table.
+
+    Properties:
+        assignee (memoryview): Index of the node the task is assigned to.
+        progress (memoryview): Progress of every task.
+        difficulty (memoryview): Difficulty of every task.
+        type_code (memoryview): Task type code of every task.
+        state_code (memoryview): Task state code of every task.
+        status_code (memoryview): Task status code of every task.
+        kind (memoryview): Id of the task class of every task.
+
+    """
+    assignee: memoryview
+    progress: memoryview
+    difficulty: memoryview
+    type_code: memoryview
+    state_code: memoryview
+    status_code: memoryview
+    kind: memoryview
+
+    def __init__(self, buffer, offset: int, count: int):
+        self._count = count
+        offsets = _get_column_offsets(offset, count)
+        view = memoryview(buffer)
+        for name, typecode in _TASK_COLUMNS:
+            size = array(typecode).itemsize
+            column = view[offsets[name]:offsets[name] + count * size]
+            if sys.byteorder != "little" and size > 1:
+                swapped = array(typecode)
+                swapped.frombytes(column)
+                swapped.byteswap()
+                column = memoryview(swapped)
+            setattr(self, name, column.cast(typecode))
+        view.release()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_task(self, index: int, assignee: Optional[NodeModel] = None) -> Task:
+        """Create task object from its record.
+
+        Args:
+            index (int): Position of the task in the table.
+            assignee (Optional[NodeModel]): Node the task is assigned to.
+
+        Returns:
+            Task: New task.
+
+        Raises:
+            ValueError: If the task class is not known.
+
+        """
+        return self.get_tasks(index, 1, assignee)[0]
+
+    def get_tasks(
+            self, start: int, count: int,
+            assignee: Optional[NodeModel] = None) -> List[Task]:
+        """Create task objects from a range of records.
+
+        Args:
+            start (int): Position of the first task in the table.
+            count (int): Number of tasks.
+            assignee (Optional[NodeModel]): Node the tasks are assigned to.
+
+        Returns:
+            List[Task]: New tasks.
+
+        Raises:
+            ValueError: If a task class is not known.
+
+        """
+        get_type = TaskType.from_code
+        get_state = TaskState.from_code
+        get_status = TaskStatus.from_code
+        tasks = []
+        for index in range(start, start + count):
+            try:
+                cls = get_task_class(self.kind[index])
+            except KeyError:
+                raise ValueError(f"Unknown task class id {self.kind[index]}") from None
+            # fields are all set below, skip the constructor
+            task = object.__new__(cls)
+            task.name = _get_default_name(cls)
+            task.assignee = assignee
+            task.progress = self.progress[index]
+            task.difficulty = self.difficulty[index]
+            task.type = get_type(self.type_code[index])
+            task.state = get_state(self.state_code[index])
+            task.status = get_status(self.status_code[index])
+            tasks.append(task)
+        return tasks
+
+    def release(self) -> None:
+        """Release the views of the columns."""
+        for name, _ in _TASK_COLUMNS:
+            getattr(self, name).release()
+
+
+class SceneFile(object):
+    """Save file opened with its task table memory-mapped.
+
+    Properties:
+        path (str): Path of the file.
+        node_count (int): Number of nodes.
+        connection_count (int): Number of connections.
+        tasks (TaskTable): Tasks of all nodes.
+
+    """
+    path: str
+    node_count: int
+    connection_count: int
+    tasks: TaskTable
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as stream:
+            self._mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.node_count, self.connection_count, task_count = (
+                _HEADER.unpack_from(self._mmap))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a scene file")
+            if version != VERSION:
+                raise ValueError(f"Unsupported scene file version {version}")
+            self._connections_offset = _HEADER.size + self.node_count * _NODE.size
+            tasks_offset = _align(
+                self._connections_offset + self.connection_count * _CONNECTION.size)
+            if _get_column_offsets(tasks_offset, task_count)["end"] > len(self._mmap):
+                raise ValueError(f"{path} is truncated")
+            self.tasks = TaskTable(self._mmap, tasks_offset, task_count)
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise
+
+    def __enter__(self) -> "SceneFile":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """Unmap the file, columns of the task table cannot be used after."""
+        self.tasks.release()
+        self._mmap.close()
+
+    def get_node_record(self, index: int) -> tuple:
+        """Get raw record of the node.
+
+        Args:
+            index (int): Index of the node.
+
+        Returns:
+            tuple: Kind, level, x, y, production rate, current hour, work
+                hours, task slots, accepted and provided type masks, first
+                task, task count and current task of the node.
+
+        """
+        return _NODE.unpack_from(self._mmap, _HEADER.size + index * _NODE.size)
+
+    def get_connections(self) -> List[tuple]:
+        """Get source and target node index of every connection.
+
+        Returns:
+            List[tuple]: Pairs of node indices.
+
+        """
+        return list(_CONNECTION.iter_unpack(self._mmap[
+            self._connections_offset:
+            self._connections_offset + self.connection_count * _CONNECTION.size]))
+
+    def load_nodes(self) -> List[NodeModel]:
+        """Create node models with their tasks and connections.
+
+        Returns:
+            List[NodeModel]: Nodes in the order they were saved.
+
+        """
+        nodes = []
+        for i in range(self.node_count):
+            (kind, level, x, y, production_rate, current_hour, work_hours,
+             task_slots, accept_mask, provide_mask, start, count,
+             current) = self.get_node_record(i)
+            node = _NODE_KINDS[kind](level, x, y)
+            node.production_rate = production_rate
+            node.work_hours = work_hours
+            node.current_hour = current_hour
+            node.task_slots = task_slots
+            node.accept_types = _get_type_set(accept_mask)
+            node.provide_types = _get_type_set(provide_mask)
+            node.tasks = self.tasks.get_tasks(start, count, node)
+            node.current_task = node.tasks[current] if current >= 0 else None
+            nodes.append(node)
+        for source, target in self.get_connections():
+            nodes[source].connect(nodes[target])
+        return nodes
+
+
+def load_scene(path: str) -> List[NodeModel]:
+    """Load nodes with their tasks and connections from a save file.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        List[NodeModel]: Nodes in the order they were saved.
+
+    """
+    with SceneFile(path) as scene:
+        return scene.load_nodes()
@@ -0,0 +1,141 @@
+"""Headless simulation of the studio.
+
+Simulation advances all node models with a fixed time step, independent
+of how often and how irregularly it is called. It does not depend on
+pyglet, so it can run without a window or GL context.
+
+"""
+import random
+from typing import List, Optional
+
+from pipeliner.model.arrivals import TaskSource
+from pipeliner.model.balance import WorkStealer
+from pipeliner.model.connection import ConnectionModel
+from pipeliner.model.flow import FlowEngine
+from pipeliner.model.node import NodeModel
+
+
+class Simulation(object):
+    """Fixed time step simulation of node models.
+
+    Properties:
+        time_step (float): Simulated hours advanced by a single tick.
+        time (float): Simulated hours since the start.
+        ticks (int): Number of ticks run.
+        nodes (List[NodeModel]): Simulated nodes.
+        rng (random.Random): Random generator of the simulation.
+        flow (Optional[FlowEngine]): Engine routing finished tasks along
+            connections, tasks stay in their nodes without it.
+        sources (List[TaskSource]): Streams of tasks arriving at nodes.
+        balancer (Optional[WorkStealer]): Load balancing letting idle
+            nodes steal tasks from their peers after every tick.
+
+        _accumulator (float): Time passed to `step` not yet simulated.
+
+    """
+    time_step: float
+    time: float
+    ticks: int
+    nodes: List[NodeModel]
+    rng: random.Random
+    flow: Optional[FlowEngine]
+    sources: List[TaskSource]
+    balancer: Optional[WorkStealer]
+
+    _accumulator: float
+
+    def __init__(
+            self, time_step: float = 0.1, seed: Optional[int] = None,
+            flow: Optional[FlowEngine] = None,
+            balancer: Optional[WorkStealer] = None):
+        self.time_step = time_step
+        self.time = 0.0
+        self.ticks = 0
+        self.nodes = []
+        self.rng = random.Random(seed)
+        self.flow = flow
+        self.sources = []
+        self.balancer = balancer
+        self._accumulator = 0.0
+
+    @property
+    def connections(self) -> List[ConnectionModel]:
+        """All connections between simulated nodes."""
+        return [
+            connection
+            for node in self.nodes
+            for connection in node.connections
+        ]
+
+    def add_node(self, node: NodeModel) -> NodeModel:
+        """Add node to the simulation.
+
+        Args:
+            node (NodeModel): Node to add.
+
+        Returns:
+            NodeModel: Added node.
+
+        """
+        self.nodes.append(node)
+        return node
+
+    def add_source(self, source: TaskSource) -> TaskSource:
+        """Add stream of arriving tasks fed at the start of every tick.
+
+        Args:
+            source (TaskSource): Source to add.
+
+        Returns:
+            TaskSource: Added source.
+
+        """
+        self.sources.append(source)
+        return source
+
+    def remove_node(self, node: NodeModel) -> None:
+        """Remove node and all connections to it from the simulation.
+
+        Args:
+            node (NodeModel): Node to remove.
+
+        """
+        self.nodes.remove(node)
+        for connection in list(node.connections):
+            node.disconnect(connection)
+        for connection in list(node.inputs):
+            connection.source.disconnect(connection)
+
+    def tick(self) -> None:
+        """Advance every node by a single time step and route finished tasks."""
+        for source in self.sources:
+            source.feed(self.time)
+        for node in self.nodes:
+            node.step(self.time_step, self.rng)
+        if self.flow is not None:
+            self.flow.route(self.nodes)
+        if self.balancer is not None:
+            self.balancer.balance_all(self.nodes)
+        self.time += self.time_step
+        self.ticks += 1
+
+    def step(self, delta_time: float) -> int:
+        """Advance the simulation by delta_time.
+
+        Time is simulated in fixed `time_step` ticks, leftover time
+        is carried over to the next call.
+
+        Args:
+            delta_time (float): Time to advance.
+
+        Returns:
+            int: Number of ticks run.
+
+        """
+        self._accumulator += delta_time
+        # tolerate float error so 0.1 + 0.1 + 0.1 still runs three ticks
+        ticks = int(self._accumulator / self.time_step + 1e-9)
+        for _ in range(ticks):
+            self.tick()
+        self._accumulator = max(0.0, self._accumulator - ticks * self.time_step)
+        return ticks
@@ -0,0 +1,416 @@
+"""Vectorized simulation engine.
+
+Optional engine storing all nodes and tasks as NumPy arrays, one array per
+attribute. Every tick is a handful of array operations over all nodes no
+matter how many tasks there are, which makes simulating studios with
+millions of tasks practical. It follows the same rules as `NodeModel.step`.
+
+NumPy is an optional dependency, install ``pipeliner[fast]`` to use it.
+
+"""
+from typing import TYPE_CHECKING, List, Optional
+
+import numpy as np
+
+from pipeliner.constants import (
+    FAILURE_RATE_FACTOR,
+    LEVEL_DIFFICULTY_FACTOR,
+    PROGRESS_EPSILON,
+    TASK_BASE_HOURS,
+    TASK_DIFFICULTY_HOURS,
+)
+from pipeliner.model.simulation import Simulation
+from pipeliner.tasks import (
+    DoneState,
+    DoneStatus,
+    EmptyTaskType,
+    FailedState,
+    InProgressState,
+    InProgressStatus,
+    NotReadyStatus,
+    NotStartedState,
+)
+from pipeliner.tasks.state import TaskState
+from pipeliner.tasks.status import TaskStatus
+from pipeliner.tasks.type import TaskType
+
+if TYPE_CHECKING:
+    from pipeliner.model.savefile import SceneFile
+
+NO_TASK = -1
+
+
+class TaskView(object):
+    """Task stored in the arrays of `VectorizedSimulation`.
+
+    View only holds the engine and the index of the task, every attribute
+    is read from and written to the arrays.
+
+    """
+    __slots__ = ("_engine", "index")
+
+    def __init__(self, engine: "VectorizedSimulation", index: int):
+        self._engine = engine
+        self.index = index
+
+    def __repr__(self):
+        return f"TaskView({self.index}, {self.state.name}, {self.progress:.2f})"
+
+    @property
+    def progress(self) -> float:
+        return float(self._engine.task_progress[self.index])
+
+    @progress.setter
+    def progress(self, value: float) -> None:
+        self._engine.task_progress[self.index] = value
+
+    @property
+    def difficulty(self) -> float:
+        return float(self._engine.task_difficulty[self.index])
+
+    @property
+    def type(self):
+        return TaskType.from_code(int(self._engine.task_type[self.index]))
+
+    @property
+    def state(self):
+        return TaskState.from_code(int(self._engine.task_state[self.index]))
+
+    @property
+    def status(self):
+        return TaskStatus.from_code(int(self._engine.task_status[self.index]))
+
+    @property
+    def assignee(self) -> int:
+        """Index of the node the task is assigned to."""
+        return int(self._engine.task_assignee[self.index])
+
+
+class VectorizedSimulation(object):
+    """Simulation of nodes and tasks stored as arrays.
+
+    Tasks of each node wait in a queue ordered by the order they were
+    added. The queue is rebuilt when tasks are added, ticks only move
+    the per node queue position.
+
+    Properties:
+        time_step (float): Simulated hours advanced by a single tick.
+        time (float): Simulated hours since the start.
+        ticks (int): Number of ticks run.
+
+        node_level (np.ndarray): Level of every node.
+        node_production_rate (np.ndarray): Production rate of every node.
+        node_work_hours (np.ndarray): Work hours of every node.
+        node_current_hour (np.ndarray): Current hour of every node.
+        node_current_task (np.ndarray): Index of the task in progress or -1.
+        node_worked_hours (np.ndarray): Hours spent working on tasks.
+        node_completed (np.ndarray): Number of tasks finished by the node.
+        node_failed (np.ndarray): Number of finished tasks that failed.
+
+        task_progress (np.ndarray): Progress of every task.
+        task_difficulty (np.ndarray): Difficulty of every task.
+        task_type (np.ndarray): Task type code of every task.
+        task_state (np.ndarray): Task state code of every task.
+        task_status (np.ndarray): Task status code of every task.
+        task_assignee (np.ndarray): Index of the node the task is assigned to.
+
+    """
+
+    def __init__(self, time_step: float = 0.1, seed: Optional[int] = None):
+        self.time_step = time_step
+        self.time = 0.0
+        self.ticks = 0
+        self.rng = np.random.default_rng(seed)
+        self._accumulator = 0.0
+
+        self.node_level = np.zeros(0, dtype=np.int32)
+        self.node_production_rate = np.zeros(0, dtype=np.float64)
+        self.node_work_hours = np.zeros(0, dtype=np.float64)
+        self.node_current_hour = np.zeros(0, dtype=np.float64)
+        self.node_current_task = np.zeros(0, dtype=np.int64)
+        self.node_worked_hours = np.zeros(0, dtype=np.float64)
+        self.node_completed = np.zeros(0, dtype=np.int64)
+        self.node_failed = np.zeros(0, dtype=np.int64)
+
+        self.task_progress = np.zeros(0, dtype=np.float32)
+        self.task_difficulty = np.zeros(0, dtype=np.float32)
+        self.task_type = np.zeros(0, dtype=np.uint8)
+        self.task_state = np.zeros(0, dtype=np.uint8)
+        self.task_status = np.zeros(0, dtype=np.uint8)
+        self.task_assignee = np.zeros(0, dtype=np.int32)
+
+        self._queue = np.zeros(0, dtype=np.int64)
+        self._queue_position = np.zeros(0, dtype=np.int64)
+        self._queue_end = np.zeros(0, dtype=np.int64)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_level)
+
+    @property
+    def task_count(self) -> int:
+        return len(self.task_progress)
+
+    @classmethod
+    def from_simulation(
+            cls, simulation: Simulation,
+            seed: Optional[int] = None) -> "VectorizedSimulation":
+        """Create engine with copies of all nodes and tasks of the simulation.
+
+        Args:
+            simulation (Simulation): Simulation to copy.
+            seed (Optional[int]): Seed of the random generator.
+
+        Returns:
+            VectorizedSimulation: New engine.
+
+        """
+        engine = cls(simulation.time_step, seed)
+        nodes = simulation.nodes
+        engine.add_nodes(
+            len(nodes),
+            level=[node.level for node in nodes],
+            production_rate=[node.production_rate for node in nodes],
+            work_hours=[node.work_hours for node in nodes],
+            current_hour=[node.current_hour for node in nodes])
+
+        tasks = [(i, task) for i, node in enumerate(nodes) for task in node.tasks]
+        task_index = {id(task): index for index, (_, task) in enumerate(tasks)}
+        engine.add_tasks(
+            [i for i, _ in tasks],
+            difficulty=[task.difficulty for _, task in tasks],
+            type_code=[task.type.code for _, task in tasks],
+            state_code=[task.state.code for _, task in tasks],
+            status_code=[task.status.code for _, task in tasks],
+            progress=[task.progress for _, task in tasks])
+        for i, node in enumerate(nodes):
+            if node.current_task is not None:
+                engine.node_current_task[i] = task_index[id(node.current_task)]
+        return engine
+
+    @classmethod
+    def from_scene_file(
+            cls, scene: "SceneFile", time_step: float = 0.1,
+            seed: Optional[int] = None) -> "VectorizedSimulation":
+        """Create engine with all nodes and tasks of an opened save file.
+
+        Task columns are copied from the file mapping as whole arrays,
+        no task object is created.
+
+        Args:
+            scene (SceneFile): Opened save file.
+            time_step (float, optional): Simulated hours of a tick.
+                Defaults to 0.1.
+            seed (Optional[int]): Seed of the random generator.
+
+        Returns:
+            VectorizedSimulation: New engine.
+
+        """
+        engine = cls(time_step, seed)
+        records = [scene.get_node_record(i) for i in range(scene.node_count)]
+        engine.add_nodes(
+            len(records),
+            level=[record[1] for record in records],
+            production_rate=[record[4] for record in records],
+            work_hours=[record[6] for record in records],
+            current_hour=[record[5] for record in records])
+
+        tasks = scene.tasks
+        engine.add_tasks(
+            np.frombuffer(tasks.assignee, dtype=np.int32),
+            difficulty=np.frombuffer(tasks.difficulty, dtype=np.float32),
+            type_code=np.frombuffer(tasks.type_code, dtype=np.uint8),
+            state_code=np.frombuffer(tasks.state_code, dtype=np.uint8),
+            status_code=np.frombuffer(tasks.status_code, dtype=np.uint8),
+            progress=np.frombuffer(tasks.progress, dtype=np.float32))
+        for i, record in enumerate(records):
+            if record[12] >= 0:
+                engine.node_current_task[i] = record[10] + record[12]
+        return engine
+
+    def add_nodes(
+            self, count: int,
+            level=1, production_rate=1.0, work_hours=8, current_hour=0.0) -> np.ndarray:
+        """Add nodes.
+
+        Every attribute is either a single value for all new nodes or
+        a sequence with a value per node.
+
+        Args:
+            count (int): Number of nodes to add.
+            level (int, optional): Level of the nodes.
+            production_rate (float, optional): Production rate of the nodes.
+            work_hours (int, optional): Work hours of the nodes.
+            current_hour (float, optional): Current hour of the nodes.
+
+        Returns:
+            np.ndarray: Indices of the new nodes.
+
+        """
+        start = self.node_count
+
+        def grow(array: np.ndarray, value) -> np.ndarray:
+            return np.concatenate([array, np.broadcast_to(np.asarray(value, dtype=array.dtype), (count,))])
+
+        self.node_level = grow(self.node_level, level)
+        self.node_production_rate = grow(self.node_production_rate, production_rate)
+        self.node_work_hours = grow(self.node_work_hours, work_hours)
+        self.node_current_hour = grow(self.node_current_hour, current_hour)
+        self.node_current_task = grow(self.node_current_task, NO_TASK)
+        self.node_worked_hours = grow(self.node_worked_hours, 0.0)
+        self.node_completed = grow(self.node_completed, 0)
+        self.node_failed = grow(self.node_failed, 0)
+        self._rebuild_queues()
+        return np.arange(start, self.node_count)
+
+    def add_tasks(
+            self, assignee,
+            difficulty=0.0, type_code: int = EmptyTaskType.code,
+            state_code: int = NotStartedState.code,
+            status_code: int = NotReadyStatus.code,
+            progress=0.0) -> np.ndarray:
+        """Add tasks assigned to nodes.
+
+        Every attribute is either a single value for all new tasks or
+        a sequence with a value per task.
+
+        Args:
+            assignee (Sequence[int]): Index of the node of every new task.
+            difficulty (float, optional): Difficulty of the tasks.
+            type_code (int, optional): Task type code.
+            state_code (int, optional): Task state code.
+            status_code (int, optional): Task status code.
+            progress (float, optional): Progress of the tasks.
+
+        Returns:
+            np.ndarray: Indices of the new tasks.
+
+        """
+        assignee = np.asarray(assignee, dtype=np.int32)
+        count = len(assignee)
+        start = self.task_count
+
+        def grow(array: np.ndarray, value) -> np.ndarray:
+            return np.concatenate([array, np.broadcast_to(np.asarray(value, dtype=array.dtype), (count,))])
+
+        self.task_assignee = np.concatenate([self.task_assignee, assignee])
+        self.task_progress = grow(self.task_progress, progress)
+        self.task_difficulty = grow(self.task_difficulty, difficulty)
+        self.task_type = grow(self.task_type, type_code)
+        self.task_state = grow(self.task_state, state_code)
+        self.task_status = grow(self.task_status, status_code)
+        self._rebuild_queues()
+        return np.arange(start, self.task_count)
+
+    def _rebuild_queues(self) -> None:
+        """Queue not started tasks of every node in the order they were added."""
+        waiting = np.flatnonzero(self.task_state == NotStartedState.code)
+        # stable sort keeps the order tasks were added in within a node
+        order = np.argsort(self.task_assignee[waiting], kind="stable")
+        self._queue = waiting[order]
+        counts = np.bincount(self.task_assignee[self._queue], minlength=self.node_count)
+        self._queue_end = np.cumsum(counts)
+        self._queue_position = self._queue_end - counts
+
+    def task(self, index: int) -> TaskView:
+        """Get view of the task.
+
+        Args:
+            index (int): Index of the task.
+
+        Returns:
+            TaskView: View reading and writing the task arrays.
+
+        """
+        return TaskView(self, index)
+
+    def node_tasks(self, node: int) -> List[TaskView]:
+        """Get views of all tasks assigned to the node.
+
+        Args:
+            node (int): Index of the node.
+
+        Returns:
+            List[TaskView]: Views in the order tasks were added.
+
+        """
+        return [TaskView(self, int(i)) for i in np.flatnonzero(self.task_assignee == node)]
+
+    def get_task_hours(self, tasks: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        """Get hours the nodes need to finish the tasks.
+
+        Args:
+            tasks (np.ndarray): Task indices.
+            nodes (np.ndarray): Index of the node working on each task.
+
+        Returns:
+            np.ndarray: Hours of work needed for each whole task.
+
+        """
+        difficulty = self.task_difficulty[tasks] * LEVEL_DIFFICULTY_FACTOR ** (self.node_level[nodes] - 1)
+        return (TASK_BASE_HOURS + TASK_DIFFICULTY_HOURS * difficulty) / self.node_production_rate[nodes]
+
+    def _start_next_tasks(self) -> None:
+        idle = np.flatnonzero(
+            (self.node_current_task == NO_TASK)
+            & (self._queue_position < self._queue_end))
+        if not len(idle):
+            return
+        tasks = self._queue[self._queue_position[idle]]
+        self._queue_position[idle] += 1
+        self.node_current_task[idle] = tasks
+        self.task_state[tasks] = InProgressState.code
+        self.task_status[tasks] = InProgressStatus.code
+
+    def tick(self) -> None:
+        """Advance every node by a single time step."""
+        dt = self.time_step
+        self.node_current_hour += dt
+        self.node_current_hour[self.node_current_hour >= self.node_work_hours] = 0
+
+        self._start_next_tasks()
+        working = np.flatnonzero(self.node_current_task != NO_TASK)
+        if len(working):
+            tasks = self.node_current_task[working]
+            progress = self.task_progress[tasks] + dt / self.get_task_hours(tasks, working)
+            done = progress >= 1.0 - PROGRESS_EPSILON
+            progress[done] = 1.0
+            self.task_progress[tasks] = progress
+            self.node_worked_hours[working] += dt
+
+            if done.any():
+                self._finish_tasks(tasks[done], working[done])
+
+        self.time += dt
+        self.ticks += 1
+
+    def _finish_tasks(self, tasks: np.ndarray, nodes: np.ndarray) -> None:
+        difficulty = self.task_difficulty[tasks] * LEVEL_DIFFICULTY_FACTOR ** (self.node_level[nodes] - 1)
+        failed = self.rng.random(len(tasks)) < difficulty * FAILURE_RATE_FACTOR
+        # Failed tasks look done to the node, only supervisors can tell.
+        self.task_state[tasks] = np.where(failed, FailedState.code, DoneState.code)
+        self.task_status[tasks] = DoneStatus.code
+        self.node_current_task[nodes] = NO_TASK
+        self.node_completed[nodes] += 1
+        self.node_failed[nodes[failed]] += 1
+
+    def step(self, delta_time: float) -> int:
+        """Advance the simulation by delta_time.
+
+        Time is simulated in fixed `time_step` ticks, leftover time
+        is carried over to the next call.
+
+        Args:
+            delta_time (float): Time to advance.
+
+        Returns:
+            int: Number of ticks run.
+
+        """
+        self._accumulator += delta_time
+        ticks = int(self._accumulator / self.time_step + 1e-9)
+        for _ in range(ticks):
+            self.tick()
+        self._accumulator = max(0.0, self._accumulator - ticks * self.time_step)
+        return ticks
@@ -0,0 +1,331 @@
+"""Work queue of a node.
+
+Queue holds every task assigned to a node in the order the tasks arrived,
+which is the order they are drawn and saved in. Tasks waiting to be
+started are also kept in per-type heaps ordered by the scheduling policy
+of the node, so picking the next task only compares the heads of a few
+heaps instead of scanning all tasks.
+
+Admission tests the task type against a bitmask of accepted type codes,
+so it costs the same no matter how many types the node accepts.
+
+Ready heaps assume tasks are started only through `pop_next`. Tasks
+started from outside are skipped when they reach the head of their heap.
+
+"""
+import heapq
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pipeliner.tasks import NotStartedState, Task
+
+
+def get_type_mask(types: Iterable) -> int:
+    """Get bitmask of task type codes.
+
+    Args:
+        types (Iterable): Task type classes.
+
+    Returns:
+        int: Mask with the bit of every type code set.
+
+    """
+    mask = 0
+    for task_type in types:
+        mask |= 1 << task_type.code
+    return mask
+
+
+class SchedulingPolicy(ABC):
+    """Order in which a node starts its waiting tasks.
+
+    Tasks with a lower key are started first, ties are broken by arrival.
+    Policies are pickled together with the nodes using them, so they must
+    not hold lambdas or other unpicklable state.
+
+    """
+
+    @abstractmethod
+    def get_key(self, task: Task) -> float:
+        """Get priority of the task, lower is started sooner.
+
+        Args:
+            task (Task): Waiting task.
+
+        Returns:
+            float: Priority key.
+
+        """
+        pass
+
+
+class FifoPolicy(SchedulingPolicy):
+    """Start tasks in the order they arrived."""
+
+    def get_key(self, task: Task) -> float:
+        return 0.0
+
+
+class ShortestFirstPolicy(SchedulingPolicy):
+    """Start the least difficult task first."""
+
+    def get_key(self, task: Task) -> float:
+        return task.difficulty
+
+
+def get_no_deadline(task: Task) -> float:
+    """Get deadline of a task that has none.
+
+    Args:
+        task (Task): Any task.
+
+    Returns:
+        float: Infinity.
+
+    """
+    return math.inf
+
+
+class DeadlineFirstPolicy(SchedulingPolicy):
+    """Start the task with the earliest deadline first.
+
+    Tasks do not store deadlines, they are looked up by a function, for
+    example in a dictionary filled by whoever creates the tasks.
+
+    Properties:
+        get_deadline (Callable[[Task], float]): Module level function
+            returning the simulation time the task is due.
+
+    """
+    get_deadline: Callable[[Task], float]
+
+    def __init__(self, get_deadline: Callable[[Task], float] = get_no_deadline):
+        self.get_deadline = get_deadline
+
+    def get_key(self, task: Task) -> float:
+        return self.get_deadline(task)
+
+
+class TaskQueue(object):
+    """Tasks of a node with admission and scheduling.
+
+    Properties:
+        tasks (List[Task]): All tasks of the node in the order of arrival.
+        slots (int): Number of tasks the node can hold.
+        accept_mask (int): Bitmask of accepted task type codes.
+        policy (SchedulingPolicy): Order of starting waiting tasks.
+
+        _ready (Dict[int, List[Tuple]]): Heap of waiting tasks per type
+            code, entries are (key, sequence, task).
+        _sequence (int): Arrival counter breaking ties between keys.
+
+    """
+    tasks: List[Task]
+    slots: int
+    accept_mask: int
+
+    _policy: SchedulingPolicy
+    _ready: Dict[int, List[Tuple[float, int, Task]]]
+    _sequence: int
+
+    def __init__(self, slots: int = 0, policy: Optional[SchedulingPolicy] = None):
+        self.tasks = []
+        self.slots = slots
+        self.accept_mask = 0
+        self._policy = policy if policy is not None else FifoPolicy()
+        self._ready = {}
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    @property
+    def policy(self) -> SchedulingPolicy:
+        return self._policy
+
+    @policy.setter
+    def policy(self, value: SchedulingPolicy) -> None:
+        self._policy = value
+        self._rebuild()
+
+    @property
+    def free_slots(self) -> int:
+        """Number of tasks that can still be added."""
+        return max(0, self.slots - len(self.tasks))
+
+    @property
+    def occupancy(self) -> float:
+        """Part of the slots holding tasks, between 0 and 1."""
+        if self.slots <= 0:
+            return 1.0 if self.tasks else 0.0
+        return min(1.0, len(self.tasks) / self.slots)
+
+    @property
+    def ready(self) -> int:
+        """Number of tasks waiting to be started."""
+        return sum(len(heap) for heap in self._ready.values())
+
+    def count_ready(self, type_code: int) -> int:
+        """Get number of waiting tasks of the type.
+
+        Args:
+            type_code (int): Code of the task type.
+
+        Returns:
+            int: Number of waiting tasks.
+
+        """
+        return len(self._ready.get(type_code, ()))
+
+    def count_ready_matching(self, mask: int) -> int:
+        """Get number of waiting tasks whose type is in the mask.
+
+        Args:
+            mask (int): Bitmask of task type codes.
+
+        Returns:
+            int: Number of waiting tasks.
+
+        """
+        return sum(len(heap) for code, heap in self._ready.items() if mask >> code & 1)
+
+    def accepts(self, task: Task) -> bool:
+        """Check if the node accepts the type of the task.
+
+        Args:
+            task (Task): Task to check.
+
+        Returns:
+            bool: True if the type is accepted.
+
+        """
+        return bool(self.accept_mask >> task.type.code & 1)
+
+    def admits(self, task: Task) -> bool:
+        """Check if the task is accepted and there is a free slot for it.
+
+        Args:
+            task (Task): Task to check.
+
+        Returns:
+            bool: True if the task can be added.
+
+        """
+        return len(self.tasks) < self.slots and bool(self.accept_mask >> task.type.code & 1)
+
+    def push(self, task: Task) -> bool:
+        """Add task if it is admitted.
+
+        Args:
+            task (Task): Task to add.
+
+        Returns:
+            bool: True if the task was added.
+
+        """
+        if not self.admits(task):
+            return False
+        self.tasks.append(task)
+        self._push_ready(task)
+        return True
+
+    def _push_ready(self, task: Task) -> None:
+        if not isinstance(task.state, NotStartedState):
+            return
+        self._sequence += 1
+        heapq.heappush(
+            self._ready.setdefault(task.type.code, []),
+            (self._policy.get_key(task), self._sequence, task))
+
+    def peek_next(self) -> Optional[Task]:
+        """Get task the node would start next without starting it.
+
+        Returns:
+            Optional[Task]: Next waiting task or None.
+
+        """
+        best = None
+        for heap in self._ready.values():
+            while heap and not isinstance(heap[0][2].state, NotStartedState):
+                heapq.heappop(heap)
+            if heap and (best is None or heap[0] < best):
+                best = heap[0]
+        return best[2] if best is not None else None
+
+    def pop_next(self) -> Optional[Task]:
+        """Remove and return the task the node should start next.
+
+        Task stays in `tasks`, it only stops waiting.
+
+        Returns:
+            Optional[Task]: Next waiting task or None.
+
+        """
+        task = self.peek_next()
+        if task is not None:
+            heapq.heappop(self._ready[task.type.code])
+        return task
+
+    def take(self, mask: int, count: int) -> List[Task]:
+        """Remove waiting tasks whose type is in the mask.
+
+        Tasks are taken in the order the node would start them, the list
+        of all tasks is rebuilt once for the whole batch.
+
+        Args:
+            mask (int): Bitmask of task type codes to take.
+            count (int): Maximum number of tasks to take.
+
+        Returns:
+            List[Task]: Taken tasks.
+
+        """
+        taken = []
+        # merge heads of the masked heaps, entries are unique by sequence
+        heads = [
+            (heap[0], code) for code, heap in self._ready.items()
+            if heap and mask >> code & 1]
+        heapq.heapify(heads)
+        while heads and len(taken) < count:
+            (_, _, task), code = heapq.heappop(heads)
+            heap = self._ready[code]
+            heapq.heappop(heap)
+            if isinstance(task.state, NotStartedState):
+                taken.append(task)
+            if heap:
+                heapq.heappush(heads, (heap[0], code))
+        if taken:
+            gone = set(taken)
+            self.tasks = [task for task in self.tasks if task not in gone]
+        return taken
+
+    def remove(self, tasks: Set[Task]) -> None:
+        """Remove tasks from the queue.
+
+        Args:
+            tasks (Set[Task]): Tasks to remove.
+
+        """
+        self.tasks = [task for task in self.tasks if task not in tasks]
+        if any(isinstance(task.state, NotStartedState) for task in tasks):
+            self._rebuild()
+
+    def reset(self, tasks: Iterable[Task]) -> None:
+        """Replace all tasks without admission checks.
+
+        Used when restoring a node, tasks that have not started are
+        queued by the policy in the given order.
+
+        Args:
+            tasks (Iterable[Task]): New tasks of the node.
+
+        """
+        self.tasks = list(tasks)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._ready = {}
+        self._sequence = 0
+        for task in self.tasks:
+            self._push_ready(task)
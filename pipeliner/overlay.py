@@ -0,0 +1,170 @@
+"""Overlays drawn over the scene.
+
+Throughput overlay outlines bottleneck nodes and shows the maximum
+throughput in the corner of the window. Shapes are rebuilt only for nodes
+that moved or when the analysis result changes.
+
+Profiler HUD shows timings of the game loop phases.
+
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyglet
+
+from pipeliner.actors.node import Bounds, Node
+from pipeliner.model.analysis import Throughput
+from pipeliner.profiler import Profiler, profiler
+from pipeliner.renderer import Layer, get_layer
+from pipeliner.text import CachedLabel
+
+BOTTLENECK_COLOR = (230, 60, 60, 255)
+
+
+class ThroughputOverlay(object):
+    """Outlines of bottleneck nodes and the throughput label.
+
+    Properties:
+        visible (bool): Whether the overlay is shown.
+
+        _result (Optional[Throughput]): Result currently shown.
+        _outlines (Dict[Node, Tuple[Bounds, List]]): Outline bounds and
+            shapes of every bottleneck node.
+
+    """
+    _result: Optional[Throughput]
+    _outlines: Dict[Node, Tuple[Bounds, List]]
+
+    def __init__(self, batch: pyglet.graphics.Batch, x: int = 10, y: int = 40):
+        self._visible = False
+        self._batch = batch
+        self._result = None
+        self._outlines = {}
+        self._label = CachedLabel(
+            "", x=x, y=y, font_size=10, color=BOTTLENECK_COLOR,
+            batch=batch, group=get_layer(Layer.HUD))
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+        self._visible = value
+        if not value:
+            self._clear()
+            self._label.text = ""
+            self._result = None
+
+    def _clear(self) -> None:
+        for _, shapes in self._outlines.values():
+            for shape in shapes:
+                shape.delete()
+        self._outlines = {}
+
+    def update(self, result: Throughput, views: Iterable[Node]) -> None:
+        """Show the analysis result over the views.
+
+        Args:
+            result (Throughput): Result of the throughput analysis.
+            views (Iterable[Node]): Views of the analyzed nodes.
+
+        """
+        if not self._visible:
+            return
+
+        if result is not self._result:
+            self._clear()
+            self._result = result
+            self._label.text = f"Throughput: {result.throughput:.2f} tasks/h"
+
+        bottlenecks = set(result.bottlenecks)
+        for view in views:
+            if view.model not in bottlenecks:
+                continue
+            node_bounds = view.get_bounds()
+            bounds = Bounds(
+                node_bounds.x1 - 4, node_bounds.y1 - 4,
+                node_bounds.x2 + 4, node_bounds.y2 + 4)
+            outline = self._outlines.get(view)
+            if outline is not None:
+                if outline[0] == bounds:
+                    continue
+                for shape in outline[1]:
+                    shape.delete()
+            self._outlines[view] = (
+                bounds, bounds.get_shapes(BOTTLENECK_COLOR, self._batch))
+
+
+class ProfilerHud(object):
+    """On-screen summary of the profiler.
+
+    Text is refreshed a few times per second only, so the HUD does not
+    lay out text every frame.
+
+    Properties:
+        profiler (Profiler): Profiler to show.
+        interval (float): Seconds between refreshes.
+
+    """
+    profiler: Profiler
+    interval: float
+
+    def __init__(
+            self, batch: pyglet.graphics.Batch, profiler: Profiler = profiler,
+            x: int = 10, y: int = 600, line_height: int = 14,
+            interval: float = 0.25,
+            group: Optional[pyglet.graphics.Group] = None):
+        self.profiler = profiler
+        self.interval = interval
+        self._batch = batch
+        self._group = group
+        self._x = x
+        self._y = y
+        self._line_height = line_height
+        self._labels = []
+        self._refreshed = None
+
+    def _get_lines(self) -> List[str]:
+        profiler = self.profiler
+        lines = [
+            f"frames {profiler.frames}  overruns {profiler.overruns}"
+            f"  budget {profiler.budget_ms:.1f} ms",
+        ]
+        for name, stats in sorted(profiler.phases.items()):
+            lines.append(
+                f"{name:<12} {stats.last_ms:7.2f} ms  mean {stats.mean_ms:6.2f}"
+                f"  max {stats.max_ms:6.2f}")
+        for name, value in sorted(profiler.counters.items()):
+            lines.append(f"{name:<12} {value:g}")
+        return lines
+
+    def update(self, now: Optional[float] = None) -> None:
+        """Refresh the text if the interval passed.
+
+        Args:
+            now (Optional[float]): Current time in seconds, defaults
+                to `time.perf_counter`.
+
+        """
+        if not self.profiler.enabled:
+            for label in self._labels:
+                label.delete()
+            self._labels = []
+            self._refreshed = None
+            return
+        now = time.perf_counter() if now is None else now
+        if self._refreshed is not None and now - self._refreshed < self.interval:
+            return
+        self._refreshed = now
+
+        lines = self._get_lines()
+        while len(self._labels) < len(lines):
+            self._labels.append(CachedLabel(
+                "", x=self._x, y=self._y - len(self._labels) * self._line_height,
+                font_name="Courier New", font_size=9,
+                batch=self._batch, group=self._group))
+        while len(self._labels) > len(lines):
+            self._labels.pop().delete()
+        for label, line in zip(self._labels, lines):
+            label.text = line
@@ -0,0 +1,247 @@
+"""Lightweight profiler of the game loop.
+
+Hot paths wrap their phases with `profiler.phase(name)`. While the
+profiler is disabled the phase is a shared object that does nothing,
+so instrumentation costs a single method call. Enabled profiler keeps
+timing statistics of every phase, counts frames over the frame budget
+and records trace events that can be exported in the Chrome trace event
+format and opened in `chrome://tracing` or Perfetto.
+
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Tuple
+
+
+@dataclass
+class PhaseStats:
+    """Timing statistics of a phase.
+
+    Properties:
+        count (int): How many times the phase ran.
+        total_ms (float): Total time spent in the phase.
+        last_ms (float): Time of the last run.
+        max_ms (float): Time of the slowest run.
+
+    """
+    count: int = 0
+    total_ms: float = 0.0
+    last_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class _Phase(object):
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._profiler._depth += 1
+        self._start = time.perf_counter_ns()
+
+    def __exit__(self, *exc) -> bool:
+        end = time.perf_counter_ns()
+        profiler = self._profiler
+        profiler._depth -= 1
+        profiler.record(self._name, self._start, end)
+        if not profiler._depth:
+            profiler._frame_work += end - self._start
+        return False
+
+
+class _NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class Profiler(object):
+    """Per-phase timers, counters and trace events.
+
+    Properties:
+        enabled (bool): Whether phases are measured.
+        budget_ms (float): Time of work in a frame above which the frame
+            overran. Work is the time spent in outermost phases.
+        phases (Dict[str, PhaseStats]): Statistics of every phase.
+        counters (Dict[str, float]): Last value of every counter.
+        frames (int): Frames ended since the profiler was enabled.
+        overruns (int): Frames whose work took longer than the budget.
+
+        _events (Deque[Tuple]): Recorded trace events.
+
+    """
+    enabled: bool
+    budget_ms: float
+    phases: Dict[str, PhaseStats]
+    counters: Dict[str, float]
+    frames: int
+    overruns: int
+
+    _events: Deque[Tuple]
+
+    def __init__(self, budget_ms: float = 1000 / 60, max_events: int = 100000):
+        self._enabled = False
+        self.budget_ms = budget_ms
+        self._events = deque(maxlen=max_events)
+        self._origin = time.perf_counter_ns()
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        if value and not self._enabled:
+            self.reset()
+        self._enabled = value
+
+    def reset(self) -> None:
+        """Forget all statistics and trace events."""
+        self.phases = {}
+        self.counters = {}
+        self.frames = 0
+        self.overruns = 0
+        self._events.clear()
+        self._frame_start = None
+        self._frame_work = 0
+        self._depth = 0
+
+    def phase(self, name: str):
+        """Get context manager measuring the phase.
+
+        Args:
+            name (str): Name of the phase.
+
+        Returns:
+            Context manager timing its block while the profiler is enabled.
+
+        """
+        if not self._enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """Decorate function so every call is measured as the phase.
+
+        Args:
+            name (str): Name of the phase.
+
+        Returns:
+            Callable: Decorator.
+
+        """
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self._enabled:
+                    return function(*args, **kwargs)
+                with _Phase(self, name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name: str, start: int, end: int) -> None:
+        """Record a finished run of the phase.
+
+        Args:
+            name (str): Name of the phase.
+            start (int): Start of the run from `time.perf_counter_ns`.
+            end (int): End of the run from `time.perf_counter_ns`.
+
+        """
+        duration_ms = (end - start) / 1e6
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        stats.count += 1
+        stats.total_ms += duration_ms
+        stats.last_ms = duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        self._events.append(("X", name, start, end - start, threading.get_ident()))
+
+    def count(self, name: str, value: float) -> None:
+        """Set value of the counter.
+
+        Args:
+            name (str): Name of the counter.
+            value (float): New value.
+
+        """
+        if not self._enabled:
+            return
+        self.counters[name] = value
+        self._events.append(("C", name, time.perf_counter_ns(), value, 0))
+
+    def end_frame(self) -> None:
+        """Mark the end of a frame and check its work against the budget.
+
+        Time between two ends is recorded as the frame phase.
+
+        """
+        if not self._enabled:
+            return
+        now = time.perf_counter_ns()
+        if self._frame_start is not None:
+            self.record("frame", self._frame_start, now)
+        work_ms = self._frame_work / 1e6
+        self.count("work_ms", round(work_ms, 3))
+        if work_ms > self.budget_ms:
+            self.overruns += 1
+        self._frame_work = 0
+        self._frame_start = now
+        self.frames += 1
+
+    def get_trace(self) -> Dict:
+        """Get recorded events in the Chrome trace event format.
+
+        Returns:
+            Dict: Trace with complete events for phases and counter events.
+
+        """
+        pid = os.getpid()
+        events: List[Dict] = []
+        for kind, name, start, value, thread in self._events:
+            event = {
+                "name": name, "ph": kind, "pid": pid, "tid": thread,
+                "ts": (start - self._origin) / 1000,
+            }
+            if kind == "X":
+                event["dur"] = value / 1000
+            else:
+                event["args"] = {name: value}
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_trace(self, path: str) -> None:
+        """Write recorded events to a Chrome trace JSON file.
+
+        Args:
+            path (str): Path of the file.
+
+        """
+        with open(path, "w") as stream:
+            json.dump(self.get_trace(), stream)
+
+
+#: Profiler shared by the whole game.
+profiler = Profiler()
+
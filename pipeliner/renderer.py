@@ -0,0 +1,177 @@
+"""Renderer drawing the whole scene through a single batch.
+
+All shapes of the game live in one `pyglet.graphics.Batch`. Draw order is
+defined by layers - ordered groups shared by every shape of the same kind,
+so pyglet can merge them into as few draw calls as possible.
+
+Every layer but the HUD is drawn in world coordinates through the view
+of the camera, the HUD stays in window coordinates.
+
+"""
+import pyglet
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from pipeliner.profiler import profiler
+
+if TYPE_CHECKING:
+    from pipeliner.camera import Camera
+
+
+class Layer(IntEnum):
+    """Draw order of the scene, lower layers are drawn first."""
+    CONNECTIONS = 0
+    NODES = 1
+    NODE_DETAILS = 2
+    TASKS = 3
+    TASK_DETAILS = 4
+    LABELS = 5
+    OVERLAY = 6
+    HUD = 7
+
+
+class WorldGroup(pyglet.graphics.Group):
+    """Parent group of all world layers applying the camera view.
+
+    Properties:
+        camera: Camera with a `window` and a `view` matrix, None draws
+            world layers with the view of the window.
+
+    """
+
+    def __init__(self, order: int = 0):
+        super().__init__(order=order)
+        self.camera = None
+        self._previous_view = None
+
+    def set_state(self) -> None:
+        if self.camera is None:
+            return
+        window = self.camera.window
+        self._previous_view = window.view
+        window.view = self.camera.view
+
+    def unset_state(self) -> None:
+        if self.camera is None or self._previous_view is None:
+            return
+        self.camera.window.view = self._previous_view
+        self._previous_view = None
+
+
+_WORLD_GROUP = WorldGroup(order=0)
+
+_LAYER_GROUPS: Dict[Layer, pyglet.graphics.Group] = {
+    layer: pyglet.graphics.Group(
+        order=layer, parent=None if layer is Layer.HUD else _WORLD_GROUP)
+    for layer in Layer
+}
+
+
+def get_layer(layer: Layer) -> pyglet.graphics.Group:
+    """Get group for the layer.
+
+    Groups are shared by all batches so shapes of the same kind end up
+    in the same vertex domain.
+
+    Args:
+        layer (Layer): Layer to get the group for.
+
+    Returns:
+        pyglet.graphics.Group: Ordered group of the layer.
+
+    """
+    return _LAYER_GROUPS[layer]
+
+
+@dataclass
+class FrameStats:
+    """Statistics of the last drawn frame.
+
+    Properties:
+        draw_calls (int): Number of draw calls issued by the batch.
+        vertices (int): Number of vertices in the batch.
+
+    """
+    draw_calls: int = 0
+    vertices: int = 0
+
+
+class Renderer(object):
+    """Owner of the scene batch.
+
+    Nodes keep their shapes in the batch between frames, renderer only
+    asks them to refresh what changed and draws everything at once.
+
+    Properties:
+        batch (pyglet.graphics.Batch): Batch holding every shape of the scene.
+        groups (Dict[Layer, pyglet.graphics.Group]): Ordered layer groups.
+        stats (FrameStats): Statistics of the last drawn frame.
+        camera (Optional[Camera]): Camera the world layers are drawn
+            through, None draws them in window coordinates.
+
+    """
+    batch: pyglet.graphics.Batch
+    groups: Dict[Layer, pyglet.graphics.Group]
+    stats: FrameStats
+
+    def __init__(self):
+        self.batch = pyglet.graphics.Batch()
+        self.groups = _LAYER_GROUPS
+        self.stats = FrameStats()
+
+    @property
+    def camera(self) -> Optional["Camera"]:
+        return _WORLD_GROUP.camera
+
+    @camera.setter
+    def camera(self, value: Optional["Camera"]) -> None:
+        _WORLD_GROUP.camera = value
+
+    def draw(self, nodes: Iterable = ()) -> FrameStats:
+        """Draw the scene.
+
+        Args:
+            nodes (Iterable): Nodes to refresh before drawing.
+
+        Returns:
+            FrameStats: Statistics of the drawn frame.
+
+        """
+        with profiler.phase("sync"):
+            for node in nodes:
+                node.sync()
+        with profiler.phase("batch.draw"):
+            self.batch.draw()
+        self.stats = self.get_stats()
+        profiler.count("draw_calls", self.stats.draw_calls)
+        profiler.count("vertices", self.stats.vertices)
+        return self.stats
+
+    def get_stats(self) -> FrameStats:
+        """Count draw calls and vertices the batch draws.
+
+        Every non-empty vertex domain of a visible group is drawn
+        with a single call.
+
+        Returns:
+            FrameStats: Current statistics of the batch.
+
+        """
+        stats = FrameStats()
+        batch = self.batch
+
+        def visit(group: pyglet.graphics.Group) -> None:
+            if not group.visible:
+                return
+            for domain in batch.group_map.get(group, {}).values():
+                sizes = domain.allocator.get_allocated_regions()[1]
+                if sizes:
+                    stats.draw_calls += 1
+                    stats.vertices += sum(sizes)
+            for child in batch.group_children.get(group, ()):
+                visit(child)
+
+        for group in batch.top_groups:
+            visit(group)
+        return stats
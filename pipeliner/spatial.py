@@ -0,0 +1,205 @@
+"""Spatial index for picking nodes and their ports under the mouse.
+
+Bounds are stored in a uniform grid of square cells. Every item is
+registered in all cells its bounds overlap, so picking a point only
+looks at items of a single cell no matter how many nodes are in the scene.
+Rectangle queries, used to find what the camera sees, only look at the
+cells the rectangle overlaps.
+
+"""
+from enum import Enum
+from typing import Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from pipeliner.actors.node import Bounds, Node
+
+
+class Part(Enum):
+    """Pickable part of the node."""
+    BODY = "body"
+    IN_PORT = "in_port"
+    OUT_PORT = "out_port"
+
+
+class SpatialGrid(object):
+    """Uniform grid of bounds.
+
+    Properties:
+        cell_size (int): Size of the grid cell.
+
+        _cells (Dict[Tuple[int, int], Dict]): Items and their bounds per cell.
+        _items (Dict[Hashable, Tuple]): Bounds and cell range per item.
+
+    """
+    cell_size: int
+
+    _cells: Dict[Tuple[int, int], Dict[Hashable, Tuple]]
+    _items: Dict[Hashable, Tuple]
+
+    def __init__(self, cell_size: int = 128):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._items = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._items
+
+    def _cell_range(self, bounds: Tuple) -> Tuple[int, int, int, int]:
+        x1, y1, x2, y2 = bounds
+        size = self.cell_size
+        return int(x1 // size), int(y1 // size), int(x2 // size), int(y2 // size)
+
+    @staticmethod
+    def _iter_cells(cell_range: Tuple[int, int, int, int]) -> Iterator[Tuple[int, int]]:
+        cx1, cy1, cx2, cy2 = cell_range
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                yield cx, cy
+
+    def insert(self, item: Hashable, bounds: Bounds) -> None:
+        """Add item or move it to new bounds.
+
+        Args:
+            item (Hashable): Item to index.
+            bounds (Bounds): Bounds of the item.
+
+        """
+        rect = (bounds.x1, bounds.y1, bounds.x2, bounds.y2)
+        cell_range = self._cell_range(rect)
+        previous = self._items.get(item)
+        if previous is not None:
+            if previous[0] == rect:
+                return
+            if previous[1] != cell_range:
+                self.remove(item)
+        self._items[item] = (rect, cell_range)
+        for cell in self._iter_cells(cell_range):
+            self._cells.setdefault(cell, {})[item] = rect
+
+    def remove(self, item: Hashable) -> None:
+        """Remove item from the grid.
+
+        Args:
+            item (Hashable): Item to remove.
+
+        """
+        _, cell_range = self._items.pop(item)
+        for cell in self._iter_cells(cell_range):
+            items = self._cells[cell]
+            del items[item]
+            if not items:
+                del self._cells[cell]
+
+    def query(self, x: float, y: float) -> List[Hashable]:
+        """Get all items whose bounds contain the point.
+
+        Points on the edge of the bounds are outside.
+
+        Args:
+            x (float): X coordinate of the point.
+            y (float): Y coordinate of the point.
+
+        Returns:
+            List[Hashable]: Items under the point, last inserted first.
+
+        """
+        size = self.cell_size
+        items = self._cells.get((int(x // size), int(y // size)))
+        if not items:
+            return []
+        return [
+            item for item, (x1, y1, x2, y2) in reversed(items.items())
+            if x1 < x < x2 and y1 < y < y2
+        ]
+
+    def query_rect(self, x1: float, y1: float, x2: float, y2: float) -> Set[Hashable]:
+        """Get all items whose bounds overlap the rectangle.
+
+        Args:
+            x1 (float): Left edge of the rectangle.
+            y1 (float): Bottom edge of the rectangle.
+            x2 (float): Right edge of the rectangle.
+            y2 (float): Top edge of the rectangle.
+
+        Returns:
+            Set[Hashable]: Items overlapping the rectangle.
+
+        """
+        found = set()
+        cx1, cy1, cx2, cy2 = self._cell_range((x1, y1, x2, y2))
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._cells):
+            # zoomed far out, fewer occupied cells than cells in the range
+            candidates = (
+                items for (cx, cy), items in self._cells.items()
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2)
+        else:
+            candidates = (
+                self._cells[cell]
+                for cell in self._iter_cells((cx1, cy1, cx2, cy2))
+                if cell in self._cells)
+        for items in candidates:
+            for item, (ix1, iy1, ix2, iy2) in items.items():
+                if ix1 <= x2 and x1 <= ix2 and iy1 <= y2 and y1 <= iy2:
+                    found.add(item)
+        return found
+
+
+class NodeIndex(object):
+    """Index of node bodies and ports for hit testing.
+
+    Index follows nodes through their position listeners, so only the
+    nodes that moved are re-indexed.
+
+    """
+    _grid: SpatialGrid
+
+    def __init__(self, cell_size: int = 128):
+        self._grid = SpatialGrid(cell_size)
+
+    def add(self, node: Node) -> None:
+        """Start indexing the node.
+
+        Args:
+            node (Node): Node to index.
+
+        """
+        self._on_node_moved(node)
+        node.add_position_listener(self._on_node_moved)
+
+    def remove(self, node: Node) -> None:
+        """Stop indexing the node.
+
+        Args:
+            node (Node): Node to remove.
+
+        """
+        node.remove_position_listener(self._on_node_moved)
+        for part in Part:
+            if (node, part) in self._grid:
+                self._grid.remove((node, part))
+
+    def _on_node_moved(self, node: Node) -> None:
+        self._grid.insert((node, Part.BODY), node.get_bounds())
+        if node.in_port_position_bound:
+            self._grid.insert((node, Part.IN_PORT), node.in_port_position_bound)
+        if node.out_port_position_bound:
+            self._grid.insert((node, Part.OUT_PORT), node.out_port_position_bound)
+
+    def pick(self, x: float, y: float, part: Part = Part.BODY) -> Optional[Node]:
+        """Get node whose part is under the point.
+
+        Args:
+            x (float): X coordinate of the point.
+            y (float): Y coordinate of the point.
+            part (Part, optional): Part of the node to test. Defaults to Part.BODY.
+
+        Returns:
+            Optional[Node]: Last added node under the point or None.
+
+        """
+        for node, node_part in self._grid.query(x, y):
+            if node_part is part:
+                return node
+        return None
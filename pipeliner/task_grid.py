@@ -0,0 +1,146 @@
+"""Task view of a node drawn as a single vertex list.
+
+Every cell of the grid is two quads - the base of the cell and a smaller
+quad on top of it. Cells holding a task show the task type color with
+a state marker in the corner, empty slots show a gray border around
+a black center. Cells are written in place when the task in them changes,
+moving the grid only rewrites its translation.
+
+"""
+import pyglet
+from pyglet.gl import GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA, GL_TRIANGLES
+from typing import List, Optional, Sequence, Tuple
+
+from pipeliner.constants import TASK_PADDING, TASK_SIZE
+
+_VERTICES_PER_QUAD = 6
+_VERTICES_PER_CELL = 2 * _VERTICES_PER_QUAD
+
+EMPTY_SLOT_BORDER_COLOR = (128, 128, 128, 255)
+EMPTY_SLOT_COLOR = (0, 0, 0, 255)
+
+
+def _quad(x: float, y: float, width: float, height: float) -> Tuple:
+    x2 = x + width
+    y2 = y + height
+    return x, y, x2, y, x2, y2, x, y, x2, y2, x, y2
+
+
+def _rgba(color: Sequence[int]) -> Tuple[int, int, int, int]:
+    r, g, b, *a = color
+    return r, g, b, a[0] if a else 255
+
+
+class TaskGrid(object):
+    """Grid of task cells sharing one vertex list.
+
+    Properties:
+        columns (int): Number of cells in a row.
+        position (Tuple[int, int]): Position of the first cell.
+        visible (bool): Whether the grid is drawn, hidden grid has no
+            vertices and ignores updates.
+
+        _cells (List[Optional[Tuple]]): Type and state codes drawn in each
+            cell, None for empty slots.
+
+    """
+    columns: int
+
+    _cells: List[Optional[Tuple]]
+
+    def __init__(
+            self, batch: pyglet.graphics.Batch,
+            group: Optional[pyglet.graphics.Group] = None,
+            columns: int = 9):
+        self.columns = columns
+        self._batch = batch
+        self._group = pyglet.shapes.ShapeBase.group_class(
+            GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+            pyglet.shapes.get_default_shader(), group)
+        self._position = (0, 0)
+        self._cells = []
+        self._vertex_list = None
+        self._visible = True
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+        self._visible = value
+        if not value:
+            self._resize(0)
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        return self._position
+
+    @position.setter
+    def position(self, value: Tuple[int, int]) -> None:
+        self._position = value
+        if self._vertex_list is not None:
+            vertices = len(self._cells) * _VERTICES_PER_CELL
+            self._vertex_list.translation[:] = value * vertices
+
+    def _resize(self, count: int) -> None:
+        if self._vertex_list is not None:
+            self._vertex_list.delete()
+            self._vertex_list = None
+        self._cells = [False] * count
+        if count:
+            vertices = count * _VERTICES_PER_CELL
+            self._vertex_list = self._group.program.vertex_list(
+                vertices, GL_TRIANGLES, self._batch, self._group,
+                colors=("Bn", (0, 0, 0, 0) * vertices),
+                translation=("f", self._position * vertices))
+
+    def _get_cell_origin(self, index: int) -> Tuple[int, int]:
+        row, column = divmod(index, self.columns)
+        step = TASK_SIZE + TASK_PADDING
+        return column * step, -row * step
+
+    def update(self, tasks: Sequence, slots: int) -> None:
+        """Show tasks followed by empty slots.
+
+        Only cells whose task type or state changed are written.
+
+        Args:
+            tasks (Sequence[Task]): Tasks to show.
+            slots (int): Number of task slots.
+
+        """
+        if not self._visible:
+            return
+        count = max(len(tasks), slots)
+        if count != len(self._cells):
+            self._resize(count)
+
+        positions = self._vertex_list.position if count else None
+        colors = self._vertex_list.colors if count else None
+        for index in range(count):
+            task = tasks[index] if index < len(tasks) else None
+            cell = (task.type.code, task.state.code) if task is not None else None
+            if cell == self._cells[index]:
+                continue
+            self._cells[index] = cell
+
+            x, y = self._get_cell_origin(index)
+            start = index * _VERTICES_PER_CELL * 2
+            if task is None:
+                base = _rgba(EMPTY_SLOT_BORDER_COLOR)
+                top = _rgba(EMPTY_SLOT_COLOR)
+                top_quad = _quad(x + 1, y + 1, TASK_SIZE - 2, TASK_SIZE - 2)
+            else:
+                base = _rgba(task.type.color)
+                top = _rgba(task.state.color)
+                top_quad = _quad(x + TASK_SIZE - 2, y + TASK_SIZE - 2, 2, 2)
+            positions[start:start + _VERTICES_PER_CELL * 2] = (
+                _quad(x, y, TASK_SIZE, TASK_SIZE) + top_quad)
+            start = index * _VERTICES_PER_CELL * 4
+            colors[start:start + _VERTICES_PER_CELL * 4] = (
+                base * _VERTICES_PER_QUAD + top * _VERTICES_PER_QUAD)
+
+    def delete(self) -> None:
+        """Remove the grid from the batch."""
+        self._resize(0)
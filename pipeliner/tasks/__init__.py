@@ -3,7 +3,7 @@ from .status import (
     ApprovedStatus, DoneStatus, InProgressStatus, NotReadyStatus, ReadyStatus,
     RejectedStatus, ReviewStatus)
 from .type import CompositingTaskType, ModelingTaskType, RenderingTaskType, RotoscopingTaskType, EmptyTaskType
-from .task import Task, EmptyTask, SimpleCompositingTask
+from .task import Task, EmptyTask, SimpleCompositingTask, get_task_class
 
 __all__ = [
     "NotStartedState",
@@ -26,6 +26,7 @@ __all__ = [
     "EmptyTaskType",
 
     "EmptyTask",
-    "CompositingTask",
-    "Task"
+    "SimpleCompositingTask",
+    "Task",
+    "get_task_class",
 ]
\ No newline at end of file
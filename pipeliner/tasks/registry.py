@@ -0,0 +1,54 @@
+"""Shared instances of task types, states and statuses.
+
+Task types, states and statuses carry no per task data, so every subclass
+has exactly one instance. Instantiating the class returns the shared
+instance and the instance can be looked up by its small integer code,
+which is what compact task storage keeps.
+
+"""
+from typing import Dict
+
+
+class Interned(object):
+    """Base of classes with a single shared instance per subclass.
+
+    Every base class using it defines its own `_registry`, subclasses
+    defining `code` are registered in it.
+
+    """
+    __slots__ = ()
+
+    code: int
+    _registry: Dict[int, "Interned"]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "code" not in cls.__dict__:
+            return
+        if cls.code in cls._registry:
+            raise ValueError(
+                f"{cls.__name__} code {cls.code} is already used "
+                f"by {type(cls._registry[cls.code]).__name__}")
+        cls._registry[cls.code] = object.__new__(cls)
+
+    def __new__(cls):
+        return cls._registry[cls.code]
+
+    def __reduce__(self):
+        return type(self), ()
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+    @classmethod
+    def from_code(cls, code: int) -> "Interned":
+        """Get shared instance registered with the code.
+
+        Args:
+            code (int): Code of the instance.
+
+        Returns:
+            Interned: Shared instance.
+
+        """
+        return cls._registry[code]
@@ -1,26 +1,21 @@
 """Definition of task states."""
-from pyglet.graphics import Batch
-from pyglet.shapes import ShapeBase, Rectangle
-from typing import List
-from abc import ABC, abstractmethod
-from pipeliner.constants import TASK_SIZE
+from abc import ABC
+from pipeliner.tasks.registry import Interned
 
 
-class TaskState(ABC):
+class TaskState(Interned, ABC):
     """State base class.
     
     Every task has a state, which is represented by a color and a name.
-    State needs to define its visual representation to be combined finally
-    with the task and status of the task.
+    State color is combined in the task view with the task type and status
+    of the task.
 
     """
+    code: int
     name: str
     color: tuple
 
-    def get_shapes(self, x: int, y: int, batch: Batch) -> List[ShapeBase]:
-        return [
-            Rectangle(x + TASK_SIZE-2, y + (TASK_SIZE - 2), 2, 2, color=self.color, batch=batch),
-        ]
+    _registry = {}
 
 class NotStartedState(TaskState):
     """Not started state.
@@ -29,9 +24,9 @@ class NotStartedState(TaskState):
     This is the default state of a task.
 
     """
-    def __init__(self):
-        self.name = "Not Started"
-        self.color = (128, 128, 128)
+    code = 0
+    name = "Not Started"
+    color = (128, 128, 128)
 
 class InProgressState(TaskState):
     """In progress state.
@@ -39,9 +34,9 @@ class InProgressState(TaskState):
     Once a task is started by the node, it is in progress.
     
     """
-    def __init__(self):
-        self.name = "In Progress"
-        self.color = (96, 96, 200)
+    code = 1
+    name = "In Progress"
+    color = (96, 96, 200)
 
 class DoneState(TaskState):
     """Done state.
@@ -49,9 +44,9 @@ class DoneState(TaskState):
     When a task is finished, it is in done state or failed state.
 
     """
-    def __init__(self):
-        self.name = "Done"
-        self.color = (128, 200, 128)
+    code = 2
+    name = "Done"
+    color = (128, 200, 128)
 
 class FailedState(TaskState):
     """Failed state.
@@ -63,6 +58,6 @@ class FailedState(TaskState):
     detecting the failed task.
 
     """
-    def __init__(self):
-        self.name = "Failed"
-        self.color = (200, 150, 64)
+    code = 3
+    name = "Failed"
+    color = (200, 150, 64)
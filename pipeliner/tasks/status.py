@@ -8,72 +8,62 @@ for a review. Once the review is done, the task can be approved or rejected.
 
 """
 from abc import ABC
-from pipeliner.constants import TASK_SIZE
-from pyglet.graphics import Batch
-from pyglet.shapes import ShapeBase, BorderedRectangle
-from typing import List
+from pipeliner.tasks.registry import Interned
 
 
 
-class TaskStatus(ABC):
+class TaskStatus(Interned, ABC):
     """Status base class.
     
     Every task has a status, which is represented by a color and a name.
-    Status needs to define its visual representation to be combined finally
-    with the task and state of the task.
+    Status color is combined in the task view with the task type and state
+    of the task.
 
     """
+    code: int
     name: str
     color: tuple
 
-    def get_shapes(self, x: int, y: int, batch: Batch) -> List[ShapeBase]:
-        return [
-            BorderedRectangle(
-                x + TASK_SIZE-2, y + TASK_SIZE-2,
-                TASK_SIZE, TASK_SIZE,
-                border=1, border_color=self.color,
-                color=(0, 0, 0, 0),
-                batch=batch),
-        ]
+    _registry = {}
 
 
 class NotReadyStatus(TaskStatus):
-    def __init__(self):
-        self.name = "Not Ready"
-        self.color = (128, 128, 128)
+    code = 0
+    name = "Not Ready"
+    color = (128, 128, 128)
 
 
 class ReadyStatus(TaskStatus):
-    def __init__(self):
-        self.name = "Ready"
-        self.color = (128, 200, 128)
+    code = 1
+    name = "Ready"
+    color = (128, 200, 128)
 
 
 class InProgressStatus(TaskStatus):
-    def __init__(self):
-        self.name = "In Progress"
-        self.color = (128, 128, 200)
+    code = 2
+    name = "In Progress"
+    color = (128, 128, 200)
 
 
 class DoneStatus(TaskStatus):
-    def __init__(self):
-        self.name = "Done"
-        self.color = (200, 128, 128)
+    code = 3
+    name = "Done"
+    color = (200, 128, 128)
 
 
 class ReviewStatus(TaskStatus):
-    def __init__(self):
-        self.name = "Review"
-        self.color = (200, 200, 128)
+    code = 4
+    name = "Review"
+    color = (200, 200, 128)
 
 
 class ApprovedStatus(TaskStatus):
-    def __init__(self):
-        self.name = "Approved"
-        self.color = (128, 200, 200)
+    code = 5
+    name = "Approved"
+    color = (128, 200, 200)
 
 
 class RejectedStatus(TaskStatus):
-    def __init__(self):
-        self.name = "Rejected"
-        self.color = (200, 128, 200)
+    code = 6
+    name = "Rejected"
+    color = (200, 128, 200)
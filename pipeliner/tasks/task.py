@@ -12,12 +12,8 @@ itself.
 
 """
 from abc import ABC, abstractmethod
-from typing import List
+from typing import TYPE_CHECKING, Dict, Optional, Type, Union
 
-from pyglet.shapes import BorderedRectangle, ShapeBase
-from pyglet.graphics import Batch
-
-from pipeliner.actors.node import Node
 from pipeliner.tasks.state import (
     TaskState,
     NotStartedState,
@@ -41,6 +37,12 @@ from pipeliner.tasks.type import (
     CompositingTaskType
 )
 
+if TYPE_CHECKING:
+    from pipeliner.model.node import NodeModel
+
+#: Task classes by their id and by their class name, see `get_task_class`.
+_task_classes: Dict[Union[int, str], Type["Task"]] = {}
+
 
 class Task(ABC):
     """Task base class.
@@ -62,49 +64,47 @@ class Task(ABC):
     failure rate of 0.05 on a level 2 node. This means that a compositing task
     is more likely to fail on a level 1 node than on a level 2 node.
 
-    
+
+    Tasks are small, a studio can have millions of them. Task only stores
+    references to shared type, state and status instances and uses
+    `__slots__` instead of an instance dictionary. Subclasses need to
+    define `__slots__` as well to keep it that way.
+
+    Subclasses are registered by their id and name when they are defined,
+    so classes imported late, for example from plugins, can be loaded
+    with `get_task_class` as well.
+
     """
-    type: TaskType = EmptyTaskType()
-    state: TaskState = NotStartedState()
-    status: TaskStatus = NotReadyStatus()
+    __slots__ = (
+        "name", "assignee", "progress", "difficulty",
+        "type", "state", "status",
+    )
+
+    type: TaskType
+    state: TaskState
+    status: TaskStatus
     name: str
-    id: int
-    assignee: Node
+    id: int = 0
+    assignee: Optional["NodeModel"]
     progress: float
     difficulty: float
-    
-
-    _batch: Batch
 
-    def __init__(self, batch: Batch, name: str = "Empty", assignee: Node = None):
+    def __init__(self, name: str = "Empty", assignee: Optional["NodeModel"] = None):
         self.name = name
         self.assignee = assignee
         self.progress = 0.0
-        self._batch = batch
-
-
-    def get_shapes(self, x: int, y: int) -> List[ShapeBase]:
-        """Get the shapes that represent this task.
-        
-        Resulting shape is combination of tasks type and tasks state.
+        self.difficulty = 0.0
+        self.type = EmptyTaskType()
+        self.state = NotStartedState()
+        self.status = NotReadyStatus()
 
-        Args:
-            x (int): X coordinate of the task.
-            y (int): Y coordinate of the task.
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _task_classes.setdefault(cls.id, cls)
+        _task_classes.setdefault(cls.__name__, cls)
 
-        Todo:
-            * Add support for different shapes for different states.
-            * Add support for different shapes for different types.
-
-        Returns:
-            List[ShapeBase]: List of shapes that represent this task.
-
-        """
-        shapes = []
-        shapes += self.type.get_shapes(x, y, self._batch)
-        shapes += self.state.get_shapes(x, y, self._batch)
-        # shapes += self.status.get_shapes(x, y, self._batch)
-        return shapes
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, {self.state.name}, {self.progress:.2f})"
 
 
 class EmptyTask(Task):
@@ -114,25 +114,44 @@ class EmptyTask(Task):
     to fill the pipeline when there are no tasks available.
 
     """
-    def __init__(self, batch: Batch, name: str = "Empty", assignee: Node = None):
-        self.name = name
-        self.id = 0
-        self.assignee = assignee
-        self.progress = 0.0
-        
-        self._batch = batch
+    __slots__ = ()
+    id = 0
+
 
 class SimpleCompositingTask(Task):
-    def __init__(self, batch: Batch, name: str = "Simple Compositing", assignee: Node = None):
-        super().__init__(batch, name, assignee)
+    __slots__ = ()
+    id = 1
+
+    def __init__(self, name: str = "Simple Compositing", assignee: Optional["NodeModel"] = None):
+        super().__init__(name, assignee)
         self.type = CompositingTaskType()
-        self.id = 1
         self.difficulty = 0.1
 
 
 class MediumCompositingTask(Task):
-    def __init__(self, batch: Batch, name: str = "Medium Compositing", assignee: Node = None):
-        super().__init__(batch, name, assignee)
+    __slots__ = ()
+    id = 2
+
+    def __init__(self, name: str = "Medium Compositing", assignee: Optional["NodeModel"] = None):
+        super().__init__(name, assignee)
         self.type = CompositingTaskType()
-        self.id = 2
         self.difficulty = 0.5
+
+
+def get_task_class(key: Union[int, str]) -> Type[Task]:
+    """Find task class by its id or its class name.
+
+    Subclasses that do not define their own id share it with their base,
+    the id then refers to the class defined first.
+
+    Args:
+        key (Union[int, str]): Id or name of the task class.
+
+    Returns:
+        Type[Task]: Task class.
+
+    Raises:
+        KeyError: If there is no such task class.
+
+    """
+    return _task_classes[key]
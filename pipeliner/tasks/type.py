@@ -1,42 +1,35 @@
-from abc import ABC, abstractmethod
-from typing import List
-from pipeliner.constants import TASK_SIZE
+from abc import ABC
+from pipeliner.tasks.registry import Interned
 
-from pyglet.graphics import Batch
-from pyglet.shapes import ShapeBase
-from pyglet.shapes import Rectangle, BorderedRectangle
 
-
-class TaskType(ABC):
+class TaskType(Interned, ABC):
+    code: int
     name: str
     color: tuple
 
-    def get_shapes(self, x: int, y: int, batch: Batch) -> List[ShapeBase]:
-        return [
-            Rectangle(x, y, TASK_SIZE, TASK_SIZE, color=self.color, batch=batch),
-        ]
+    _registry = {}
 
 class EmptyTaskType(TaskType):
-    def __init__(self):
-        self.name = "Empty"
-        self.color = (32, 32, 32)
+    code = 0
+    name = "Empty"
+    color = (32, 32, 32)
 
 class CompositingTaskType(TaskType):
-    def __init__(self):
-        self.name = "Compositing"
-        self.color = (200, 128, 128)
+    code = 1
+    name = "Compositing"
+    color = (200, 128, 128)
 
 class RenderingTaskType(TaskType):
-    def __init__(self):
-        self.name = "Rendering"
-        self.color = (128, 200, 128)
+    code = 2
+    name = "Rendering"
+    color = (128, 200, 128)
 
 class ModelingTaskType(TaskType):
-    def __init__(self):
-        self.name = "Modeling"
-        self.color = (128, 128, 200)
+    code = 3
+    name = "Modeling"
+    color = (128, 128, 200)
 
 class RotoscopingTaskType(TaskType):
-    def __init__(self):
-        self.name = "Rotoscoping"
-        self.color = (200, 200, 128)
\ No newline at end of file
+    code = 4
+    name = "Rotoscoping"
+    color = (200, 200, 128)
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""Text that is laid out once.
+
+Laying out text is one of the most expensive things pyglet does and
+a `pyglet.text.Label` lays itself out again whenever its text, color or
+position is set. Text here is laid out only when its text really changes.
+
+`CachedLabel` is a label laid out around the origin and moved by the
+translation attribute of its vertices. `GlyphText` is for short
+static captions like port names - their glyph runs are cached and shared
+by all captions with the same text, every glyph is a sprite on the shared
+font texture.
+
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import pyglet
+from pyglet.font.base import Glyph
+from pyglet.graphics import Batch, Group
+from pyglet.graphics.shader import Shader, ShaderProgram
+
+
+# Font textures only carry coverage in their alpha channel, the color
+# comes from the vertices the same way pyglet's text layouts do it.
+_glyph_fragment_source = """#version 150 core
+    in vec4 vertex_colors;
+    in vec3 texture_coords;
+    out vec4 final_colors;
+
+    uniform sampler2D sprite_texture;
+
+    void main()
+    {
+        final_colors = vec4(vertex_colors.rgb, texture(sprite_texture, texture_coords.xy).a * vertex_colors.a);
+    }
+"""
+
+
+def get_glyph_shader() -> ShaderProgram:
+    """Get shader program drawing glyphs as sprites.
+
+    Returns:
+        ShaderProgram: Program shared by the current context.
+
+    """
+    context = pyglet.gl.current_context
+    try:
+        return context.pipeliner_glyph_shader
+    except AttributeError:
+        context.pipeliner_glyph_shader = ShaderProgram(
+            Shader(pyglet.sprite.vertex_source, "vertex"),
+            Shader(_glyph_fragment_source, "fragment"))
+        return context.pipeliner_glyph_shader
+
+
+@lru_cache(maxsize=None)
+def get_glyph_run(
+        text: str, font_size: float = 8,
+        font_name: Optional[str] = None,
+        bold: bool = False) -> Tuple[Tuple[Glyph, int], ...]:
+    """Get glyphs of the text with their offsets from the text origin.
+
+    Args:
+        text (str): Text to get glyphs for.
+        font_size (float, optional): Font size. Defaults to 8.
+        font_name (Optional[str], optional): Font name. Defaults to None.
+        bold (bool, optional): Bold font. Defaults to False.
+
+    Returns:
+        Tuple[Tuple[Glyph, int], ...]: Glyphs and their x offsets.
+
+    """
+    font = pyglet.font.load(font_name, font_size, bold=bold)
+    run = []
+    offset = 0
+    for glyph in font.get_glyphs(text):
+        run.append((glyph, offset))
+        offset += glyph.advance
+    return tuple(run)
+
+
+class GlyphText(object):
+    """Static single line text drawn from cached glyphs.
+
+    Text is drawn from its baseline like a label with default anchors.
+
+    Properties:
+        text (str): Text to draw.
+        position (Tuple[float, float]): Position of the text origin.
+        visible (bool): Whether the text is drawn.
+
+        _sprites (List[AdvancedSprite]): Sprite for every glyph.
+
+    """
+    text: str
+
+    _sprites: List[pyglet.sprite.AdvancedSprite]
+
+    def __init__(
+            self, text: str, x: float = 0, y: float = 0,
+            font_size: float = 8,
+            color: Tuple[int, int, int, int] = (255, 255, 255, 255),
+            batch: Optional[Batch] = None,
+            group: Optional[Group] = None):
+        self.text = text
+        self._position = (x, y)
+        self._run = get_glyph_run(text, font_size)
+        self._sprites = []
+        for glyph, offset in self._run:
+            sprite = pyglet.sprite.AdvancedSprite(
+                glyph,
+                x + offset + glyph.vertices[0], y + glyph.vertices[1],
+                batch=batch, group=group, program=get_glyph_shader())
+            sprite.color = color[:3]
+            sprite.opacity = color[3]
+            self._sprites.append(sprite)
+        self._visible = True
+
+    @property
+    def visible(self) -> bool:
+        return self._visible
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+        if value == self._visible:
+            return
+        self._visible = value
+        for sprite in self._sprites:
+            sprite.visible = value
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        return self._position
+
+    @position.setter
+    def position(self, value: Tuple[float, float]) -> None:
+        if value == self._position:
+            return
+        self._position = value
+        x, y = value
+        for sprite, (glyph, offset) in zip(self._sprites, self._run):
+            sprite.position = (x + offset + glyph.vertices[0], y + glyph.vertices[1], 0)
+
+    def delete(self) -> None:
+        """Remove the text from its batch."""
+        for sprite in self._sprites:
+            sprite.delete()
+        self._sprites = []
+
+
+class CachedLabel(pyglet.text.Label):
+    """Label that is laid out only when its text changes.
+
+    Glyphs are laid out around the origin and moved by the translation
+    of their vertices, so moving the label only rewrites the translation.
+    Setting the same color again does nothing and new text is laid out
+    once instead of once for removing the old text and once for
+    inserting the new one. Rotated labels are laid out again on every
+    move, their rotation anchor is part of the layout.
+
+    """
+
+    @pyglet.text.Label.text.setter
+    def text(self, value: str) -> None:
+        if value == self.document.text:
+            return
+        self.begin_update()
+        self.document.text = value
+        self.end_update()
+
+    @pyglet.text.Label.color.setter
+    def color(self, value: Tuple[int, int, int, int]) -> None:
+        if tuple(value) == tuple(self.color):
+            return
+        pyglet.text.Label.color.fset(self, value)
+
+    @pyglet.text.Label.position.setter
+    def position(self, value: Tuple[float, float, float]) -> None:
+        x, y, z = value
+        if z != self._z or self._rotation:
+            self._x, self._y, self._z = x, y, z
+            self._update()
+            return
+        self._x, self._y = x, y
+        self._translate()
+
+    def _set_x(self, x: float) -> None:
+        self.position = (x, self._y, self._z)
+
+    def _set_y(self, y: float) -> None:
+        self.position = (self._x, y, self._z)
+
+    def _get_left(self) -> float:
+        return super()._get_left() - self._x
+
+    def _get_top(self, lines) -> float:
+        return super()._get_top(lines) - self._y
+
+    def _update(self) -> None:
+        super()._update()
+        self._translate()
+
+    def _translate(self) -> None:
+        translation = (self._x, self._y, 0)
+        for vertex_list in self._vertex_lists:
+            vertex_list.translation[:] = translation * vertex_list.count
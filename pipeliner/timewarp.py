@@ -0,0 +1,163 @@
+"""Fast-forward of the simulation independent of the frame rate.
+
+The simulation advances in fixed steps of simulated hours, `TimeWarp`
+decides how many steps run in a frame from the real time that passed and
+the selected speed. At `MAX_SPEED` it runs as many steps as fit in the
+frame budget. The rules of the simulation do not change with the speed,
+only how much simulated time passes per real second.
+
+To keep the window responsive, a frame never simulates longer than its
+budget. Simulated time left over when the budget runs out is dropped
+instead of being caught up later, and after a slow frame the sync of
+simulated nodes is skipped for a few frames. Culling and drawing still
+run every frame, so panning and dragging stay responsive and only the
+simulation state on screen lags behind.
+
+"""
+import time
+from typing import Callable, Optional, Tuple
+
+from pipeliner.model import EventSimulation
+
+#: Speed running as many steps as fit in the frame budget.
+MAX_SPEED = None
+
+#: Speeds `faster` and `slower` switch between.
+SPEEDS: Tuple[Optional[float], ...] = (1.0, 10.0, 100.0, MAX_SPEED)
+
+
+class TimeWarp(object):
+    """Runs fixed simulation steps according to real time and speed.
+
+    Properties:
+        simulation (EventSimulation): Simulation advanced in steps.
+        speed (Optional[float]): Multiple of `hours_per_second` simulated
+            per real second, None runs at the maximum speed.
+        hours_per_second (float): Simulated hours per real second at 1x.
+        step_hours (float): Simulated hours of a single step.
+        max_frame_time (float): Most real seconds a single frame catches up,
+            longer pauses of the game loop are not simulated.
+        budget_ms (float): Most milliseconds of simulation in a frame.
+        max_skipped_frames (int): Most frames in a row drawn without sync.
+        steps (int): Steps run in the last frame.
+        dropped_hours (float): Simulated hours dropped since the start
+            because frames ran out of budget.
+        behind (bool): Whether the last frame ran out of budget.
+
+        _accumulator (float): Simulated hours not run yet.
+        _skipped (int): Frames in a row drawn without sync.
+
+    """
+    simulation: EventSimulation
+    hours_per_second: float
+    step_hours: float
+    max_frame_time: float
+    budget_ms: float
+    max_skipped_frames: int
+    steps: int
+    dropped_hours: float
+    behind: bool
+
+    _accumulator: float
+    _skipped: int
+
+    def __init__(
+            self, simulation: EventSimulation,
+            hours_per_second: float = 1.0, step_hours: float = 0.1,
+            max_frame_time: float = 0.25, budget_ms: float = 10.0,
+            max_skipped_frames: int = 4,
+            clock: Callable[[], float] = time.perf_counter):
+        self.simulation = simulation
+        self._speed = SPEEDS[0]
+        self.hours_per_second = hours_per_second
+        self.step_hours = step_hours
+        self.max_frame_time = max_frame_time
+        self.budget_ms = budget_ms
+        self.max_skipped_frames = max_skipped_frames
+        self.steps = 0
+        self.dropped_hours = 0.0
+        self.behind = False
+        self._clock = clock
+        self._accumulator = 0.0
+        self._skipped = 0
+
+    @property
+    def speed(self) -> Optional[float]:
+        return self._speed
+
+    @speed.setter
+    def speed(self, value: Optional[float]) -> None:
+        self._speed = value
+        self._accumulator = 0.0
+
+    @property
+    def label(self) -> str:
+        """Speed as shown to the player."""
+        return "max" if self._speed is MAX_SPEED else f"{self._speed:g}x"
+
+    def faster(self) -> None:
+        """Switch to the next faster speed of `SPEEDS`."""
+        index = SPEEDS.index(self._speed) if self._speed in SPEEDS else 0
+        self.speed = SPEEDS[min(index + 1, len(SPEEDS) - 1)]
+
+    def slower(self) -> None:
+        """Switch to the next slower speed of `SPEEDS`."""
+        index = SPEEDS.index(self._speed) if self._speed in SPEEDS else 0
+        self.speed = SPEEDS[max(index - 1, 0)]
+
+    def update(self, delta_time: float) -> int:
+        """Run the steps due for the real time that passed.
+
+        Nodes are not synced for drawing, call `should_sync` when drawing.
+
+        Args:
+            delta_time (float): Real seconds since the last update.
+
+        Returns:
+            int: Number of steps run.
+
+        """
+        delta_time = min(delta_time, self.max_frame_time)
+        deadline = self._clock() + self.budget_ms / 1000
+        steps = 0
+        if self._speed is MAX_SPEED:
+            # at least one step, so the simulation always moves
+            while True:
+                self.simulation.step(self.step_hours, sync=False)
+                steps += 1
+                if self._clock() >= deadline:
+                    break
+            self.behind = False
+        else:
+            self._accumulator += delta_time * self._speed * self.hours_per_second
+            # tolerate float error so 0.1 + 0.1 + 0.1 still runs three steps
+            due = int(self._accumulator / self.step_hours + 1e-9)
+            while steps < due:
+                self.simulation.step(self.step_hours, sync=False)
+                steps += 1
+                if steps < due and self._clock() >= deadline:
+                    break
+            self._accumulator = max(0.0, self._accumulator - steps * self.step_hours)
+            self.behind = steps < due
+            if self.behind:
+                self.dropped_hours += self._accumulator
+                self._accumulator = 0.0
+        self.steps = steps
+        return steps
+
+    def should_sync(self) -> bool:
+        """Check whether simulated nodes should be synced this frame.
+
+        After a frame that ran out of budget, up to `max_skipped_frames`
+        frames in a row skip the sync and draw the simulation state of
+        the last synced frame.
+
+        Returns:
+            bool: True if the frame should sync simulated nodes.
+
+        """
+        if self.behind and self._skipped < self.max_skipped_frames:
+            self._skipped += 1
+            return False
+        self._skipped = 0
+        return True
@@ -0,0 +1,369 @@
+"""Simulation running in a background thread.
+
+In the default mode the simulation is stepped by the pyglet event loop,
+so a slow step delays drawing and input and a slow frame delays the
+simulation. `SimulationWorker` runs the simulation and its time warp in
+a thread of its own instead. The thread owns the simulated nodes, nothing
+else touches them:
+
+* After every run the worker publishes an immutable `Snapshot` of the
+  node state into a `SnapshotBuffer`. Snapshots of nodes that did not
+  change are shared with the previous snapshot.
+* The render loop keeps its own display copies of the node models and
+  `SnapshotMirror` copies the latest snapshot into them. Views draw the
+  display models the same way they draw simulated ones.
+* Edits made by the player, like moving or connecting nodes, are sent
+  to the worker as commands and run in its thread before the next step.
+
+Positions edited by the player are shown on the display models right
+away. Positions from snapshots taken before the worker ran all submitted
+commands would move nodes back, so they are applied only once the worker
+caught up.
+
+The thread shares the interpreter lock with the event loop, it does not
+make the simulation faster, but a long step no longer blocks drawing and
+input for its whole duration.
+
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from pipeliner.model import Dirty, EventSimulation, NodeModel
+from pipeliner.tasks import Task, get_task_class
+from pipeliner.tasks.state import TaskState
+from pipeliner.tasks.status import TaskStatus
+from pipeliner.tasks.type import TaskType
+from pipeliner.timewarp import TimeWarp
+
+
+@dataclass(frozen=True)
+class NodeSnapshot:
+    """State of a node needed to draw it.
+
+    Properties:
+        x (float): X position of the node.
+        y (float): Y position of the node.
+        level (int): Level of the node.
+        current_hour (float): Current hour in the working day.
+        work_hours (int): Hours the node works per day.
+        task_slots (int): Number of tasks the node can hold.
+        tasks (Tuple[Tuple[int, int, int, int], ...]): Class id, type,
+            state and status code of every task.
+        current (int): Index of the current task or -1.
+        progress (float): Progress of the current task.
+
+    """
+    x: float
+    y: float
+    level: int
+    current_hour: float
+    work_hours: int
+    task_slots: int
+    tasks: Tuple[Tuple[int, int, int, int], ...]
+    current: int
+    progress: float
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """State of all simulated nodes at one moment.
+
+    Properties:
+        sequence (int): Number of the snapshot, increasing.
+        time (float): Simulated time of the snapshot.
+        delivered (int): Tasks that left the pipeline.
+        applied (int): Sequence of the last command run before it.
+        nodes (Tuple[NodeSnapshot, ...]): State of every node in the
+            order they were added to the simulation.
+
+    """
+    sequence: int
+    time: float
+    delivered: int
+    applied: int
+    nodes: Tuple[NodeSnapshot, ...]
+
+
+class SnapshotBuffer(object):
+    """Two snapshot slots, one being read and one being written.
+
+    Writer fills the back slot and then flips which slot is the front.
+    Flipping is a single assignment, so readers never see a snapshot
+    that is only partly published and need no lock.
+
+    Properties:
+        _slots (List[Optional[Snapshot]]): Front and back snapshot.
+        _front (int): Index of the slot readers get.
+
+    """
+    _slots: List[Optional[Snapshot]]
+    _front: int
+
+    def __init__(self):
+        self._slots = [None, None]
+        self._front = 0
+
+    @property
+    def latest(self) -> Optional[Snapshot]:
+        """Last published snapshot or None."""
+        return self._slots[self._front]
+
+    def publish(self, snapshot: Snapshot) -> None:
+        """Make the snapshot the latest one.
+
+        Args:
+            snapshot (Snapshot): Snapshot to publish.
+
+        """
+        back = 1 - self._front
+        self._slots[back] = snapshot
+        self._front = back
+
+
+def take_node_snapshot(
+        node: NodeModel,
+        previous: Optional[NodeSnapshot] = None) -> NodeSnapshot:
+    """Capture state of the node.
+
+    Task codes are only collected again if the tasks of the node changed
+    since the previous snapshot.
+
+    Args:
+        node (NodeModel): Node to capture.
+        previous (Optional[NodeSnapshot]): Last snapshot of the node.
+
+    Returns:
+        NodeSnapshot: State of the node.
+
+    """
+    if previous is not None and not node.dirty & Dirty.TASKS:
+        tasks = previous.tasks
+        current = previous.current
+    else:
+        tasks = tuple(
+            (type(task).id, task.type.code, task.state.code, task.status.code)
+            for task in node.tasks)
+        current = -1
+        if node.current_task is not None:
+            current = next(
+                i for i, task in enumerate(node.tasks) if task is node.current_task)
+    task = node.current_task
+    return NodeSnapshot(
+        node.x, node.y, node.level, node.current_hour, node.work_hours,
+        node.task_slots, tasks, current, task.progress if task is not None else 0.0)
+
+
+class SimulationWorker(object):
+    """Thread running the simulation and publishing snapshots.
+
+    Properties:
+        simulation (EventSimulation): Simulation owned by the thread.
+        time_warp (TimeWarp): Decides how far the simulation runs.
+        interval (float): Real seconds between runs.
+        snapshots (SnapshotBuffer): Published snapshots.
+        submitted (int): Sequence of the last submitted command.
+        applied (int): Sequence of the last command run.
+
+        _commands (queue.SimpleQueue): Commands waiting for the thread.
+        _node_snapshots (List[NodeSnapshot]): Last snapshot of every node.
+        _thread (Optional[threading.Thread]): Running thread.
+        _stop (threading.Event): Set to stop the thread.
+
+    """
+    simulation: EventSimulation
+    time_warp: TimeWarp
+    interval: float
+    snapshots: SnapshotBuffer
+    submitted: int
+    applied: int
+
+    _commands: queue.SimpleQueue
+    _node_snapshots: List[NodeSnapshot]
+    _thread: Optional[threading.Thread]
+    _stop: threading.Event
+
+    def __init__(
+            self, simulation: EventSimulation,
+            time_warp: Optional[TimeWarp] = None,
+            interval: float = 1 / 120):
+        self.simulation = simulation
+        self.time_warp = time_warp if time_warp is not None else TimeWarp(simulation)
+        self.interval = interval
+        self.snapshots = SnapshotBuffer()
+        self.submitted = 0
+        self.applied = 0
+        self._commands = queue.SimpleQueue()
+        self._node_snapshots = []
+        self._sequence = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self.snapshots.publish(self._take_snapshot())
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start running the simulation in the background."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="pipeliner-simulation", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the thread and wait for it to finish.
+
+        Args:
+            timeout (Optional[float]): Most seconds to wait.
+
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, command: Callable, *args) -> int:
+        """Run command with the arguments in the simulation thread.
+
+        Commands run in the order they were submitted, before the next
+        simulation step. Call it from a single thread, usually the event
+        loop.
+
+        Args:
+            command (Callable): Function changing the simulation.
+
+        Returns:
+            int: Sequence of the command.
+
+        """
+        self.submitted += 1
+        self._commands.put((self.submitted, command, args))
+        return self.submitted
+
+    def run_once(self, delta_time: float) -> Snapshot:
+        """Run commands, advance the simulation and publish a snapshot.
+
+        Runs in the worker thread, or directly when the worker was not
+        started.
+
+        Args:
+            delta_time (float): Real seconds since the last run.
+
+        Returns:
+            Snapshot: Published snapshot.
+
+        """
+        while True:
+            try:
+                sequence, command, args = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            command(*args)
+            self.applied = sequence
+        self.time_warp.update(delta_time)
+        self.simulation.sync()
+        snapshot = self._take_snapshot()
+        self.snapshots.publish(snapshot)
+        return snapshot
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self.run_once(now - last)
+            last = now
+
+    def _take_snapshot(self) -> Snapshot:
+        nodes = self.simulation.nodes
+        previous = self._node_snapshots
+        snapshots = []
+        for i, node in enumerate(nodes):
+            old = previous[i] if i < len(previous) else None
+            if old is None or node.dirty:
+                snapshots.append(take_node_snapshot(node, old))
+                node.dirty = Dirty.NONE
+            else:
+                snapshots.append(old)
+        self._node_snapshots = snapshots
+        self._sequence += 1
+        flow = self.simulation.flow
+        return Snapshot(
+            self._sequence, self.simulation.time,
+            flow.delivered if flow is not None else 0,
+            self.applied, tuple(snapshots))
+
+
+def _create_task(kind: int, type_code: int, state_code: int, status_code: int) -> Task:
+    task = get_task_class(kind)()
+    task.type = TaskType.from_code(type_code)
+    task.state = TaskState.from_code(state_code)
+    task.status = TaskStatus.from_code(status_code)
+    return task
+
+
+class SnapshotMirror(object):
+    """Display copies of the simulated nodes following the snapshots.
+
+    Properties:
+        worker (SimulationWorker): Worker publishing the snapshots.
+        models (List[NodeModel]): Display models in the order of the
+            simulated nodes.
+        snapshot (Optional[Snapshot]): Last applied snapshot.
+
+    """
+    worker: SimulationWorker
+    models: List[NodeModel]
+    snapshot: Optional[Snapshot]
+
+    def __init__(self, worker: SimulationWorker, models: Sequence[NodeModel]):
+        self.worker = worker
+        self.models = list(models)
+        self.snapshot = None
+
+    def update(self) -> bool:
+        """Copy the latest snapshot into the display models.
+
+        Only nodes whose snapshot changed are touched.
+
+        Returns:
+            bool: True if there was a new snapshot.
+
+        """
+        snapshot = self.worker.snapshots.latest
+        if snapshot is None or snapshot is self.snapshot:
+            return False
+        previous = self.snapshot.nodes if self.snapshot is not None else ()
+        positions = snapshot.applied >= self.worker.submitted
+        for i, (model, node) in enumerate(zip(self.models, snapshot.nodes)):
+            old = previous[i] if i < len(previous) else None
+            if node is old:
+                continue
+            self._apply(model, node, old, positions)
+        self.snapshot = snapshot
+        return True
+
+    @staticmethod
+    def _apply(
+            model: NodeModel, node: NodeSnapshot,
+            old: Optional[NodeSnapshot], positions: bool) -> None:
+        if positions and (model.x, model.y) != (node.x, node.y):
+            model.x = node.x
+            model.y = node.y
+        if model.level != node.level:
+            model.level = node.level
+        if model.work_hours != node.work_hours:
+            model.work_hours = node.work_hours
+        if model.task_slots != node.task_slots:
+            model.task_slots = node.task_slots
+        model.current_hour = node.current_hour
+        if old is None or node.tasks is not old.tasks:
+            model.tasks = [_create_task(*codes) for codes in node.tasks]
+            model.current_task = model.tasks[node.current] if node.current >= 0 else None
+        if model.current_task is not None:
+            model.current_task.progress = node.progress
+            model.dirty |= Dirty.PROGRESS